@@ -0,0 +1,70 @@
+"""
+Build parquet footers for the tests of the parquet and s3 modules
+"""
+import struct
+
+from watchmen.utils import parquet
+
+
+def _encode_varint(value):
+    data = b''
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            data += bytes([byte | 0x80])
+        else:
+            return data + bytes([byte])
+
+
+def _encode_struct(fields):
+    """
+    Encode a Thrift compact-protocol struct from a list of (field id, thrift type, value) with increasing field ids;
+    list values are (element type, [elements])
+    """
+    data = b''
+    last_field_id = 0
+    for field_id, thrift_type, value in fields:
+        data += bytes([((field_id - last_field_id) << 4) | thrift_type]) + _encode_value(thrift_type, value)
+        last_field_id = field_id
+    return data + bytes([parquet.THRIFT_STOP])
+
+
+def _encode_value(thrift_type, value):
+    if thrift_type in (parquet.THRIFT_I32, parquet.THRIFT_I64):
+        return _encode_varint((value << 1) ^ (value >> 63))
+    if thrift_type == parquet.THRIFT_BINARY:
+        return _encode_varint(len(value)) + value
+    if thrift_type == parquet.THRIFT_LIST:
+        element_type, elements = value
+        header = bytes([(len(elements) << 4) | element_type]) if len(elements) < 15 else \
+            bytes([0xf0 | element_type]) + _encode_varint(len(elements))
+        return header + b''.join(_encode_value(element_type, element) for element in elements)
+    if thrift_type == parquet.THRIFT_STRUCT:
+        return _encode_struct(value)
+    raise ValueError(thrift_type)
+
+
+def build_parquet_footer(num_rows, schema, num_row_groups=1):
+    """
+    Build the footer (metadata, length and magic number) of a parquet file
+    @param schema: a list of (name, physical type id or None, number of children) in depth-first order, without root
+    """
+    elements = [[(4, parquet.THRIFT_BINARY, b'schema'), (5, parquet.THRIFT_I32, len(schema))]]
+    for name, physical_type, num_children in schema:
+        element = [(4, parquet.THRIFT_BINARY, name.encode('utf-8'))]
+        if physical_type is not None:
+            element.insert(0, (1, parquet.THRIFT_I32, physical_type))
+        if num_children:
+            element.append((5, parquet.THRIFT_I32, num_children))
+        elements.append(element)
+    row_groups = [[(2, parquet.THRIFT_I64, 1000), (3, parquet.THRIFT_I64, num_rows // num_row_groups)]
+                  for _ in range(num_row_groups)]
+    metadata = _encode_struct([
+        (1, parquet.THRIFT_I32, 1),
+        (2, parquet.THRIFT_LIST, (parquet.THRIFT_STRUCT, elements)),
+        (3, parquet.THRIFT_I64, num_rows),
+        (4, parquet.THRIFT_LIST, (parquet.THRIFT_STRUCT, row_groups)),
+        (6, parquet.THRIFT_BINARY, b'parquet-mr version 1.10.1'),
+    ])
+    return metadata + struct.pack('<i', len(metadata)) + parquet.PARQUET_MAGIC
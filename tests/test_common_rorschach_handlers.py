@@ -0,0 +1,45 @@
+"""
+# test_common_rorschach_handlers
+"""
+import unittest
+from mock import patch
+from watchmen import const
+from watchmen.common import rorschach_handlers
+from watchmen.common.result import Result
+
+
+class TestRorschachHandlers(unittest.TestCase):
+    """
+    TestRorschachHandlers tests watchmen.common.rorschach_handlers
+    """
+
+    @patch('watchmen.process.rorschach.Rorschach.__init__')
+    @patch('watchmen.process.rorschach.Rorschach.sweep')
+    @patch('watchmen.common.result_svc.ResultSvc.save_results')
+    @patch('watchmen.common.result_svc.ResultSvc.send_alert')
+    def test_start_rorschach_sweep(self, mock_alert, mock_save, mock_sweep, mock_init):
+        mock_init.return_value = None
+        results = [[Result(
+            short_message="Message {}".format(index),
+            state="SUCCESS",
+            subject="Success subject.",
+            success=True,
+            target="Fake target",
+            watchman_name="Example source",
+        )] for index in range(2)]
+        mock_sweep.return_value = [({"Hourly": "00"}, results[0]), ({"Daily": "15:00"}, results[1])]
+
+        event = {"Start": "2020-05-26T14:00:00Z", "End": "2020-05-26T15:00:00Z"}
+        returned = rorschach_handlers.start_rorschach_sweep(event, None)
+        self.assertEqual(["Message 0" + const.LINE_SEPARATOR, "Message 1" + const.LINE_SEPARATOR], returned)
+        mock_sweep.assert_called_with(event["Start"], event["End"])
+        self.assertEqual(mock_alert.call_count, 2)
+        # The results of each schedule are saved on their own, like those of a run of the schedule:
+        self.assertEqual([call[0][0] for call in mock_save.call_args_list], results)
+
+    @patch('watchmen.utils.arrivals.count_arrivals')
+    def test_start_arrival_counter(self, mock_count):
+        mock_count.return_value = 3
+        event = {"Records": []}
+        self.assertEqual(3, rorschach_handlers.start_arrival_counter(event, None))
+        mock_count.assert_called_with(event)
@@ -0,0 +1,174 @@
+"""
+Test common target_plans module
+"""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+
+from watchmen.common import target_plans
+
+
+class TestTargetPlans(unittest.TestCase):
+    """
+    TestTargetPlans includes all unit tests for watchmen.common.target_plans module
+    """
+    def setUp(self):
+        target_plans.clear_cache()
+        self.s3_item = {'bucket_name': 'bucket', 'prefix': 'path/%0Y/%0m/%0d/', 'min_total_files': 1}
+        self.s3_config = {
+            'Daily': {'00': [{'target_name': 'target one', 'items': [self.s3_item]}]},
+            'Weekly': {'Tue': {'08:00': [{'target_name': 'target two', 'items': [dict(self.s3_item, max_items=5)]}]}},
+        }
+        self.github_config = {
+            'Daily': [{'target_name': 'github', 'owner': 'mitre', 'repo': 'cti', 'checks': ['Commits']}],
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        target_plans.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def _write_config(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as config_file:
+            config_file.write(content)
+        return path
+
+    def test_compile_configs(self):
+        """
+        test watchmen.common.target_plans :: compile_plan :: every target config of the package
+        """
+        config_names = [name for name in os.listdir(target_plans.CONFIGS_DIR) if target_plans.get_kind(name)]
+        self.assertTrue(config_names)
+        for name in config_names:
+            plan = target_plans._read_plan(target_plans.get_kind(name), os.path.join(target_plans.CONFIGS_DIR, name))
+            self.assertEqual(plan['version'], target_plans.PLAN_VERSION)
+
+    def test_compile_plan(self):
+        """
+        test watchmen.common.target_plans :: compile_plan
+        """
+        plan = target_plans.compile_plan(target_plans.S3_TARGETS, self.s3_config)
+        self.assertEqual(sorted(plan['schedules']), ['Daily,00', 'Weekly,Tue,08:00'])
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Weekly', 'Tue', '08:00']),
+                         self.s3_config['Weekly']['Tue']['08:00'])
+        plan = target_plans.compile_plan(target_plans.GITHUB_TARGETS, self.github_config)
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily']), self.github_config['Daily'])
+        plan = target_plans.compile_plan(target_plans.API_TARGETS, [{'target_name': 'api', 'url': 'x', 'custom': 1}])
+        self.assertEqual(target_plans.get_targets(plan)[0]['custom'], 1)
+
+        with self.assertRaises(ValueError):
+            target_plans.compile_plan('unknown', {})
+
+    def test_compile_plan_errors(self):
+        """
+        test watchmen.common.target_plans :: compile_plan :: invalid configs
+        """
+        tests = [
+            {'Daily': {0: [{'target_name': 'x', 'items': [self.s3_item]}]}},
+            {'Yearly': {'00': [{'target_name': 'x', 'items': [self.s3_item]}]}},
+            {'Daily': {'00': []}},
+            {'Daily': {'00': [{'items': [self.s3_item]}]}},
+        ]
+        for config in tests:
+            with self.assertRaises(ValueError):
+                target_plans.compile_plan(target_plans.S3_TARGETS, config)
+
+        github_config = {'Daily': [dict(self.github_config['Daily'][0], checks=['Issues'])]}
+        with self.assertRaises(ValueError):
+            target_plans.compile_plan(target_plans.GITHUB_TARGETS, github_config)
+
+        # Test every problem is reported at once:
+        config = {'Daily': {'00': [], 0: []}}
+        with self.assertRaises(ValueError) as context:
+            target_plans.compile_plan(target_plans.S3_TARGETS, config)
+        self.assertIn('Daily,00: expected a list of targets', str(context.exception))
+        self.assertIn('must be a quoted string', str(context.exception))
+
+    def test_compile_plan_skipped_items(self):
+        """
+        test watchmen.common.target_plans :: compile_plan :: invalid S3 items are left out of the plan and reported
+        """
+        tests = [
+            (dict(self.s3_item, unknown=1), 'unknown tag "unknown"'),
+            (dict(self.s3_item, max_items='5'), 'tag "max_items" must be int, not str'),
+            (dict(self.s3_item, min_total_files=True), 'tag "min_total_files" must be int, not bool'),
+            ({'bucket_name': 'bucket'}, 'expected either "prefix" or "full_path"'),
+            (dict(self.s3_item, full_path='path'), 'expected either "prefix" or "full_path"'),
+            (dict(self.s3_item, offset_type='Yearly'), '"offset_type" must be one of'),
+            (dict(self.s3_item, path_vars=['a']), '"path_vars" needs a {var} placeholder'),
+            ('bucket', 'expected a mapping, not str'),
+        ]
+        for item, expected in tests:
+            config = {'Daily': {'00': [{'target_name': 'x', 'items': [self.s3_item, item]}]}}
+            plan = target_plans.compile_plan(target_plans.S3_TARGETS, config)
+            self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily', '00'])[0]['items'], [self.s3_item])
+            self.assertEqual(len(plan['skipped_items']), 1, item)
+            self.assertTrue(plan['skipped_items'][0].startswith('Daily,00 > x > item #2: '))
+            self.assertIn(expected, plan['skipped_items'][0])
+            self.assertEqual(len(config['Daily']['00'][0]['items']), 2)
+
+        # Test every problem of an item is reported:
+        config = {'Daily': {'00': [{'target_name': 'x', 'items': [{'bucket_name': 'bucket', 'max_items': '5'}]}]}}
+        plan = target_plans.compile_plan(target_plans.S3_TARGETS, config)
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily', '00']), [{'target_name': 'x', 'items': []}])
+        self.assertEqual(len(plan['skipped_items']), 2)
+        self.assertIn('max_items', plan['skipped_items'][0])
+        self.assertIn('"prefix" or "full_path"', plan['skipped_items'][1])
+
+    def test_get_kind(self):
+        """
+        test watchmen.common.target_plans :: get_kind
+        """
+        tests = [
+            ('s3_targets_saas_prod.yaml', target_plans.S3_TARGETS),
+            ('github_targets.yaml', target_plans.GITHUB_TARGETS),
+            ('api_targets.yaml', target_plans.API_TARGETS),
+            ('endpoints.json', None),
+        ]
+        for name, expected in tests:
+            self.assertEqual(target_plans.get_kind(name), expected)
+
+    def test_load_plan(self):
+        """
+        test watchmen.common.target_plans :: write_plan and load_plan
+        """
+        config_path = self._write_config('github_targets.yaml', 'Daily:\n  - {target_name: a, owner: b, repo: c, '
+                                                                'checks: [Commits]}\n')
+        plan_path = target_plans.write_plan(target_plans.GITHUB_TARGETS, config_path)
+        self.assertEqual(plan_path, os.path.join(self.temp_dir, 'github_targets' + target_plans.PLAN_SUFFIX))
+        plan = target_plans.load_plan(target_plans.GITHUB_TARGETS, config_path)
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily'])[0]['repo'], 'c')
+
+        # Test the plan is loaded once, and its targets are copies:
+        self.assertIs(target_plans.load_plan(target_plans.GITHUB_TARGETS, config_path), plan)
+        target_plans.get_schedule_targets(plan, ['Daily'])[0]['repo'] = 'changed'
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily'])[0]['repo'], 'c')
+
+        # Test a stale plan is ignored:
+        self._write_config('github_targets.yaml',
+                           'Daily:\n  - {target_name: a, owner: b, repo: d, checks: [Commits]}\n')
+        target_plans.clear_cache()
+        plan = target_plans.load_plan(target_plans.GITHUB_TARGETS, config_path)
+        self.assertEqual(target_plans.get_schedule_targets(plan, ['Daily'])[0]['repo'], 'd')
+
+    def test_main(self):
+        """
+        test watchmen.common.target_plans :: main
+        """
+        self._write_config('api_targets.yaml', '- {target_name: a, url: b}\n')
+        self._write_config('endpoints.json', '[]')
+        self.assertEqual(target_plans.main([self.temp_dir]), 0)
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'api_targets' + target_plans.PLAN_SUFFIX)))
+
+        self._write_config('s3_targets_test.yaml', 'Daily:\n  "00":\n  - target_name: a\n    items:\n'
+                                                   '    - {bucket_name: bad_bucket}\n')
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(target_plans.main([self.temp_dir]), 0)
+        self.assertIn('s3_targets_test.yaml: item skipped: Daily,00 > a > item #1', stderr.getvalue())
+
+        self._write_config('github_targets.yaml', 'Daily:\n  - {target_name: a}\n')
+        self.assertEqual(target_plans.main([self.temp_dir]), 1)
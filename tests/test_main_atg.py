@@ -3,6 +3,7 @@
 """
 from mock import patch
 from watchmen import const
+from watchmen.common import rorschach_handlers
 from watchmen.common.result import Result
 from watchmen import main_atg as main
 import logging
@@ -119,6 +120,13 @@ def test_start_rorschach_watcher(self, mock_alert, mock_monitor, mock_rorschach)
         returned = main.start_rorschach_watcher(self.event, self.context)
         self.assertEqual(expected, returned)
 
+    def test_rorschach_handlers(self):
+        """
+        test the Rorschach sweep and arrival counter handlers are those of watchmen.common.rorschach_handlers
+        """
+        self.assertIs(main.start_rorschach_sweep, rorschach_handlers.start_rorschach_sweep)
+        self.assertIs(main.start_arrival_counter, rorschach_handlers.start_arrival_counter)
+
     @patch('watchmen.process.silhouette.Silhouette')
     @patch('watchmen.process.silhouette.Silhouette.monitor')
     @patch('watchmen.common.result_svc.ResultSvc.save_results')
@@ -4,6 +4,7 @@
 import unittest
 from mock import patch
 from watchmen import const, main_cyberintel
+from watchmen.common import rorschach_handlers
 from watchmen.common.result import Result
 
 
@@ -30,3 +31,10 @@ def test_start_rorschach_watcher(self, mock_alert, mock_save, mock_monitor, mock
         expected = example_lambda_message + const.LINE_SEPARATOR
         returned = main_cyberintel.start_rorschach_watcher({}, None)
         self.assertEqual(expected, returned)
+
+    def test_rorschach_handlers(self):
+        """
+        test the Rorschach sweep and arrival counter handlers are those of watchmen.common.rorschach_handlers
+        """
+        self.assertIs(main_cyberintel.start_rorschach_sweep, rorschach_handlers.start_rorschach_sweep)
+        self.assertIs(main_cyberintel.start_arrival_counter, rorschach_handlers.start_arrival_counter)
@@ -4,6 +4,7 @@
 from mock import patch
 
 from watchmen import const
+from watchmen.common import target_plans
 from watchmen.process.comedian import Comedian
 from watchmen.process.comedian import MESSAGES, TARGET_EMAIL, TARGET_PAGER, GENERIC
 
@@ -898,8 +899,8 @@ def test_get_virustotal_data(self, mock_header, mock_url, mock_get_request, mock
             self.assertEqual(expected, returned)
 
     @patch('watchmen.process.comedian.traceback.format_exc')
-    @patch('watchmen.process.comedian.yaml.load')
-    @patch('watchmen.process.comedian.open')
+    @patch('watchmen.common.target_plans.yaml.load')
+    @patch('watchmen.common.target_plans.open')
     def test_load_config(self, mock_open, mock_yaml_read, mock_traceback):
         comedian_obj = self._create_comedian_obj()
 
@@ -919,8 +920,9 @@ def test_load_config(self, mock_open, mock_yaml_read, mock_traceback):
         ]
 
         for test in tests:
+            target_plans.clear_cache()
             if not test.get("open"):
-                mock_open.return_value = Exception()
+                mock_open.side_effect = Exception()
             mock_yaml_read.return_value = test.get("config")
             mock_traceback.return_value = test.get("tb")
             expected = test.get("expected"), test.get("tb")
@@ -4,7 +4,8 @@
 from mock import patch
 
 from watchmen.process.mothman import Mothman
-from watchmen.process.mothman import MESSAGES
+from watchmen.process.mothman import BUCKET_NAME, MESSAGES
+from watchmen.utils.s3 import ObjectMetadataError
 
 
 class TestMothman(unittest.TestCase):
@@ -86,27 +87,32 @@ def _create_mothman_obj():
         """
         return Mothman(event=None, context=None)
 
-    @patch('watchmen.process.mothman.get_key')
-    @patch('watchmen.process.mothman.check_unequal_files')
-    def test_check_s3_files(self, mock_check_unequal, mock_get_key):
+    @patch('watchmen.process.mothman.head_objects')
+    def test_check_s3_files(self, mock_head_objects):
+        existing_object = {"Exists": True, "ContentLength": 100}
+        existing_object_same_size = {"Exists": True, "ContentLength": 100}
+        existing_object_new_size = {"Exists": True, "ContentLength": 200}
+        missing_object = {"Exists": False}
         tests = [
             {
-                "check_unequal_files": [True, True],
-                "get_key": ["existing_object", "existing_object", "existing_object", "existing_object"],
+                "head_objects": {
+                    "a/0010": existing_object, "b/0020": existing_object_new_size, "b/0010": existing_object
+                },
                 "files_info": [
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "a/0010",
                         "latest_hour_minute": "0010",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "a/0000",
                         "previous_hour_minute": "0000"
                     },
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "b/0020",
                         "latest_hour_minute": "0020",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "b/0010",
                         "previous_hour_minute": "0010"
                     },
                 ],
+                "requested": ["a/0010", "b/0020", "b/0010"],
                 "expected": [
                     {
                         "success": True,
@@ -114,90 +120,105 @@ def test_check_s3_files(self, mock_check_unequal, mock_get_key):
                     },
                     {
                         "success": True,
-                        "details": MESSAGES.get("success_unequal_files").format(
-                            "latest_file_s3_path", "previous_file_s3_path"
-                        )
+                        "details": MESSAGES.get("success_unequal_files").format("b/0020", "b/0010")
                     }
                 ]
             },
             {
-                "check_unequal_files": [False, True],
-                "get_key": ["existing_object", "existing_object", None, "existing_object"],
+                "head_objects": {
+                    "a/0020": existing_object, "a/0010": existing_object_same_size,
+                    "b/0020": missing_object, "b/0010": existing_object
+                },
                 "files_info": [
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "a/0020",
                         "latest_hour_minute": "0020",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "a/0010",
                         "previous_hour_minute": "0010"
                     },
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "b/0020",
                         "latest_hour_minute": "0020",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "b/0010",
                         "previous_hour_minute": "0010"
                     },
                 ],
+                "requested": ["a/0020", "a/0010", "b/0020", "b/0010"],
                 "expected": [
                     {
                         "success": False,
-                        "details": MESSAGES.get("failure_equal_files").format(
-                            "latest_file_s3_path", "previous_file_s3_path"
-                        )
+                        "details": MESSAGES.get("failure_equal_files").format("a/0020", "a/0010")
                     },
                     {
                         "success": False,
-                        "details": MESSAGES.get("failure_latest_file_dne").format("latest_file_s3_path")
+                        "details": MESSAGES.get("failure_latest_file_dne").format("b/0020")
                     }
                 ]
             },
             {
-                "check_unequal_files": [False, True],
-                "get_key": ["existing_object", None, "existing_object", "existing_object"],
+                "head_objects": {"a/2350": existing_object, "b/0020": existing_object, "b/0010": missing_object},
                 "files_info": [
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "a/0000",
                         "latest_hour_minute": "0000",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "a/2350",
                         "previous_hour_minute": "2350"
                     },
                     {
-                        "latest_file_path": "latest_file_s3_path",
+                        "latest_file_path": "b/0020",
                         "latest_hour_minute": "0020",
-                        "previous_file_path": "previous_file_s3_path",
+                        "previous_file_path": "b/0010",
                         "previous_hour_minute": "0010"
                     },
                 ],
+                "requested": ["a/2350", "b/0020", "b/0010"],
                 "expected": [
                     {
                         "success": True,
-                        "details": MESSAGES.get("success_latest_hm").format("latest_file_s3_path")
+                        "details": MESSAGES.get("success_latest_hm").format("a/0000")
                     },
                     {
                         "success": True,
-                        "details": MESSAGES.get("success_previous_file_dne").format("previous_file_s3_path")
+                        "details": MESSAGES.get("success_previous_file_dne").format("b/0010")
                     }
                 ]
             },
         ]
         for test in tests:
             mothman_obj = self._create_mothman_obj()
-            mock_check_unequal.side_effect = test['check_unequal_files']
-            mock_get_key.side_effect = test['get_key']
+            mock_head_objects.return_value = test['head_objects']
             returned = mothman_obj._check_s3_files(test['files_info'])
+            mock_head_objects.assert_called_with(BUCKET_NAME, test['requested'])
             self.assertEqual(test['expected'], returned)
 
-    @patch('watchmen.process.mothman.get_key')
+    @patch('watchmen.process.mothman.head_objects')
     @patch('watchmen.process.mothman.traceback.format_exc')
-    def test_check_s3_files_exception(self, mock_traceback, mock_get_key):
+    def test_check_s3_files_exception(self, mock_traceback, mock_head_objects):
         traceback = "Traceback created during exception catch."
-        mock_get_key.side_effect = Exception()
         mock_traceback.return_value = traceback
-        mothman_obj = self._create_mothman_obj()
         expected = [
             {"success": None, "details": MESSAGES.get("exception_details").format(traceback)}
         ]
-        file_check_info = mothman_obj._check_s3_files(self.file_info_examples.get("generic_example"))
-        self.assertEqual(expected, file_check_info)
+        tests = [
+            # the whole batch failed:
+            {"side_effect": Exception(), "return_value": None},
+            # the HEAD request of the latest file failed:
+            {"side_effect": None, "return_value": {"latest_file_s3_path": {"Exists": None, "Error": traceback}}},
+        ]
+        for test in tests:
+            mock_head_objects.side_effect = test['side_effect']
+            mock_head_objects.return_value = test['return_value']
+            mothman_obj = self._create_mothman_obj()
+            file_check_info = mothman_obj._check_s3_files(self.file_info_examples.get("generic_example"))
+            self.assertEqual(expected, file_check_info)
+
+    def test_get_file_metadata(self):
+        mothman_obj = self._create_mothman_obj()
+        files_metadata = {"a/0010": {"Exists": False}, "a/0020": {"Exists": None, "Error": "Traceback"}}
+        self.assertEqual(mothman_obj._get_file_metadata("a/0010", files_metadata), {"Exists": False})
+        for file_path in ["a/0020", "a/0030"]:
+            with self.assertRaises(ObjectMetadataError):
+                mothman_obj._get_file_metadata(file_path, files_metadata)
 
     def test_convert_datetime_to_dict(self):
         datetime_string = "2019-12-15-05-05"
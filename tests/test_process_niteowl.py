@@ -2,6 +2,7 @@
 import unittest
 from mock import mock_open, patch
 
+from watchmen.common import target_plans
 from watchmen.process.niteowl import Niteowl, MESSAGES, REQUIRED_TARGET_TAGS, GENERIC_TARGET, const
 
 
@@ -659,7 +660,7 @@ def test_is_valid_event(self):
             self.assertEqual(test.get('expected'), niteowl._is_valid_event())
 
     @patch('builtins.open', new_callable=mock_open())
-    @patch('watchmen.process.niteowl.yaml.load')
+    @patch('watchmen.common.target_plans.yaml.load')
     @patch('watchmen.process.niteowl.traceback.format_exc')
     def test_load_config(self, mock_traceback, mock_file, mock_open):
         """
@@ -678,6 +679,7 @@ def test_load_config(self, mock_traceback, mock_file, mock_open):
             }
         ]
         for test in tests:
+            target_plans.clear_cache()
             with mock_open:
                 niteowl = self._create_niteowl()
                 mock_file.return_value = test.get('config')
@@ -1,12 +1,21 @@
 import datetime
+import os
 import pytz
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
 from dateutil.relativedelta import relativedelta
-from mock import mock_open, patch
+from mock import Mock, mock_open, patch
 
 from watchmen import const
+from watchmen.common import target_plans
 from watchmen.common.watchman import Watchman
+from watchmen.utils import arrivals
+from watchmen.utils.s3 import InventoryIndex, ListingAggregate
+from watchmen.process import rorschach
 from watchmen.process.rorschach import Rorschach, MESSAGES, CONFIG_NAME
 
 
@@ -472,18 +481,30 @@ def test_check_file_suffix(self):
         rorschach_obj = self._create_rorschach()
 
         # Test for all correct suffixes:
+        aggregate = ListingAggregate(suffix=suffix)
+        aggregate.update(same_suffix_contents)
         expected, expected_tb = "", None
-        returned, returned_tb = rorschach_obj._check_file_suffix(same_suffix_contents, suffix)
+        returned, returned_tb = rorschach_obj._check_file_suffix(aggregate)
         self.assertEqual((expected, expected_tb), (returned, returned_tb))
 
         # Test for failed suffix check:
+        aggregate = ListingAggregate(suffix=suffix)
+        aggregate.update(different_suffix_contents)
         expected, expected_tb = "{}{}".format(different_suffix_contents[1].get('Key'), const.LINE_SEPARATOR), None
-        returned, returned_tb = rorschach_obj._check_file_suffix(different_suffix_contents, suffix)
+        returned, returned_tb = rorschach_obj._check_file_suffix(aggregate)
         self.assertEqual((expected, expected_tb), (returned, returned_tb))
 
+        # Test for failed suffix check with more mismatches than sampled keys:
+        aggregate = ListingAggregate(suffix=suffix, max_samples=1)
+        aggregate.update(different_suffix_contents[1:] * 3)
+        expected = "{}{}".format(different_suffix_contents[1].get('Key'), const.LINE_SEPARATOR) + \
+                   MESSAGES.get('failure_more_files').format(2)
+        returned, returned_tb = rorschach_obj._check_file_suffix(aggregate)
+        self.assertEqual((expected, None), (returned, returned_tb))
+
         # Test for exceptions:
         expected, expected_tb = None, self.example_traceback
-        returned, returned_tb = rorschach_obj._check_file_suffix(None, None)
+        returned, returned_tb = rorschach_obj._check_file_suffix(None)
         self.assertEqual(expected, returned)
         self.assertTrue(expected_tb in returned_tb)
 
@@ -522,12 +543,12 @@ def test_check_multiple_files(self, mock_multiple_files_size_check, mock_suffix_
         rorschach_obj = self._create_rorschach()
         example_contents_dicts = {
             "generate_contents_success": {
-                "contents": self.example_contents,
+                "aggregate": ListingAggregate(),
                 "count": 5,
                 "s3_prefix": self.example_s3_prefix
             },
             "no_files_failure": {
-                "contents": {},
+                "aggregate": ListingAggregate(),
                 "count": 0,
                 "s3_prefix": self.example_s3_prefix
             },
@@ -657,11 +678,22 @@ def test_check_multiple_files_size(self):
             expected = example.get("expected")
             expected_tb = example.get("expected_tb")
 
-            returned, returned_tb = rorschach_obj._check_multiple_files_size(example.get("contents"),
+            aggregate = ListingAggregate()
+            aggregate.update(example.get("contents"))
+            returned, returned_tb = rorschach_obj._check_multiple_files_size(aggregate,
                                                                              example.get("item"),
                                                                              self.example_s3_prefix)
             self.assertEqual((expected, expected_tb), (returned, returned_tb))
 
+        # Testing more empty files than sampled keys:
+        aggregate = ListingAggregate(max_samples=1)
+        aggregate.update(self.example_contents[3:] * 2)
+        expected = "{}\n\n".format(MESSAGES.get('failure_file_empty').format(self.example_contents[3]['Key'])) + \
+                   "{}\n\n".format(MESSAGES.get('failure_more_files').format(1))
+        returned, returned_tb = rorschach_obj._check_multiple_files_size(
+            aggregate, self.example_config_file['Daily']['00'][0].get('items')[1], self.example_s3_prefix)
+        self.assertEqual((expected, None), (returned, returned_tb))
+
         # Testing exception while checking multiple files size:
         expected, expected_tb = None, self.example_traceback
 
@@ -709,6 +741,215 @@ def test_check_multiple_file_paths(self, mock_single_file, mock_multiple_files):
             result = rorschach_obj._check_multiple_file_paths(test.get('item'))
             self.assertEqual(expected, result)
 
+    @patch('watchmen.utils.s3.generate_pages')
+    @patch('watchmen.process.rorschach._s3.check_bucket', return_value=(True, None))
+    def test_check_item_time_budget(self, mock_check_bucket, mock_pages):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_item :: out of time budget, with partial results
+        """
+        rorschach_obj = self._create_rorschach()
+        closed = []
+
+        def generate_pages(prefix, **kwargs):
+            try:
+                for index in range(10):
+                    if index == 2:
+                        # The time budget of the item runs out while listing:
+                        rorschach_obj.item_budget.deadline = time.monotonic()
+                    yield {'Key': prefix + str(index), 'Size': 1000, 'LastModified': datetime.datetime.now(pytz.utc)}
+            finally:
+                closed.append(prefix)
+
+        mock_pages.side_effect = generate_pages
+        item = {'bucket_name': 'bucket', 'prefix': 'data/', 'offset_type': 'Daily', 'min_total_files': 5}
+        exception_strings, failure_strings = rorschach_obj._check_item(item)
+        self.assertEqual(failure_strings, [])
+        self.assertIn('The listing of s3://bucket/data/ stopped with 2 file(s) (2.0 KB) found.', exception_strings[0])
+        # The listing is closed, so no more pages are requested:
+        self.assertEqual(closed, ['data/'])
+
+        # Test the paths checked within the time budget are still reported:
+        path_results = [([], ['failure a']), rorschach.TimeBudgetExceeded(1.0), ([], ['failure c'])]
+        with patch('watchmen.process.rorschach.Rorschach._check_multiple_files', side_effect=path_results):
+            exception_strings, failure_strings = rorschach_obj._check_item(
+                {'bucket_name': 'bucket', 'prefix': 'data/{var}/', 'path_vars': ['a', 'b', 'c']})
+        self.assertEqual(failure_strings, ['failure a'])
+        self.assertIn(MESSAGES.get('exception_time_budget').format(1.0), exception_strings[0])
+
+        # Test an item starting after the deadline of the run is not checked:
+        rorschach_obj.deadline = time.monotonic()
+        exception_strings, _ = rorschach_obj._check_item(item)
+        self.assertIn(MESSAGES.get('exception_time_budget').format(0.0), exception_strings[0])
+        self.assertEqual(mock_check_bucket.call_count, 2)
+
+    @patch('watchmen.process.rorschach.Rorschach._get_max_workers', return_value=2)
+    @patch('watchmen.process.rorschach.Rorschach._check_item')
+    def test_check_items_deadline(self, mock_check_item, mock_max_workers):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_items :: items abandoned at the deadline of the run
+        """
+        released = threading.Event()
+        self.addCleanup(released.set)
+
+        def check_item(item):
+            if item['prefix'] == 'slow/':
+                released.wait(10)
+            return [], ['failure ' + item['prefix']]
+
+        mock_check_item.side_effect = check_item
+        rorschach_obj = self._create_rorschach()
+        rorschach_obj.deadline = time.monotonic() - rorschach.ABANDON_GRACE_SECONDS + 0.5
+        items = [{'prefix': 'fast/'}, {'prefix': 'slow/'}, {'prefix': 'other/'}]
+        returned = rorschach_obj._check_items(items)
+
+        self.assertEqual(returned[0], ([], ['failure fast/']))
+        self.assertEqual(returned[1], ([MESSAGES.get('exception_string_format').format(
+            items[1], MESSAGES.get('exception_time_budget_abandoned'))], []))
+        self.assertEqual(returned[2], ([], ['failure other/']))
+
+    def test_get_deadline(self):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _get_deadline from the remaining time of the Lambda context
+        """
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        deadline = Rorschach._get_deadline(context)
+        self.assertAlmostEqual(deadline, time.monotonic() + 60 - rorschach.DEADLINE_RESERVE_SECONDS, delta=1)
+        self.assertIsNone(Rorschach._get_deadline(None))
+        self.assertIsNotNone(Rorschach(self.example_event_daily, context).deadline)
+
+    @patch('watchmen.process.rorschach._s3.verify_gzips')
+    def test_check_gzip_files(self, mock_verify_gzips):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_gzip_files
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "verify_gzip": True, "min_lines": 100}
+        keys = ["some/path/to/a.gz", "some/path/to/b.gz", "some/path/to/c.gz"]
+        mock_verify_gzips.return_value = {
+            keys[0]: {"Key": keys[0], "Valid": True, "NumLines": 40},
+            keys[1]: {"Key": keys[1], "Valid": True, "NumLines": 40},
+            keys[2]: {"Key": keys[2], "Valid": False, "Error": "The gzip stream is truncated"},
+        }
+
+        expected = "{}\n\n".format(
+            MESSAGES.get('failure_gzip_invalid').format(keys[2], "The gzip stream is truncated")) + \
+            MESSAGES.get('failure_total_lines').format(self.example_s3_prefix, 80, 100)
+        returned, returned_tb = rorschach_obj._check_gzip_files(item, keys, self.example_s3_prefix)
+        mock_verify_gzips.assert_called_with("bucket", keys, count_lines=True)
+        self.assertEqual((expected, None), (returned, returned_tb))
+
+        # Test unreadable and skipped files: the total lines is not checked
+        mock_verify_gzips.return_value = {
+            keys[0]: {"Key": keys[0], "Valid": True, "NumLines": 40},
+            keys[1]: {"Key": keys[1], "Valid": None, "Skipped": True, "Error": "budget"},
+        }
+        returned, returned_tb = rorschach_obj._check_gzip_files(item, keys[:2], self.example_s3_prefix)
+        self.assertEqual(("", None), (returned, returned_tb))
+        mock_verify_gzips.return_value[keys[1]] = {"Key": keys[1], "Valid": None, "Error": "Cannot read the file"}
+        returned, returned_tb = rorschach_obj._check_gzip_files(item, keys[:2], self.example_s3_prefix)
+        self.assertEqual(("", "Cannot read the file"), (returned, returned_tb))
+
+        # Test success without counting lines:
+        mock_verify_gzips.return_value = {keys[0]: {"Key": keys[0], "Valid": True}}
+        returned, returned_tb = rorschach_obj._check_gzip_files(
+            {"bucket_name": "bucket", "verify_gzip": True}, keys[:1], self.example_s3_prefix)
+        mock_verify_gzips.assert_called_with("bucket", keys[:1], count_lines=False)
+        self.assertEqual(("", None), (returned, returned_tb))
+
+        # Test exception:
+        returned, returned_tb = rorschach_obj._check_gzip_files(None, keys, self.example_s3_prefix)
+        self.assertIsNone(returned)
+        self.assertTrue(self.example_traceback in returned_tb)
+
+    @patch('watchmen.process.rorschach.Rorschach._check_gzip_files')
+    @patch('watchmen.process.rorschach.Rorschach._generate_contents')
+    def test_check_multiple_files_gzip(self, mock_generate_contents, mock_gzip_check):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_multiple_files with gzip verification
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "prefix": "example/path/", "verify_gzip": True}
+        aggregate = ListingAggregate(keep_keys=True)
+        aggregate.update(self.example_contents[:2])
+        mock_generate_contents.return_value = {
+            "aggregate": aggregate, "count": aggregate.count, "s3_prefix": self.example_s3_prefix}, None
+        mock_gzip_check.return_value = "Gzip failure.", None
+
+        returned = rorschach_obj._check_multiple_files(item)
+        mock_gzip_check.assert_called_with(
+            item, [content['Key'] for content in self.example_contents[:2]], self.example_s3_prefix)
+        self.assertEqual(([], ["Gzip failure."]), returned)
+
+        # Test no gzip checks without the options:
+        mock_gzip_check.reset_mock()
+        rorschach_obj._check_multiple_files({"bucket_name": "bucket", "prefix": "example/path/"})
+        mock_gzip_check.assert_not_called()
+
+    @patch('watchmen.process.rorschach._s3.get_parquet_metadatas')
+    def test_check_parquet_files(self, mock_metadatas):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_parquet_files
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "min_total_rows": 100, "expected_columns": ["query", "answer.rdata"]}
+        keys = ["some/path/to/a.parquet", "some/path/to/b.parquet", "some/path/to/c.parquet"]
+        schema = {"query": "BYTE_ARRAY", "answer.rdata": "BYTE_ARRAY"}
+        mock_metadatas.return_value = {
+            keys[0]: {"Key": keys[0], "Valid": True, "NumRows": 40, "Schema": schema},
+            keys[1]: {"Key": keys[1], "Valid": True, "NumRows": 40, "Schema": {"query": "BYTE_ARRAY"}},
+            keys[2]: {"Key": keys[2], "Valid": False, "Error": "truncated"},
+        }
+
+        expected = "{}\n\n".format(MESSAGES.get('failure_parquet_columns').format(["answer.rdata"], keys[1])) + \
+                   "{}\n\n".format(MESSAGES.get('failure_parquet_invalid').format(keys[2], "truncated")) + \
+                   MESSAGES.get('failure_total_rows').format(self.example_s3_prefix, 80, 100)
+        returned, returned_tb = rorschach_obj._check_parquet_files(item, keys, self.example_s3_prefix)
+        mock_metadatas.assert_called_with("bucket", keys)
+        self.assertEqual((expected, None), (returned, returned_tb))
+
+        # Test unreadable footers are exceptions, and the total rows is not checked:
+        mock_metadatas.return_value = {
+            keys[0]: {"Key": keys[0], "Valid": True, "NumRows": 40, "Schema": schema},
+            keys[1]: {"Key": keys[1], "Valid": None, "Error": "Cannot read the footer"},
+        }
+        returned, returned_tb = rorschach_obj._check_parquet_files(item, keys[:2], self.example_s3_prefix)
+        self.assertEqual(("", "Cannot read the footer"), (returned, returned_tb))
+
+        # Test success:
+        mock_metadatas.return_value = {keys[0]: {"Key": keys[0], "Valid": True, "NumRows": 400, "Schema": schema}}
+        returned, returned_tb = rorschach_obj._check_parquet_files(item, keys[:1], self.example_s3_prefix)
+        self.assertEqual(("", None), (returned, returned_tb))
+
+        # Test exception:
+        returned, returned_tb = rorschach_obj._check_parquet_files(None, keys, self.example_s3_prefix)
+        self.assertIsNone(returned)
+        self.assertTrue(self.example_traceback in returned_tb)
+
+    @patch('watchmen.process.rorschach.Rorschach._check_parquet_files')
+    @patch('watchmen.process.rorschach.Rorschach._generate_contents')
+    def test_check_multiple_files_parquet(self, mock_generate_contents, mock_parquet_check):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _check_multiple_files with parquet footer checks
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "prefix": "example/path/", "min_total_rows": 10}
+        aggregate = ListingAggregate(keep_keys=True)
+        aggregate.update(self.example_contents[:2])
+        mock_generate_contents.return_value = {
+            "aggregate": aggregate, "count": aggregate.count, "s3_prefix": self.example_s3_prefix}, None
+        mock_parquet_check.return_value = "Parquet failure.", None
+
+        returned = rorschach_obj._check_multiple_files(item)
+        mock_parquet_check.assert_called_with(
+            item, [content['Key'] for content in self.example_contents[:2]], self.example_s3_prefix)
+        self.assertEqual(([], ["Parquet failure."]), returned)
+
+        # Test no parquet checks without the options:
+        mock_parquet_check.reset_mock()
+        rorschach_obj._check_multiple_files({"bucket_name": "bucket", "prefix": "example/path/"})
+        mock_parquet_check.assert_not_called()
+
     @patch('watchmen.process.rorschach.Rorschach._generate_key')
     @patch('watchmen.process.rorschach.Rorschach._check_single_file_existence')
     @patch('watchmen.process.rorschach.Rorschach._check_single_file_size')
@@ -843,16 +1084,20 @@ def test_check_single_file_size(self, mock_get_object):
         returned, returned_tb = rorschach_obj._check_single_file_size(example_item, "random-s3-key/example.json")
         self.assertEqual((expected, expected_tb), (returned, returned_tb))
 
+        # The metadata is memoized, so checking the same key again doesn't send another request:
+        rorschach_obj._check_single_file_size(example_item, "random-s3-key/example.json")
+        self.assertEqual(mock_get_object.call_count, 1)
+
         # Test file size check failure:
         mock_get_object.return_value = {"ContentLength": 100}
         expected, expected_tb = False, None
-        returned, returned_tb = rorschach_obj._check_single_file_size(example_item, "random-s3-key/example.json")
+        returned, returned_tb = rorschach_obj._check_single_file_size(example_item, "random-s3-key/example1.json")
         self.assertEqual((expected, expected_tb), (returned, returned_tb))
 
         # Test file size check exception:
         mock_get_object.return_value = {}
         expected, expected_tb = None, self.example_traceback
-        returned, returned_tb = rorschach_obj._check_single_file_size(example_item, "random-s3-key/example.json")
+        returned, returned_tb = rorschach_obj._check_single_file_size(example_item, "random-s3-key/example2.json")
         self.assertEqual(expected, returned)
         self.assertTrue(self.example_traceback in returned_tb)
 
@@ -940,6 +1185,15 @@ def test_create_generic_result(self):
             returned['dt_created'] = '2020-12-15T00:00:00+00:00'
             self.assertEqual(expected, returned)
 
+        # Test the prefixes whose listing stopped early are reported in the snapshot, whichever item stopped first:
+        rorschach_obj.stopped_early_prefixes.extend(['s3://bucket/some/path/', 's3://bucket/other/path/'])
+        returned = rorschach_obj._create_generic_result(False, False, '')
+        self.assertEqual(returned.to_dict()['snapshot'],
+                         {'stopped_early': ['s3://bucket/other/path/', 's3://bucket/some/path/']})
+        # Test their empty file check is reported as partial in the details:
+        self.assertEqual(returned.details, "{}\n\n".format(MESSAGES.get("success_partial_empty_check").format(
+            's3://bucket/other/path/\ns3://bucket/some/path/')))
+
     def test_create_invalid_event_result(self):
         """
         test watchmen.process.rorschach :: Rorschach :: _create_invalid_event_result
@@ -1007,10 +1261,210 @@ def test_create_summary_parameters(self, mock_details):
             returned = rorschach_obj._create_summary_parameters(processed_target_example)
             self.assertEqual(expected, returned)
 
+    @patch('watchmen.process.rorschach.Rorschach._get_inventory_index')
+    @patch('watchmen.process.rorschach.Rorschach._generate_prefixes')
+    @patch('watchmen.process.rorschach._s3.generate_pages')
+    def test_generate_contents_inventory(self, mock_pages, mock_prefixes, mock_inventory):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _generate_contents from an S3 Inventory, without max_items
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "prefix": "some/path/", "max_items": 1, "offset_type": "Daily",
+                "inventory_prefix": "inventory/bucket/daily/"}
+        index = InventoryIndex()
+        for content in self.example_contents:
+            index.add(content['Key'], content['Size'], content['LastModified'])
+        index.add('some/other/path/file.json', 10, None)
+        mock_inventory.return_value = index
+        mock_prefixes.return_value = ['some/path/', 'some/other/'], None
+
+        returned_dict, returned_tb = rorschach_obj._generate_contents(item)
+        self.assertIsNone(returned_tb)
+        # Every generated prefix is counted in full despite max_items:
+        self.assertEqual(returned_dict.get("count"), len(self.example_contents) + 1)
+        self.assertEqual(returned_dict.get("aggregate").total_size, 310)
+        mock_inventory.assert_called_once_with(item)
+        mock_pages.assert_not_called()
+
+    @patch('watchmen.process.rorschach.Rorschach._generate_prefixes')
+    @patch('watchmen.process.rorschach._s3.generate_pages')
+    def test_generate_contents_stop_early(self, mock_pages, mock_prefixes):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _generate_contents stops listing once the thresholds are met
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "prefix": "some/path/", "offset_type": "Daily", "early_exit": True,
+                "partial_empty_check": True, "min_total_files": 2, "min_total_size_kb": 0.15}
+        mock_prefixes.return_value = ['some/path/to/', 'some/other/path/'], None
+        listed = []
+
+        def list_pages(prefix, **kwargs):
+            for content in self.example_contents:
+                listed.append(content)
+                yield content
+
+        mock_pages.side_effect = list_pages
+        returned_dict, returned_tb = rorschach_obj._generate_contents(item)
+        self.assertIsNone(returned_tb)
+        self.assertEqual((returned_dict.get("count"), returned_dict.get("stopped_early")), (2, True))
+        self.assertEqual((len(listed), mock_pages.call_count), (2, 1))
+        self.assertEqual(rorschach_obj.stopped_early_prefixes, ['s3://bucket/some/path/to/'])
+
+        # Test the listing is complete when the thresholds are not met, or a check needs every file:
+        for test_item in [dict(item, min_total_files=10), dict(item, suffix=".parquet"), dict(item, early_exit=False),
+                          dict(item, partial_empty_check=False)]:
+            listed = []
+            rorschach_obj.listing_cache.clear()
+            returned_dict, returned_tb = rorschach_obj._generate_contents(test_item)
+            self.assertFalse(returned_dict.get("stopped_early"))
+            self.assertEqual(len(listed), 2 * len(self.example_contents))
+
+    def test_can_stop_early(self):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _can_stop_early
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"early_exit": True, "partial_empty_check": True, "min_total_files": 10}
+        self.assertTrue(rorschach_obj._can_stop_early(item))
+        self.assertTrue(rorschach_obj._can_stop_early({"early_exit": True, "partial_empty_check": True,
+                                                       "min_total_size_kb": 10}))
+        # Test the listing is complete unless the item opts out of looking for empty files among every file:
+        for test_item in [{"min_total_files": 10}, {"early_exit": True}, dict(item, suffix=".gz"),
+                          dict(item, min_lines=10), dict(item, min_total_rows=10),
+                          {"early_exit": True, "min_total_files": 10}]:
+            self.assertFalse(rorschach_obj._can_stop_early(test_item), test_item)
+
+    @patch('watchmen.process.rorschach.arrivals.get_counter_store')
+    @patch('watchmen.process.rorschach.Rorschach._get_time_window')
+    @patch('watchmen.process.rorschach.Rorschach._generate_prefixes')
+    @patch('watchmen.process.rorschach._s3.generate_pages')
+    def test_generate_contents_arrival_counters(self, mock_pages, mock_prefixes, mock_window, mock_store):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _generate_contents counts the files from the arrival counters
+        """
+        rorschach_obj = self._create_rorschach()
+        start_time = datetime.datetime(2020, 6, 1, 14, tzinfo=pytz.utc)
+        mock_window.return_value = start_time, start_time + datetime.timedelta(hours=1)
+        counter_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, counter_dir)
+        store = arrivals.LocalCounterStore(os.path.join(counter_dir, 'counters.json'))
+        mock_store.return_value = store
+
+        def arrival(key_name, size, minutes):
+            return 'bucket', key_name, size, (start_time + datetime.timedelta(minutes=minutes)).timestamp(), None
+
+        store.add_arrivals([
+            arrival('logs/hour=13/a.json', 10, -50),
+            arrival('logs/hour=14/a.json', 100, 5),
+            arrival('logs/hour=14/b.json', 0, 55),
+            arrival('logs/hour=15/a.json', 10, 61),
+            arrival('logs/mixed/a.json', 10, -5),
+            arrival('logs/mixed/b.json', 10, 5),
+        ])
+        # The prefixes the counters cannot answer for are listed: a straddling partition, a prefix without a counter,
+        # and a prefix that is not a partition:
+        mock_prefixes.return_value = [
+            'logs/hour=13/', 'logs/hour=14/', 'logs/hour=15/', 'logs/mixed/', 'logs/hour=16/', 'logs/hour=1'], None
+        mock_pages.side_effect = lambda prefix, **kwargs: iter([{
+            'Key': prefix + 'listed.json', 'Size': 1000, 'LastModified': start_time + datetime.timedelta(minutes=30)}])
+        item = {"bucket_name": "bucket", "prefix": "logs/hour=%H/", "offset_type": "Hourly", "arrival_counters": True}
+
+        returned_dict, returned_tb = rorschach_obj._generate_contents(item)
+        self.assertIsNone(returned_tb)
+        aggregate = returned_dict.get("aggregate")
+        self.assertEqual((aggregate.count, aggregate.total_size, aggregate.empty_count), (5, 3100, 1))
+        self.assertEqual([call[0][0] for call in mock_pages.call_args_list],
+                         ['logs/mixed/', 'logs/hour=16/', 'logs/hour=1'])
+
+        # Test the items with checks that need the files are listed:
+        self.assertTrue(rorschach_obj._can_use_arrival_counters(item))
+        for test_item in [dict(item, arrival_counters=False), dict(item, suffix=".json"), dict(item, whitelist=["a"]),
+                          dict(item, min_lines=10), dict(item, expected_columns=["a"])]:
+            self.assertFalse(rorschach_obj._can_use_arrival_counters(test_item), test_item)
+
+    @patch('watchmen.process.rorschach.Rorschach._get_time_window')
+    @patch('watchmen.process.rorschach.Rorschach._generate_prefixes')
+    @patch('watchmen.process.rorschach._s3.generate_pages')
+    def test_generate_contents_start_after(self, mock_pages, mock_prefixes, mock_window):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _generate_contents lists time-ordered keys after the window
+        start
+        """
+        rorschach_obj = self._create_rorschach()
+        start_time = datetime.datetime(2020, 6, 1, 9, 30, tzinfo=pytz.utc)
+        mock_window.return_value = start_time, start_time + datetime.timedelta(hours=1)
+        mock_prefixes.return_value = ['logs/20200601/'], None
+        mock_pages.return_value = iter([])
+        item = {"bucket_name": "bucket", "prefix": "logs/%0Y%0m%0d/", "offset_type": "Hourly",
+                "start_after": "logs/%0Y%0m%0d/%0Y%0m%0dT%0H%0M"}
+
+        returned_dict, returned_tb = rorschach_obj._generate_contents(item)
+        self.assertIsNone(returned_tb)
+        self.assertEqual(mock_pages.call_args[1]['start_after'], 'logs/20200601/20200601T0930')
+
+        # Test the start_after format is ignored for events without a time window:
+        mock_pages.reset_mock()
+        mock_pages.return_value = iter([])
+        rorschach_obj._generate_contents(dict(item, offset_type="Daily"))
+        self.assertIsNone(mock_pages.call_args[1]['start_after'])
+
+    @patch('watchmen.process.rorschach._datetime')
+    def test_generate_day_overlap_prefixes(self, mock_datetime):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _generate_day_overlap_prefixes per day, hour or minute
+        """
+        mock_datetime.timedelta = datetime.timedelta
+        mock_datetime.datetime.now.return_value = datetime.datetime(2020, 6, 2, 0, 30, 15, tzinfo=pytz.utc)
+        rorschach_obj = self._create_rorschach()
+        tests = [
+            ('logs/day=%0d/', 'Hourly', 1, ['logs/day=01/', 'logs/day=02/']),
+            ('logs/day=%0d/', 'Minutely', 10, ['logs/day=02/']),
+            ('logs/day=%0d/hour=%0H/', 'Hourly', 2,
+             ['logs/day=01/hour=22/', 'logs/day=01/hour=23/', 'logs/day=02/hour=00/']),
+            ('logs/day=%0d/hour=%-H/', 'Minutely', 10, ['logs/day=02/hour=0/']),
+            ('logs/%0d%0H%0M', 'Minutely', 2, ['logs/020028', 'logs/020029', 'logs/020030']),
+            ('logs/%0d%0H%0M', 'Minutely', 4, ['logs/020026', 'logs/020027', 'logs/020028', 'logs/020029',
+                                               'logs/020030']),
+            ('logs/%0d%0H%0M', 'Minutely', 5, ['logs/0200']),
+            ('logs/day=%0d/hour=%0H/minute=%0M/', 'Minutely', 45,
+             ['logs/day=01/hour=23/minute=', 'logs/day=02/hour=00/minute=']),
+            ('logs/%0d/%0H:%0M/', 'Hourly', 1, ['logs/01/23:', 'logs/02/00:']),
+            ('logs/%0d/%R/', 'Minutely', 45, ['logs/01/', 'logs/02/']),
+        ]
+        for prefix_format, offset_type, time_offset, expected in tests:
+            result = rorschach_obj._generate_day_overlap_prefixes(prefix_format, offset_type, time_offset)
+            self.assertEqual(result, expected, prefix_format)
+
+    @patch('watchmen.process.rorschach._s3.load_inventory')
+    @patch('watchmen.process.rorschach._s3.find_inventory_manifest')
+    def test_get_inventory_index(self, mock_find_manifest, mock_load_inventory):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _get_inventory_index loads each inventory once per run
+        """
+        rorschach_obj = self._create_rorschach()
+        item = {"bucket_name": "bucket", "inventory_prefix": "inventory/bucket/daily/",
+                "inventory_bucket": "inventory-bucket"}
+        mock_find_manifest.return_value = "inventory/bucket/daily/2020-06-01T00-00Z/manifest.json"
+        mock_load_inventory.return_value = InventoryIndex(source_bucket="bucket")
+
+        self.assertEqual(rorschach_obj._get_inventory_index(item), mock_load_inventory.return_value)
+        self.assertEqual(rorschach_obj._get_inventory_index(dict(item)), mock_load_inventory.return_value)
+        mock_find_manifest.assert_called_once_with("inventory/bucket/daily/", "inventory-bucket")
+        mock_load_inventory.assert_called_once_with(mock_find_manifest.return_value, "inventory-bucket")
+
+        # Test an inventory of another bucket:
+        with self.assertRaises(ValueError):
+            rorschach_obj._get_inventory_index(dict(item, bucket_name="other-bucket"))
+
+        # Test a missing manifest:
+        mock_find_manifest.return_value = None
+        with self.assertRaises(ValueError):
+            rorschach_obj._get_inventory_index({"bucket_name": "bucket", "inventory_prefix": "missing/"})
+        mock_find_manifest.assert_called_with("missing/", "bucket")
+
     @patch('watchmen.process.rorschach.Rorschach._generate_prefixes')
     @patch('watchmen.process.rorschach._s3.generate_pages')
-    @patch('watchmen.process.rorschach.Rorschach._remove_whitelisted_files_from_contents')
-    def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
+    def test_generate_contents(self, mock_pages, mock_prefixes):
         """
         test watchmen.process.rorschach :: Rorschach :: _generate_contents
         """
@@ -1019,23 +1473,31 @@ def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
 
         # Test successful _generate_contents call
         mock_prefixes.return_value = ['some/path/to/'], None
-        mock_pages.return_value = self.example_contents
-
-        expected_dict = {
-            "contents": self.example_contents,
-            "count": len(self.example_contents),
-            "s3_prefix": 's3://bucket/some/path/to/'
-        }
-        expected_tb = None
+        mock_pages.return_value = iter(self.example_contents)
 
         returned_dict, returned_tb = rorschach_obj._generate_contents(item)
-        self.assertEqual((expected_dict, expected_tb), (returned_dict, returned_tb))
+        self.assertIsNone(returned_tb)
+        self.assertEqual(returned_dict.get("count"), len(self.example_contents))
+        self.assertEqual(returned_dict.get("s3_prefix"), 's3://bucket/some/path/to/')
+        aggregate = returned_dict.get("aggregate")
+        self.assertEqual((aggregate.total_size, aggregate.empty_keys, aggregate.suffix_mismatches),
+                         (300, [self.example_contents[3]['Key']], [self.example_contents[3]['Key']]))
+
+        # Test the complete listing is cached for the run, and serves the prefixes under it:
+        mock_pages.reset_mock()
+        mock_prefixes.return_value = ['some/path/to/something.p'], None
+        returned_dict, returned_tb = rorschach_obj._generate_contents(item)
+        self.assertEqual(returned_dict.get("count"), 3)
+        mock_pages.assert_not_called()
+        self.assertEqual((rorschach_obj.listing_cache.hits, rorschach_obj.listing_cache.misses), (1, 1))
+        mock_prefixes.return_value = ['some/path/to/'], None
 
         # Testing exception:
         expected_dict = {
-            "contents": None,
+            "aggregate": None,
             "count": None,
-            "s3_prefix": None
+            "s3_prefix": None,
+            "stopped_early": False
         }
 
         returned_dict, returned_tb = rorschach_obj._generate_contents(None)
@@ -1043,12 +1505,6 @@ def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
         self.assertTrue(self.example_traceback in returned_tb)
 
         # Testing exception:
-        expected_dict = {
-            "contents": None,
-            "count": None,
-            "s3_prefix": None
-        }
-
         mock_prefixes.return_value = None, self.example_traceback
         returned_dict, returned_tb = rorschach_obj._generate_contents(item)
         self.assertEqual(returned_dict, expected_dict)
@@ -1059,15 +1515,17 @@ def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
                 "prefix": "dns-logs-others/customer=302886/year=%0Y/month=%0m/day=%0d/",
                 "suffix": ".parquet",
                 "min_total_size_kb": 50,
-                'max_items': 0,
+                'max_items': 1,
                 'offset_type': 'Daily'
                }
 
-        expected = {'contents': [], 'count': 0, 's3_prefix': 's3://bucket/some/path/to/'}
-        mock_prefixes.return_value = ['some/path/to/'], None
-        mock_pages.return_value = {}
+        mock_prefixes.return_value = ['some/path/to/', 'some/other/path/'], None
+        mock_pages.reset_mock()
+        rorschach_obj.listing_cache.clear()
+        mock_pages.return_value = iter(self.example_contents[:1])
         returned_dict, returned_tb = rorschach_obj._generate_contents(max_item)
-        self.assertEqual(returned_dict, expected)
+        self.assertEqual((returned_dict.get("count"), returned_dict.get("s3_prefix")), (1, 's3://bucket/some/path/to/'))
+        mock_pages.assert_called_once()
 
         # Test trim contents
         max_item = {
@@ -1075,15 +1533,25 @@ def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
                 "prefix": "dns-logs-others/customer=302886/year=%0Y/month=%0m/day=%0d/",
                 "suffix": ".parquet",
                 "min_total_size_kb": 50,
-                'max_items': 1,
+                'max_items': 10,
                 'offset_type': 'Hourly'
                }
 
-        expected = {'contents': [], 'count': 0, 's3_prefix': 's3://bucket/some/path/to/'}
+        recent_file = {
+            'Key': 'some/path/to/recent.parquet',
+            'Size': 100,
+            'LastModified': datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=30)
+        }
+        old_file = {
+            'Key': 'some/path/to/old.parquet',
+            'Size': 100,
+            'LastModified': datetime.datetime.now(pytz.utc) - datetime.timedelta(days=3)
+        }
         mock_prefixes.return_value = ['some/path/to/'], None
-        mock_pages.return_value = {}
+        rorschach_obj.listing_cache.clear()
+        mock_pages.return_value = iter([old_file, recent_file])
         returned_dict, returned_tb = rorschach_obj._generate_contents(max_item)
-        self.assertEqual(returned_dict, expected)
+        self.assertEqual((returned_dict.get("count"), returned_dict.get("aggregate").listed), (1, 2))
 
         # Test whitelist
         max_item = {
@@ -1091,15 +1559,16 @@ def test_generate_contents(self, mock_whitelist, mock_pages, mock_prefixes):
                 "prefix": "dns-logs-others/customer=302886/year=%0Y/month=%0m/day=%0d/",
                 "suffix": ".parquet",
                 "min_total_size_kb": 50,
-                'max_items': 1,
-                'whitelist': 'test'
+                'max_items': 10,
+                'whitelist': ['something.json']
                }
 
-        expected = {'contents': [], 'count': 0, 's3_prefix': 's3://bucket/some/path/to/'}
         mock_prefixes.return_value = ['some/path/to/'], None
-        mock_pages.return_value = {}
+        rorschach_obj.listing_cache.clear()
+        mock_pages.return_value = iter(self.example_contents)
         returned_dict, returned_tb = rorschach_obj._generate_contents(max_item)
-        self.assertEqual(returned_dict, expected)
+        self.assertEqual(returned_dict.get("count"), 3)
+        self.assertEqual(returned_dict.get("aggregate").empty_count, 0)
 
     def test_generate_key(self):
         """
@@ -1203,7 +1672,7 @@ def test_generate_prefixes(self):
                 self.assertIsNotNone(tb)
 
     @patch('builtins.open', new_callable=mock_open())
-    @patch('watchmen.process.rorschach.yaml.load')
+    @patch('watchmen.common.target_plans.yaml.load')
     def test_load_config(self, mock_file, mock_open):
         """
         test watchmen.process.rorschach :: Rorschach :: _load_config
@@ -1213,12 +1682,14 @@ def test_load_config(self, mock_file, mock_open):
             rorschach_obj = self._create_rorschach()
 
             # Testing successful load of config file:
+            target_plans.clear_cache()
             mock_file.return_value = self.example_config_file
             expected = self.example_config_file['Daily']['00']
             returned, returned_tb = rorschach_obj._load_config(['Daily', '00'])
             self.assertEqual((expected, None), (returned, returned_tb))
 
             # Testing exception while loading config file:
+            target_plans.clear_cache()
             mock_file.return_value = None
             mock_open.side_effect = Exception
             returned, returned_msg = rorschach_obj._load_config('')
@@ -1308,6 +1779,30 @@ def test_parse_event(self, mock_tb):
             result = test_rorschach._parse_event()
             self.assertEqual(expected, result)
 
+    @patch('watchmen.process.rorschach._s3.head_objects')
+    def test_prefetch_single_files(self, mock_head_objects):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _prefetch_single_files
+        """
+        rorschach_obj = self._create_rorschach()
+        rorschach_obj.event = "Daily"
+        item = {"bucket_name": "bucket", "full_path": "some/{var}/file.json", "path_vars": ["a", "b"]}
+        mock_head_objects.return_value = {
+            "some/a/file.json": {"Exists": True, "ContentLength": 10},
+            "some/b/file.json": {"Exists": False},
+        }
+        rorschach_obj._prefetch_single_files(item, ["some/a/file.json", "some/b/file.json"])
+        mock_head_objects.assert_called_once_with("bucket", ["some/a/file.json", "some/b/file.json"], client=None)
+
+        # Both keys are memoized now:
+        self.assertTrue(rorschach_obj._check_single_file_existence(item, "some/a/file.json")[0])
+        self.assertFalse(rorschach_obj._check_single_file_existence(item, "some/b/file.json")[0])
+        self.assertEqual(mock_head_objects.call_count, 1)
+
+        # Errors while prefetching are left to the single file checks:
+        mock_head_objects.side_effect = Exception
+        rorschach_obj._prefetch_single_files(item, ["some/c/file.json"])
+
     @patch('watchmen.process.rorschach._s3.check_bucket')
     @patch('watchmen.process.rorschach.Rorschach._check_single_file')
     @patch('watchmen.process.rorschach.Rorschach._check_multiple_files')
@@ -1343,28 +1838,56 @@ def test_process_checking(self, mock_multiple_files_check, mock_single_file_chec
         returned = rorschach_obj._process_checking([self.process_checking_examples[0]])
         self.assertEqual(expected, returned)
 
-    def test_remove_whitelisted_files_from_contents(self):
+    @patch('watchmen.process.rorschach._s3.check_bucket')
+    @patch('watchmen.process.rorschach.Rorschach._check_multiple_files')
+    def test_process_checking_concurrent(self, mock_multiple_files_check, mock_bucket_check):
         """
-        test watchmen.process.rorschach :: Rorschach :: _remove_whitelisted_files_from_contents
+        test watchmen.process.rorschach :: Rorschach :: _process_checking checks items concurrently, keeps the config
+        order of the results and isolates the exceptions of each item
         """
         rorschach_obj = self._create_rorschach()
-        example_whitelist = ['something.json']
-        expected_returned_contents = [{
-            'Key': 'some/path/to/something.parquet',
-            'Size': 100,
-            'LastModified': datetime.datetime(2020, 5, 20, 0, 20, 29)
-        }, {
-            'Key': 'some/path/to/something.parquet',
-            'Size': 100,
-            'LastModified': datetime.datetime(2020, 5, 20, 0, 21, 29)
-        }, {
-            'Key': 'some/path/to/something.parquet',
-            'Size': 100,
-            'LastModified': datetime.datetime(2020, 5, 20, 0, 22, 29)
-        }]
+        mock_bucket_check.return_value = (True, None)
+        targets = [{'target_name': 'target {}'.format(target_index), 'items': [
+            {'bucket_name': 'bucket', 'prefix': 'prefix/{}/{}/'.format(target_index, item_index)}
+            for item_index in range(3)]} for target_index in range(4)]
+
+        def check_multiple_files(item):
+            # The first items are the slowest, so they complete last:
+            target_index, item_index = [int(part) for part in item['prefix'].split('/')[1:3]]
+            time.sleep(0.01 * (12 - target_index * 3 - item_index))
+            if item['prefix'] == 'prefix/2/1/':
+                raise ValueError('Unexpected error')
+            return [], ['failure {}'.format(item['prefix'])]
+
+        mock_multiple_files_check.side_effect = check_multiple_files
+        returned = rorschach_obj._process_checking(targets)
+
+        self.assertEqual(list(returned), ['target 0', 'target 1', 'target 2', 'target 3'])
+        self.assertEqual(returned['target 0']['failure_strings'],
+                         ['failure prefix/0/0/', 'failure prefix/0/1/', 'failure prefix/0/2/'])
+        self.assertEqual(returned['target 2']['failure_strings'], ['failure prefix/2/0/', 'failure prefix/2/2/'])
+        self.assertEqual(len(returned['target 2']['exception_strings']), 1)
+        self.assertIn('ValueError: Unexpected error', returned['target 2']['exception_strings'][0])
+        self.assertEqual(returned['target 3']['exception_strings'], [])
+
+        # Test the items are checked one after another with one worker:
+        with patch('watchmen.process.rorschach.MAX_WORKERS', 1):
+            self.assertEqual(rorschach_obj._get_max_workers(), 1)
+            self.assertEqual(rorschach_obj._process_checking(targets), returned)
+
+    @patch('watchmen.process.rorschach.get_uint')
+    def test_get_max_workers(self, mock_get_uint):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _get_max_workers per schedule
+        """
+        rorschach_obj = self._create_rorschach()
+        rorschach_obj.event = 'Minutely'
+        mock_get_uint.return_value = 4
+        self.assertEqual(rorschach_obj._get_max_workers(), 4)
+        mock_get_uint.assert_called_with('rorschach.schedule_max_workers.Minutely', rorschach.MAX_WORKERS)
 
-        returned = rorschach_obj._remove_whitelisted_files_from_contents(example_whitelist, self.example_contents)
-        self.assertEqual(returned, expected_returned_contents)
+        mock_get_uint.return_value = 0
+        self.assertEqual(rorschach_obj._get_max_workers(), 1)
 
     def test_trim_contents(self):
 
@@ -1391,3 +1914,180 @@ def test_trim_contents(self):
         returned = rorschach_obj._trim_contents(example_contents, 1, "Hourly")
         returned[0]['LastModified'] = returned[0]['LastModified'].replace(second=0, microsecond=0)
         self.assertEqual(example_return_hourly, returned)
+
+    def test_get_due_schedules(self):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _get_due_schedules and _is_schedule_due
+        """
+        rorschach_obj = self._create_rorschach()
+        schedules = ['Minutely,00', 'Hourly,59', 'Hourly,00', 'Daily,15:00', 'Weekly,Mon,15:00', 'Monthly,26,15:00',
+                     'Weekly,15:00', 'Hourly,xx']
+        # 2020-05-25 is a Monday:
+        start_time = datetime.datetime(2020, 5, 25, 14, 55, tzinfo=pytz.utc)
+        end_time = datetime.datetime(2020, 5, 25, 15, 10, tzinfo=pytz.utc)
+        returned = rorschach_obj._get_due_schedules(schedules, start_time, end_time)
+        self.assertEqual([
+            (datetime.datetime(2020, 5, 25, 14, 59, tzinfo=pytz.utc), {'Hourly': '59'}),
+            (datetime.datetime(2020, 5, 25, 15, 0, tzinfo=pytz.utc), {'Minutely': '00'}),
+            (datetime.datetime(2020, 5, 25, 15, 0, tzinfo=pytz.utc), {'Hourly': '00'}),
+            (datetime.datetime(2020, 5, 25, 15, 0, tzinfo=pytz.utc), {'Daily': '15:00'}),
+            (datetime.datetime(2020, 5, 25, 15, 0, tzinfo=pytz.utc), {'Weekly': 'Mon,15:00'}),
+            (datetime.datetime(2020, 5, 25, 15, 10, tzinfo=pytz.utc), {'Minutely': '00'}),
+        ], returned)
+
+        self.assertTrue(rorschach_obj._is_schedule_due(
+            'Monthly', ['26', '15:00'], datetime.datetime(2020, 5, 26, 15, 0, tzinfo=pytz.utc)))
+        self.assertEqual(rorschach_obj._get_due_schedules(schedules, end_time, end_time), [])
+
+    @patch('watchmen.process.rorschach._datetime')
+    def test_get_sweep_window(self, mock_datetime):
+        """
+        test watchmen.process.rorschach :: Rorschach :: _get_sweep_window
+        """
+        rorschach_obj = self._create_rorschach()
+        now = datetime.datetime(2020, 5, 25, 15, 3, 30, tzinfo=pytz.utc)
+        mock_datetime.datetime.now.return_value = now
+        mock_datetime.timedelta = datetime.timedelta
+        end_time = datetime.datetime(2020, 5, 25, 15, 3, tzinfo=pytz.utc)
+
+        tests = [
+            ((None, None), (end_time - datetime.timedelta(minutes=rorschach.SWEEP_MINUTES), end_time)),
+            (("2020-05-25T14:00:00Z", "2020-05-25T15:00:00+00:00"),
+             (datetime.datetime(2020, 5, 25, 14, tzinfo=pytz.utc),
+              datetime.datetime(2020, 5, 25, 15, tzinfo=pytz.utc))),
+            (("2020-05-25T14:00:00", None), (datetime.datetime(2020, 5, 25, 14, tzinfo=pytz.utc), end_time)),
+            ((pytz.timezone('US/Eastern').localize(datetime.datetime(2020, 5, 25, 10)), None),
+             (datetime.datetime(2020, 5, 25, 14, tzinfo=pytz.utc), end_time)),
+        ]
+        for window, expected in tests:
+            self.assertEqual((expected, None), rorschach_obj._get_sweep_window(*window))
+
+        for window in [("2020-05-25T16:00:00Z", None), ("not a time", None), (None, "2020-05-25T15:00:00Z-later")]:
+            returned, tb = rorschach_obj._get_sweep_window(*window)
+            self.assertIsNone(returned)
+            self.assertIsNotNone(tb)
+
+    @patch('watchmen.process.rorschach.target_plans.load_plan')
+    @patch('watchmen.process.rorschach.Rorschach._check_item')
+    def test_sweep(self, mock_check_item, mock_load_plan):
+        """
+        test watchmen.process.rorschach :: Rorschach :: sweep
+        """
+        item = self.example_config_file['Daily']['00'][0]['items'][1]
+        daily_item = dict(item, offset_type='Daily', prefix_offset_type='Daily')
+        mock_load_plan.return_value = {'schedules': {
+            'Hourly,00': [{'target_name': 'hourly', 'items': [item, daily_item]}],
+            'Daily,15:00': [{'target_name': 'daily', 'items': [daily_item]}],
+        }}
+        check_times = []
+
+        def check_item(checked_item):
+            check_times.append(rorschach_obj._get_now())
+            return [], ['failure {}'.format(checked_item.get('offset_type'))]
+
+        mock_check_item.side_effect = check_item
+        rorschach_obj = self._create_rorschach()
+        returned = rorschach_obj.sweep("2020-05-25T13:30:00Z", "2020-05-25T15:00:00Z")
+
+        self.assertEqual([{'Hourly': '00'}, {'Hourly': '00'}, {'Daily': '15:00'}], [event for event, _ in returned])
+        self.assertEqual([['hourly', rorschach.GENERIC_TARGET]] * 2 + [['daily', rorschach.GENERIC_TARGET]],
+                         [[result.target for result in results] for _, results in returned])
+        self.assertIn('failure Daily', returned[2][1][0].details)
+        self.assertNotIn('failure None', returned[2][1][0].details)
+        # The item of the Daily schedule at 15:00 has the Daily offset types, as in the Hourly schedule at 15:00, so it
+        # is not checked again:
+        self.assertEqual([datetime.datetime(2020, 5, 25, 14, tzinfo=pytz.utc)] * 2 +
+                         [datetime.datetime(2020, 5, 25, 15, tzinfo=pytz.utc)] * 2, check_times)
+        self.assertEqual(mock_check_item.call_count, 4)
+        self.assertIsNone(rorschach_obj.check_time)
+        self.assertIsNone(rorschach_obj.item_results)
+
+        # Test an invalid window and a config that cannot be loaded:
+        returned = rorschach_obj.sweep("2020-05-25T15:00:00Z", "2020-05-25T14:00:00Z")
+        self.assertEqual(returned[0][1][0].subject, MESSAGES.get("exception_invalid_event_subject"))
+        mock_load_plan.side_effect = ValueError('Invalid s3 target config')
+        returned = rorschach_obj.sweep("2020-05-25T14:00:00Z", "2020-05-25T15:00:00Z")
+        self.assertEqual(returned[0][1][0].subject, MESSAGES.get("exception_config_load_failure_subject"))
+
+    @patch('watchmen.process.rorschach.arrivals.get_counter_store')
+    @patch('watchmen.process.rorschach.Rorschach._load_request_timings')
+    @patch('watchmen.process.rorschach.target_plans.load_plan')
+    def test_explain_arrival_counters(self, mock_load_plan, mock_timings, mock_store):
+        """
+        test watchmen.process.rorschach :: Rorschach :: explain leaves the arrival counters alone unless given a store
+        """
+        mock_timings.return_value = rorschach._s3.RequestTimings()
+        mock_load_plan.return_value = {'schedules': {'Hourly,00': [{'target_name': 'target', 'items': [
+            {'bucket_name': 'bucket', 'prefix': 'logs/%0Y/%0m/%0d/%0H/', 'time_offset': 1, 'arrival_counters': True},
+        ]}]}}
+        rorschach_obj = Rorschach(context=None, event=self.example_event_hourly)
+
+        explanation, tb = rorschach_obj.explain('2020-05-26T14:00:00Z')
+        self.assertIsNone(tb)
+        self.assertEqual(explanation['targets'][0]['items'][0]['requests'],
+                         {'ListObjects': [2, 4], 'HeadBucket': [1, 1]})
+        mock_store.assert_not_called()
+
+        client = Mock()
+        store = arrivals.DynamoCounterStore('counters', client=client)
+        explanation, tb = rorschach_obj.explain('2020-05-26T14:00:00Z', counter_store=store)
+        self.assertEqual(explanation['targets'][0]['items'][0]['requests'],
+                         {'GetItem': [2, 2], 'ListObjects': [0, 4], 'HeadBucket': [1, 1]})
+        self.assertEqual(client.mock_calls, [])
+
+        # Test the command line explains them with the counter store of the config when asked:
+        mock_store.return_value = store
+        with patch('watchmen.process.rorschach.print', create=True) as mock_print:
+            self.assertEqual(rorschach.main(['{"Hourly": "00"}', '--arrival-counters', '2020-05-26T14:00:00Z']), 0)
+        mock_store.assert_called_once_with()
+        self.assertIn('"GetItem"', mock_print.call_args[0][0])
+
+    @patch('watchmen.process.rorschach.Rorschach._get_max_workers', return_value=2)
+    @patch('watchmen.process.rorschach.Rorschach._load_request_timings')
+    @patch('watchmen.process.rorschach.target_plans.load_plan')
+    @patch('watchmen.process.rorschach._s3.check_bucket')
+    def test_explain(self, mock_check_bucket, mock_load_plan, mock_timings, mock_max_workers):
+        """
+        test watchmen.process.rorschach :: Rorschach :: explain
+        """
+        mock_timings.return_value = rorschach._s3.RequestTimings({'ListObjects': 0.5})
+        mock_load_plan.return_value = {'schedules': {'Hourly,00': [{'target_name': 'target', 'items': [
+            {'bucket_name': 'bucket', 'prefix': 'logs/%0Y/%0m/%0d/%0H/', 'time_offset': 2, 'max_items': 2500,
+             'min_total_rows': 1},
+            {'bucket_name': 'bucket', 'full_path': 'files/{var}/%0Y%0m%0d.gz', 'path_vars': ['a', 'b'],
+             'verify_gzip': True, 'prefix_offset_type': 'Daily', 'prefix_offset': 1},
+            {'bucket_name': 'other', 'prefix': 'data/%0Y/', 'sharded': True},
+        ]}]}}
+        rorschach_obj = Rorschach(context=None, event=self.example_event_hourly)
+        explanation, tb = rorschach_obj.explain('2020-05-26T14:00:00Z')
+
+        self.assertIsNone(tb)
+        self.assertEqual(explanation['check_time'], '2020-05-26T14:00:00+00:00')
+        listed, single_files, sharded = explanation['targets'][0]['items']
+        # The prefixes of the hours of the time offset, up to max_items listed in 3-5 pages:
+        self.assertEqual(listed['prefixes'], ['logs/2020/05/26/{}/'.format(hour) for hour in ('12', '13', '14')])
+        self.assertEqual(listed['requests'], {'ListObjects': [3, 5], 'GetObject': [0, 5000], 'HeadBucket': [1, 1]})
+        self.assertEqual(listed['seconds'], [1.55, 502.55])
+        # The bucket is checked once per run, by its first item:
+        self.assertEqual(single_files['keys'], ['files/a/20200525.gz', 'files/b/20200525.gz'])
+        self.assertEqual(single_files['requests'], {'HeadObject': [2, 2], 'GetObject': [0, 2]})
+        # The number of discovered shards is unknown:
+        self.assertEqual(sharded['requests'], {'ListObjects': [1, None], 'HeadBucket': [1, 1]})
+        self.assertEqual(sharded['seconds'], [0.55, None])
+
+        self.assertEqual(explanation['requests'], {
+            'ListObjects': [4, None], 'GetObject': [0, 5002], 'HeadBucket': [2, 2], 'HeadObject': [2, 2]})
+        # The first item takes a worker, while the two others take the second one:
+        self.assertEqual(explanation['seconds'], [1.55, None])
+        mock_check_bucket.assert_not_called()
+        self.assertIsNone(rorschach_obj.check_time)
+
+        # Test an invalid event, and the command line:
+        explanation, tb = Rorschach(context=None, event={'Type': 'hourly'}).explain()
+        self.assertIsNone(explanation)
+        self.assertIsNotNone(tb)
+        with patch('watchmen.process.rorschach.print', create=True) as mock_print:
+            self.assertEqual(rorschach.main(['{"Hourly": "00"}', '2020-05-26T14:00:00Z']), 0)
+            self.assertIn('"check_time": "2020-05-26T14:00:00+00:00"', mock_print.call_args[0][0])
+            self.assertEqual(rorschach.main(['{"Hourly": "00"}', 'not a time']), 1)
+            self.assertEqual(rorschach.main([]), 1)
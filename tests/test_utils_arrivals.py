@@ -0,0 +1,192 @@
+"""
+Test utils for arrivals module
+"""
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from botocore.exceptions import ClientError
+from mock import MagicMock, patch
+
+from watchmen.utils import arrivals
+
+
+def build_s3_event(objects, event_name='ObjectCreated:Put'):
+    """
+    Build the Lambda event of S3 notifications from a list of (bucket, key, size, event time), optionally followed by
+    the sequencer of the notification
+    """
+    return {'Records': [{
+        'eventVersion': '2.0',
+        'eventSource': 'aws:s3',
+        'eventTime': obj[3],
+        'eventName': event_name,
+        's3': {'bucket': {'name': obj[0]}, 'object': dict(
+            {'key': obj[1], 'size': obj[2]}, **({'sequencer': obj[4]} if len(obj) > 4 else {}))},
+    } for obj in objects]}
+
+
+class TestArrivals(unittest.TestCase):
+    """
+    TestArrivals includes all unit tests for watchmen.utils.arrivals module
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = arrivals.LocalCounterStore(os.path.join(self.temp_dir, 'counters.json'))
+        self.event = build_s3_event([
+            ('bucket', 'logs/day=26/hour=14/part-0.json', 100, '2020-05-26T14:10:00.000Z'),
+            ('bucket', 'logs/day=26/hour=14/part%3D1+copy.json', 0, '2020-05-26T14:20:00.000Z'),
+            ('bucket', 'logs/day=26/hour=15/part-0.json', 50, '2020-05-26T15:05:00.000Z'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_partitions(self):
+        """
+        test watchmen.utils.arrivals.get_partitions
+        """
+        self.assertEqual(arrivals.get_partitions('logs/day=26/part-0.json'), ['logs/', 'logs/day=26/'])
+        self.assertEqual(arrivals.get_partitions('file.json'), [])
+
+    def test_get_arrivals(self):
+        """
+        test watchmen.utils.arrivals.get_arrivals
+        """
+        returned = list(arrivals.get_arrivals(self.event))
+        self.assertEqual(len(returned), 3)
+        self.assertEqual(returned[1][:3], ('bucket', 'logs/day=26/hour=14/part=1 copy.json', 0))
+        self.assertEqual(returned[0][3],
+                         datetime.datetime(2020, 5, 26, 14, 10, tzinfo=datetime.timezone.utc).timestamp())
+        self.assertIsNone(returned[0][4])
+        sequenced_event = build_s3_event([('bucket', 'logs/part-0.json', 0, '2020-05-26T14:10:00Z', '0055AED6DCD9')])
+        self.assertEqual(next(arrivals.get_arrivals(sequenced_event))[4], '0055AED6DCD9')
+
+        # Test the notifications delivered by SNS and SQS, and the other events:
+        sns_event = {'Records': [{'Sns': {'Message': json.dumps(self.event)}}]}
+        sqs_event = {'Records': [{'body': json.dumps(self.event)}]}
+        self.assertEqual(list(arrivals.get_arrivals(sns_event)), returned)
+        self.assertEqual(list(arrivals.get_arrivals(sqs_event)), returned)
+        removed_event = build_s3_event([('bucket', 'logs/part-0.json', 0, '2020-05-26T14:10:00Z')],
+                                       event_name='ObjectRemoved:Delete')
+        self.assertEqual(list(arrivals.get_arrivals(removed_event)), [])
+        self.assertEqual(list(arrivals.get_arrivals({})), [])
+
+    def test_counter_store(self):
+        """
+        test watchmen.utils.arrivals :: CounterStore :: abstract interface
+        """
+        with self.assertRaises(TypeError):
+            arrivals.CounterStore()
+
+    def test_local_counter_store(self):
+        """
+        test watchmen.utils.arrivals :: LocalCounterStore :: add_arrivals and get
+        """
+        self.assertIsNone(self.store.get('bucket', 'logs/'))
+        self.assertEqual(arrivals.count_arrivals(self.event, store=self.store), 3)
+
+        counter = self.store.get('bucket', 'logs/day=26/hour=14/')
+        self.assertEqual((counter['Count'], counter['Size'], counter['EmptyCount']), (2, 100, 1))
+        self.assertEqual(counter['FirstArrival'], datetime.datetime(2020, 5, 26, 14, 10, tzinfo=datetime.timezone.utc))
+        self.assertEqual(counter['LastArrival'], datetime.datetime(2020, 5, 26, 14, 20, tzinfo=datetime.timezone.utc))
+        self.assertEqual(self.store.get('bucket', 'logs/day=26/')['Count'], 3)
+
+        # Test the counts are added to the existing counters:
+        arrivals.count_arrivals(build_s3_event([('bucket', 'logs/day=26/a.json', 10, '2020-05-26T13:00:00Z')]),
+                                store=self.store)
+        counter = self.store.get('bucket', 'logs/day=26/')
+        self.assertEqual((counter['Count'], counter['Size'], counter['EmptyCount']), (4, 160, 1))
+        self.assertEqual(counter['FirstArrival'], datetime.datetime(2020, 5, 26, 13, tzinfo=datetime.timezone.utc))
+        self.assertEqual(counter['LastArrival'], datetime.datetime(2020, 5, 26, 15, 5, tzinfo=datetime.timezone.utc))
+        self.assertIsNone(self.store.get('other-bucket', 'logs/day=26/'))
+
+    def test_dynamo_counter_store(self):
+        """
+        test watchmen.utils.arrivals :: DynamoCounterStore :: add_arrivals and get
+        """
+        client = MagicMock()
+        store = arrivals.DynamoCounterStore('counters', client=client)
+        store.add_arrivals(arrivals.get_arrivals(self.event))
+
+        # One update per partition, with the counts of every object in it:
+        self.assertEqual(client.update_item.call_count, 4)
+        updates = {call[1]['Key']['partition']['S']: call[1]['ExpressionAttributeValues']
+                   for call in client.update_item.call_args_list}
+        self.assertEqual(updates['logs/day=26/'][':count'], {'N': '3'})
+        self.assertEqual(updates['logs/day=26/hour=14/'][':size'], {'N': '100'})
+        self.assertEqual(updates['logs/day=26/hour=14/'][':empty_count'], {'N': '1'})
+
+        client.get_item.return_value = {'Item': {
+            'bucket': {'S': 'bucket'}, 'partition': {'S': 'logs/'},
+            'object_count': {'N': '3'}, 'total_size': {'N': '150'}, 'empty_count': {'N': '1'},
+            'first_arrival': {'N': '1590502200.0'}, 'last_arrival': {'N': '1590505500'},
+        }}
+        counter = store.get('bucket', 'logs/')
+        self.assertEqual((counter['Count'], counter['Size'], counter['EmptyCount']), (3, 150, 1))
+        self.assertEqual(counter['FirstArrival'], datetime.datetime(2020, 5, 26, 14, 10, tzinfo=datetime.timezone.utc))
+        client.get_item.return_value = {}
+        self.assertIsNone(store.get('bucket', 'other/'))
+
+    def test_dynamo_counter_store_redelivery(self):
+        """
+        test watchmen.utils.arrivals :: DynamoCounterStore :: add_arrivals counts a notification delivered again once
+        """
+        client = MagicMock()
+        store = arrivals.DynamoCounterStore('counters', client=client)
+        markers = set()
+
+        def transact_write_items(TransactItems):
+            marker = TransactItems[0]['Put']['Item']
+            if marker['partition']['S'] in markers:
+                raise ClientError({'Error': {'Code': 'TransactionCanceledException'},
+                                   'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}]},
+                                  'TransactWriteItems')
+            markers.add(marker['partition']['S'])
+
+        client.transact_write_items.side_effect = transact_write_items
+        event = build_s3_event([
+            ('bucket', 'logs/day=26/part-0.json', 100, '2020-05-26T14:10:00Z', '0055AED6DCD90281E5'),
+            ('bucket', 'logs/day=26/part-1.json', 0, '2020-05-26T14:20:00Z', '0055AED6DCD90281E6'),
+        ])
+        self.assertEqual(arrivals.count_arrivals(event, store=store), 2)
+        self.assertEqual(arrivals.count_arrivals(event, store=store), 0)
+        self.assertEqual(client.transact_write_items.call_count, 4)
+        client.update_item.assert_not_called()
+
+        # The marker and the counter of every partition of the object are written together:
+        transact_items = client.transact_write_items.call_args_list[0][1]['TransactItems']
+        self.assertEqual(transact_items[0]['Put']['Item']['partition'],
+                         {'S': 'logs/day=26/part-0.json@0055AED6DCD90281E5'})
+        self.assertEqual([item['Update']['Key']['partition']['S'] for item in transact_items[1:]],
+                         ['logs/', 'logs/day=26/'])
+        self.assertEqual(transact_items[1]['Update']['ExpressionAttributeValues'][':count'], {'N': '1'})
+
+        # Test the other errors are raised:
+        client.transact_write_items.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'TransactWriteItems')
+        with self.assertRaises(ClientError):
+            store.add_arrivals(arrivals.get_arrivals(build_s3_event([
+                ('bucket', 'logs/part-2.json', 1, '2020-05-26T14:30:00Z', '0055AED6DCD90281E7')])))
+
+    @patch('watchmen.utils.arrivals.settings')
+    def test_get_counter_store(self, mock_settings):
+        """
+        test watchmen.utils.arrivals.get_counter_store
+        """
+        tests = [
+            ({'arrivals.table': '', 'arrivals.file': ''}, type(None)),
+            ({'arrivals.table': '', 'arrivals.file': 'counters.json'}, arrivals.LocalCounterStore),
+            ({'arrivals.table': 'counters', 'arrivals.file': ''}, arrivals.DynamoCounterStore),
+        ]
+        for config, expected in tests:
+            mock_settings.side_effect = config.get
+            with patch.dict(arrivals._STORE, clear=True), patch('watchmen.utils.arrivals.boto3'):
+                self.assertIsInstance(arrivals.get_counter_store(), expected)
+                self.assertIs(arrivals.get_counter_store(), arrivals.get_counter_store())
+
+        with patch('watchmen.utils.arrivals.get_counter_store', return_value=None):
+            self.assertEqual(arrivals.count_arrivals(self.event), 0)
@@ -0,0 +1,55 @@
+"""
+Test utils for parquet module
+"""
+import unittest
+
+from tests.helpers.parquet_footer import build_parquet_footer
+from watchmen.utils import parquet
+
+
+class TestParquet(unittest.TestCase):
+    """
+    TestParquet includes all unit tests for watchmen.utils.parquet module
+    """
+    def setUp(self):
+        self.schema = [
+            ('query', 6, 0),
+            ('answer', None, 2),
+            ('rdata', 6, 0),
+            ('ttl', 1, 0),
+            ('count', 2, 0),
+        ]
+
+    def test_get_metadata_length(self):
+        """
+        test watchmen.utils.parquet.get_metadata_length
+        """
+        footer = build_parquet_footer(10, self.schema)
+        self.assertEqual(parquet.get_metadata_length(footer), len(footer) - parquet.FOOTER_SIZE)
+        for invalid_footer in [b'', b'PAR1', footer[:-1], b'\x00' * 100]:
+            with self.assertRaises(ValueError):
+                parquet.get_metadata_length(invalid_footer)
+
+    def test_parse_file_metadata(self):
+        """
+        test watchmen.utils.parquet.parse_file_metadata
+        """
+        footer = build_parquet_footer(3000, self.schema, num_row_groups=3)
+        result = parquet.parse_file_metadata(footer[:-parquet.FOOTER_SIZE])
+        self.assertEqual(result, {
+            'NumRows': 3000,
+            'NumRowGroups': 3,
+            'Columns': ['query', 'answer.rdata', 'answer.ttl', 'count'],
+            'Schema': {'query': 'BYTE_ARRAY', 'answer.rdata': 'BYTE_ARRAY', 'answer.ttl': 'INT32', 'count': 'INT64'},
+            'CreatedBy': 'parquet-mr version 1.10.1',
+        })
+
+        # Test many columns (long list header) and a large row count:
+        schema = [('column{}'.format(index), 2, 0) for index in range(20)]
+        footer = build_parquet_footer(2 ** 40, schema)
+        result = parquet.parse_file_metadata(footer[:-parquet.FOOTER_SIZE])
+        self.assertEqual((result['NumRows'], len(result['Columns'])), (2 ** 40, 20))
+
+        # Test truncated metadata:
+        with self.assertRaises(ValueError):
+            parquet.parse_file_metadata(footer[:len(footer) // 2])
@@ -7,13 +7,29 @@
 
 """
 from __future__ import absolute_import
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import pytz
+import shutil
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 import watchmen.utils.s3 as s3
 from watchmen.utils.s3 import CONFIG, validate_file_on_s3, get_file_contents_s3
+import boto3.session as boto3_session
+from botocore.client import Config
 from botocore.exceptions import ClientError, ParamValidationError
+from botocore.response import StreamingBody
 from mock import Mock, MagicMock, patch
 from moto import mock_s3
+from tests.helpers.parquet_footer import build_parquet_footer
 
 
 class TestS3(unittest.TestCase):
@@ -153,6 +169,10 @@ def setUp(self):
         self.example_content_length = {'ContentLength': 200}
         self.example_s3_content = "Example content"
 
+        # cached clients and buckets would otherwise leak from one test's mocked session into the next
+        s3.CLIENT_REGISTRY.clear()
+        s3.BUCKET_CACHE.clear()
+
     def tearDown(self):
         print("\ndone: " + self.id())
 
@@ -204,6 +224,233 @@ def test_check_bucket_true(self, mock_boto3):
         result, tb = s3.check_bucket("any")
         self.assertTrue(result, "should return True on no error")
 
+    def test_token_bucket(self):
+        """
+        test watchmen.utils.s3.TokenBucket allows the burst at once then paces the requests at the rate
+        """
+        now = [0.0]
+        token_bucket = s3.TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+        self.assertEqual([token_bucket.reserve() for _ in range(4)], [0, 0, 0.1, 0.2])
+        now[0] += 1
+        self.assertEqual(token_bucket.reserve(), 0)
+
+    def test_request_governor(self):
+        """
+        test watchmen.utils.s3.RequestGovernor event handlers: pacing, backoff with jitter, retry budget and metrics
+        """
+        now = [0.0]
+        sleeps = []
+        governor = s3.RequestGovernor(rate=1, burst=1, max_attempts=3, retry_budget=3, clock=lambda: now[0],
+                                      sleep=sleeps.append, rand=lambda: 0.5)
+        model = Mock()
+        model.name = 'HeadObject'
+        throttled = (Mock(), {'Error': {'Code': 'SlowDown'}})
+
+        # Pacing per bucket and top-level prefix:
+        contexts = [{}, {}, {}]
+        governor._before_call({'Bucket': 'b', 'Key': 'dns/a'}, model, contexts[0])
+        governor._before_call({'Bucket': 'b', 'Key': 'dns/b'}, model, contexts[1])
+        governor._before_call({'Bucket': 'b', 'Prefix': 'other/'}, model, contexts[2])
+        self.assertEqual(sleeps, [1.0])
+        self.assertEqual((contexts[0]['watchmen_partition'], contexts[0]['watchmen_sent_at']), (('b', 'dns'), 0.0))
+
+        # Backoff on throttling errors only, up to the max attempts; a retry also waits for a token of its partition:
+        request_dict = {'context': contexts[2]}
+        self.assertIsNone(governor._needs_retry((Mock(), {}), 1, model, request_dict))
+        self.assertIsNone(governor._needs_retry(None, 1, model, request_dict, caught_exception=Exception()))
+        self.assertEqual(governor._needs_retry(throttled, 1, model, request_dict), 1.0)
+        self.assertEqual(governor._needs_retry(throttled, 2, model, request_dict), 2.0)
+        self.assertIsNone(governor._needs_retry(throttled, 3, model, request_dict))
+
+        # The retry budget is shared by all requests until reset:
+        self.assertEqual(governor._needs_retry(throttled, 1, model, {'context': {}}), 0.5 * 0.1 * 2)
+        self.assertIsNone(governor._needs_retry(throttled, 1, model, {'context': {}}))
+        governor._after_call({'ResponseMetadata': {'RetryAttempts': 2}}, model)
+        metrics = governor.get_metrics()['HeadObject']
+        self.assertEqual((metrics['calls'], metrics['attempts'], metrics['throttled'], metrics['retries'],
+                          metrics['exhausted']), (3, 3, 5, 3, 2))
+        self.assertEqual(round(metrics['wait_seconds'], 6), round(1.0 + 1.0 + 2.0 + 0.1, 6))
+
+        governor.reset()
+        self.assertEqual((governor.get_metrics(), governor.retries), ({}, 0))
+        self.assertIsNotNone(governor._needs_retry(throttled, 1, model, {'context': {}}))
+
+    def test_request_governor_client(self):
+        """
+        test watchmen.utils.s3.RequestGovernor retries SlowDown errors of a real client
+        """
+        responses = [503, 503, 200]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                status = responses.pop(0)
+                self.send_response(status)
+                self.send_header('Content-Length', '0' if status == 200 else '1')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+
+        governor = s3.RequestGovernor(rate=0, max_attempts=5, sleep=lambda seconds: None, rand=lambda: 0)
+        client = boto3_session.Session(aws_access_key_id='x', aws_secret_access_key='x').client(
+            's3', region_name='us-east-1', endpoint_url='http://127.0.0.1:{}'.format(server.server_port),
+            config=Config(retries={'max_attempts': 0}, s3={'addressing_style': 'path'}))
+        governor.register(client)
+
+        client.head_object(Bucket='bucket', Key='key')
+        metrics = governor.get_metrics()['HeadObject']
+        self.assertEqual((metrics['calls'], metrics['attempts'], metrics['throttled'], metrics['retries']),
+                         (1, 3, 2, 2))
+
+    def test_request_governor_budget(self):
+        """
+        test watchmen.utils.s3.RequestGovernor stops the retries of a real client with CONFIG at the retry budget
+        """
+        requests = []
+        status = [503]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                requests.append(self.path)
+                self.send_response(status[0])
+                self.send_header('Content-Length', '1')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+
+        governor = s3.RequestGovernor(rate=0, max_attempts=5, retry_budget=2, sleep=lambda seconds: None,
+                                      rand=lambda: 0)
+        client = boto3_session.Session(aws_access_key_id='x', aws_secret_access_key='x').client(
+            's3', region_name='us-east-1', endpoint_url='http://127.0.0.1:{}'.format(server.server_port),
+            config=CONFIG.merge(Config(s3={'addressing_style': 'path'})))
+        governor.register(client)
+
+        with self.assertRaises(ClientError):
+            client.head_object(Bucket='bucket', Key='key')
+        self.assertEqual(len(requests), 3)
+        with self.assertRaises(ClientError):
+            client.head_object(Bucket='bucket', Key='key')
+        self.assertEqual(len(requests), 4)
+        metrics = governor.get_metrics()['HeadObject']
+        self.assertEqual((metrics['calls'], metrics['attempts'], metrics['retries'], metrics['exhausted']),
+                         (2, 4, 2, 2))
+
+        governor.reset()
+        status[0] = 500
+        with self.assertRaises(ClientError):
+            client.head_object(Bucket='bucket', Key='key')
+        self.assertEqual(len(requests), 7)
+        metrics = governor.get_metrics()['HeadObject']
+        self.assertEqual((metrics['throttled'], metrics['retries'], metrics['exhausted']), (0, 2, 1))
+
+        self.assertIsNone(governor._needs_retry(None, 1, Mock(), {}, caught_exception=ValueError()))
+        governor.reset()
+        connection_error = s3.botocore.exceptions.EndpointConnectionError(endpoint_url='http://localhost')
+        self.assertEqual(governor._needs_retry(None, 1, Mock(), {}, caught_exception=connection_error), 0)
+
+    def test_request_timings(self):
+        """
+        test watchmen.utils.s3.RequestTimings: latencies of the governor metrics, moving average and estimates
+        """
+        now = [0.0]
+        governor = s3.RequestGovernor(rate=0, clock=lambda: now[0])
+        model = Mock()
+        model.name = 'HeadObject'
+        for latency in (0.2, 0.4):
+            context = {}
+            governor._before_call({'Bucket': 'b', 'Key': 'a'}, model, context)
+            now[0] += latency
+            governor._after_call({}, model, context=context)
+        metrics = governor.get_metrics()['HeadObject']
+        self.assertEqual((metrics['responses'], round(metrics['latency_seconds'], 6)), (2, 0.6))
+
+        timings = s3.RequestTimings(weight=0.5)
+        timings.update(governor.get_metrics())
+        self.assertEqual(round(timings.get('HeadObject'), 6), 0.3)
+        timings.update({'HeadObject': dict(metrics, responses=1, latency_seconds=0.5)})
+        self.assertEqual(round(timings.get('HeadObject'), 6), 0.4)
+        self.assertEqual(timings.get('GetObject'), s3.DEFAULT_REQUEST_SECONDS['GetObject'])
+        self.assertEqual(timings.get('Unknown'), s3.DEFAULT_REQUEST_SECONDS[None])
+        self.assertEqual(round(timings.estimate({'HeadObject': 2, 'GetObject': 1}), 6),
+                         round(0.8 + s3.DEFAULT_REQUEST_SECONDS['GetObject'], 6))
+        self.assertIsNone(timings.estimate({'HeadObject': 2, 'ListObjects': None}))
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'timings', 'timings.json')
+        self.assertEqual(s3.RequestTimings.load(path).seconds, {})
+        timings.save(path)
+        self.assertEqual(s3.RequestTimings.load(path).seconds, timings.seconds)
+        with patch('watchmen.utils.s3.create_key') as mock_create_key, \
+                patch('watchmen.utils.s3.get_json_data', return_value={'seconds': {'GetObject': 1.0}}):
+            self.assertEqual(s3.RequestTimings.load('s3://bucket/watchmen/timings.json').get('GetObject'), 1.0)
+            timings.save('s3://bucket/watchmen/timings.json')
+            self.assertEqual(mock_create_key.call_args[0][1:], ('watchmen/timings.json', 'bucket'))
+
+    def test_bucket_cache(self):
+        """
+        test watchmen.utils.s3.BucketCache expires existing and missing buckets after their ttl
+        """
+        now = [100.0]
+        cache = s3.BucketCache(ttl=60, negative_ttl=5, clock=lambda: now[0])
+        cache.set('found', True, 'us-west-2')
+        cache.set('missing', False)
+        self.assertEqual((cache.get('found'), cache.get('missing'), cache.get('other')),
+                         ((True, 'us-west-2'), (False, None), None))
+        now[0] += 10
+        self.assertEqual((cache.get('found'), cache.get('missing')), ((True, 'us-west-2'), None))
+        now[0] += 60
+        self.assertIsNone(cache.get('found'))
+        cache.set('found', True)
+        cache.clear()
+        self.assertIsNone(cache.get('found'))
+
+    def test_check_bucket_cached(self):
+        """
+        check_bucket should send one head_bucket per bucket while it is cached, and cache the region
+        """
+        mock_client = MagicMock()
+        mock_client.head_bucket.return_value = {
+            'ResponseMetadata': {'HTTPHeaders': {'x-amz-bucket-region': 'us-west-2'}}}
+        for _ in range(3):
+            self.assertEqual(s3.check_bucket('found', client=mock_client), (True, None))
+        mock_client.head_bucket.assert_called_once_with(Bucket='found')
+        self.assertEqual(s3.get_bucket_region('found', client=mock_client), 'us-west-2')
+
+        mock_client.head_bucket.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadBucket')
+        for _ in range(3):
+            self.assertEqual(s3.check_bucket('missing', client=mock_client), (False, None))
+        self.assertIsNone(s3.get_bucket_region('missing', client=mock_client))
+        self.assertEqual(mock_client.head_bucket.call_count, 2)
+
+        # Exceptions are not cached:
+        mock_client.head_bucket.side_effect = self.mock_client_err
+        for _ in range(2):
+            result, tb = s3.check_bucket('error', client=mock_client)
+            self.assertIsNone(result)
+            self.assertIn(self.err_boto3_msg, tb)
+        self.assertEqual(mock_client.head_bucket.call_count, 4)
+
+    @patch('watchmen.utils.s3.get_client')
+    def test_get_bucket_client(self, mock_get_client):
+        """
+        get_bucket_client should route to the cached region of a bucket without any request
+        """
+        s3.BUCKET_CACHE.set('regional', True, 'eu-west-1')
+        s3.get_bucket_client('regional')
+        mock_get_client.assert_called_with(region_name='eu-west-1')
+        s3.get_bucket_client('unknown')
+        mock_get_client.assert_called_with()
+
     @patch('watchmen.utils.s3.boto3_session')
     def test_check_empty_folder(self, mock_boto3):
         """
@@ -257,11 +504,12 @@ def test_check_size(self, mock_boto3):
         """
         mock_boto3.Session.return_value = self.mock_session
         for size in [-1, 0, 1, 99, 65535]:
-            self.mock_client.get_object.return_value = {'ContentLength': size}
+            self.mock_client.head_object.return_value = {'ContentLength': size}
             result = s3.check_size('prefix/123/key', 'bucket-xyz')
-            self.mock_client.get_object.assert_called_with(
+            self.mock_client.head_object.assert_called_with(
                 Bucket='bucket-xyz', Key='prefix/123/key')
             self.assertEqual(result, size > 0)
+        self.mock_client.get_object.assert_not_called()
 
     @patch('watchmen.utils.s3.boto3_session')
     def test_check_size_exception(self, mock_boto3):
@@ -269,9 +517,9 @@ def test_check_size_exception(self, mock_boto3):
         test watchmen.utils.s3.check_size on exception
         """
         mock_boto3.Session.return_value = self.mock_session
-        self.mock_client.get_object.side_effect = self.mock_client_err
+        self.mock_client.head_object.side_effect = self.mock_client_err
         result = s3.check_size('prefix/123', 'bucket-xyz')
-        self.mock_client.get_object.assert_called_with(
+        self.mock_client.head_object.assert_called_with(
             Bucket='bucket-xyz', Key='prefix/123')
         self.assertFalse(result)
 
@@ -294,22 +542,22 @@ def test_clean_json(self):
             self.assertEqual(result, test['result'])
 
     @patch('watchmen.utils.s3.boto3_session')
-    @patch('watchmen.utils.s3.get_key')
-    def test_copy_contents_to_bucket(self, mock_get_key, mock_boto3):
+    @patch('watchmen.utils.s3.head_object')
+    def test_copy_contents_to_bucket(self, mock_head_object, mock_boto3):
         """
         test watchmen.utils.s3.copy_contents_to_bucket
         """
         mock_boto3.Session.return_value = self.mock_session
         contents, key_name, bucket = "contents", "some/s3/key", self.bucket
 
-        mock_get_key.return_value = None
+        mock_head_object.return_value = {'Key': key_name, 'Exists': False}
         result = s3.copy_contents_to_bucket(contents, key_name, bucket)
         self.assertEqual(self.mock_client.delete_object.call_count, 0)
         self.mock_client.put_object.assert_called_with(
             Body=contents, Bucket=bucket, Key=key_name)
         self.assertEqual(result, self.mock_s3_put_return)
 
-        mock_get_key.return_value = {}
+        mock_head_object.return_value = {'Key': key_name, 'Exists': True}
         result = s3.copy_contents_to_bucket(contents, key_name, bucket)
         self.assertEqual(self.mock_client.delete_object.call_count, 1)
         self.mock_client.put_object.assert_called_with(
@@ -408,6 +656,11 @@ def test_delete_key(self, mock_boto3):
         result = s3.delete_key(key_name, bucket)
         self.assertEqual(result, False)
 
+        # Test an injected client:
+        client = MagicMock()
+        self.assertTrue(s3.delete_key(key_name, bucket, client=client))
+        client.delete_object.assert_called_with(Bucket=bucket, Key=key_name)
+
     @patch('watchmen.utils.s3.boto3_session')
     def test_get_client(self, mock_boto3):
         """
@@ -418,6 +671,36 @@ def test_get_client(self, mock_boto3):
         self.mock_session.client.assert_called_with('s3', config=CONFIG)
         self.assertEqual(result, self.mock_client)
 
+    @patch('watchmen.utils.s3.boto3_session')
+    def test_get_client_cached(self, mock_boto3):
+        """
+        test watchmen.utils.s3.get_client reuses one client per region, config and credentials
+        """
+        mock_boto3.Session.return_value = self.mock_session
+        first = s3.get_client()
+        second = s3.get_client()
+        self.assertIs(first, second)
+        self.assertEqual(mock_boto3.Session.call_count, 1)
+
+        s3.get_client(region_name='us-west-2')
+        self.mock_session.client.assert_called_with('s3', config=CONFIG, region_name='us-west-2')
+        s3.get_client(aws_access_key_id='id', aws_secret_access_key='secret')
+        mock_boto3.Session.assert_called_with(aws_access_key_id='id', aws_secret_access_key='secret')
+        self.assertEqual(mock_boto3.Session.call_count, 3)
+
+        s3.CLIENT_REGISTRY.clear()
+        s3.get_client()
+        self.assertEqual(mock_boto3.Session.call_count, 4)
+
+    @patch('watchmen.utils.s3.boto3_session')
+    def test_get_resource_cached(self, mock_boto3):
+        """
+        test watchmen.utils.s3.get_resource reuses one resource per thread
+        """
+        mock_boto3.Session.return_value = self.mock_session
+        self.assertIs(s3.get_resource(), s3.get_resource())
+        self.assertEqual(self.mock_session.resource.call_count, 1)
+
     @patch('watchmen.utils.s3.get_content')
     def test_get_csv_data(self, mock_get_content):
         """
@@ -476,15 +759,99 @@ def test_get_content_exception(self, mock_boto3):
         result = s3.get_content(key_name, bucket)
         self.assertEqual(result, None)
 
-    @mock_s3
-    @patch('watchmen.utils.s3.boto3.resource')
-    def test_get_file_contents_s3(self, mock_resource):
+    def test_get_file_contents_s3(self):
+        self.mock_client.get_object.return_value = self._get_streaming_response(b'contents')
+        returned = get_file_contents_s3(self.bucket, self.example_path, client=self.mock_client)
+        self.mock_client.get_object.assert_called_with(Bucket=self.bucket, Key=self.example_path)
+        self.assertEqual(b'contents', returned)
+
         # Exception Occurs
-        mock_resource.return_value.Object.return_value.get.side_effect = ClientError({}, {})
+        self.mock_client.get_object.side_effect = ClientError({}, {})
         expected = None
-        returned = get_file_contents_s3(self.bucket, self.example_path)
+        returned = get_file_contents_s3(self.bucket, self.example_path, client=self.mock_client)
         self.assertEqual(expected, returned)
 
+    def test_get_parquet_metadata(self):
+        """
+        test watchmen.utils.s3.get_parquet_metadata and get_parquet_metadatas
+        """
+        footer = build_parquet_footer(500, [('query', 6, 0), ('count', 2, 0)])
+        files = {
+            'good.parquet': b'PAR1' + b'\x00' * 1000 + footer,
+            'truncated.parquet': (b'PAR1' + b'\x00' * 1000 + footer)[:-100],
+            'short.parquet': footer[-20:],
+        }
+
+        def get_object(**kwargs):
+            if kwargs['Key'] not in files:
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+            size = int(kwargs['Range'][len('bytes=-'):])
+            return self._get_streaming_response(files[kwargs['Key']][-size:])
+
+        self.mock_client.get_object.side_effect = get_object
+        result = s3.get_parquet_metadata('good.parquet', self.bucket, client=self.mock_client)
+        self.assertEqual((result['Key'], result['Valid'], result['NumRows'], result['Columns']),
+                         ('good.parquet', True, 500, ['query', 'count']))
+        self.mock_client.get_object.assert_called_once_with(
+            Bucket=self.bucket, Key='good.parquet', Range='bytes=-{}'.format(s3.PARQUET_FOOTER_READ_SIZE))
+
+        # Test a footer larger than the first read:
+        self.mock_client.get_object.reset_mock()
+        result = s3.get_parquet_metadata('good.parquet', self.bucket, client=self.mock_client, read_size=16)
+        self.assertEqual(result['NumRows'], 500)
+        self.mock_client.get_object.assert_called_with(
+            Bucket=self.bucket, Key='good.parquet', Range='bytes=-{}'.format(len(footer)))
+
+        results = s3.get_parquet_metadatas(
+            self.bucket, ['truncated.parquet', 'short.parquet', 'missing.parquet', 'good.parquet'],
+            client=self.mock_client)
+        self.assertEqual([(key, result['Valid']) for key, result in results.items()], [
+            ('truncated.parquet', False), ('short.parquet', False), ('missing.parquet', None), ('good.parquet', True)])
+        self.assertEqual(s3.get_parquet_metadatas(self.bucket, [], client=self.mock_client), {})
+
+    def test_get_range(self):
+        """
+        test watchmen.utils.s3.get_range, get_head_bytes and get_tail_bytes
+        """
+        self.mock_client.get_object.side_effect = lambda **kwargs: self._get_streaming_response(b'bytes')
+        tests = [
+            (lambda: s3.get_range('key', self.bucket, 10, 19, client=self.mock_client), 'bytes=10-19'),
+            (lambda: s3.get_range('key', self.bucket, 10, client=self.mock_client), 'bytes=10-'),
+            (lambda: s3.get_head_bytes('key', self.bucket, 4, client=self.mock_client), 'bytes=0-3'),
+            (lambda: s3.get_tail_bytes('key', self.bucket, 8, client=self.mock_client), 'bytes=-8'),
+        ]
+        for get_bytes, expected_range in tests:
+            self.assertEqual(get_bytes(), b'bytes')
+            self.mock_client.get_object.assert_called_with(Bucket=self.bucket, Key='key', Range=expected_range)
+
+        self.mock_client.get_object.side_effect = ClientError({}, {})
+        self.assertIsNone(s3.get_range('key', self.bucket, 0, 1, client=self.mock_client))
+
+    def test_get_sampled_ranges(self):
+        """
+        test watchmen.utils.s3.get_sampled_ranges
+        """
+        contents = bytes(range(100))
+
+        def get_object(**kwargs):
+            start, end = kwargs['Range'][len('bytes='):].split('-')
+            return self._get_streaming_response(contents[int(start):int(end) + 1])
+
+        self.mock_client.get_object.side_effect = get_object
+        self.mock_client.head_object.return_value = {'ContentLength': len(contents)}
+        result = s3.get_sampled_ranges('key', self.bucket, samples=4, sample_size=10, client=self.mock_client)
+        self.mock_client.head_object.assert_called_once_with(Bucket=self.bucket, Key='key')
+        self.assertEqual(result, [(offset, contents[offset:offset + 10]) for offset in (0, 30, 60, 90)])
+
+        # Test a file smaller than the samples, with a known size:
+        result = s3.get_sampled_ranges('key', self.bucket, samples=3, sample_size=200, client=self.mock_client,
+                                       object_size=len(contents))
+        self.assertEqual(result, [(0, contents)])
+        self.assertEqual(s3.get_sampled_ranges('key', self.bucket, client=self.mock_client, object_size=0), [])
+
+        self.mock_client.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        self.assertIsNone(s3.get_sampled_ranges('key', self.bucket, client=self.mock_client))
+
     @patch('watchmen.utils.s3.get_content')
     def test_get_json_data(self, mock_get_content):
         """
@@ -545,6 +912,32 @@ def test_get_key(self, mock_boto3):
         self.mock_s3_bucket.objects.filter.assert_called_with(Prefix=key_name)
         self.assertEqual(key, mock_object)
 
+    @patch('watchmen.utils.s3.boto3_session')
+    def test_get_key_client(self, mock_boto3):
+        """
+        test watchmen.utils.s3.get_key with an injected client
+        """
+        self.mock_session.resource.return_value = boto3_session.Session(region_name='us-east-1').resource('s3')
+        mock_boto3.Session.return_value = self.mock_session
+        mock_client = MagicMock()
+        last_modified = datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc)
+        listed = {'Key': 'some/key', 'Size': 1, 'LastModified': last_modified}
+        mock_client.get_paginator.return_value.paginate.return_value.search.return_value = iter([listed])
+        key = s3.get_key('some/key', 'bucket', client=mock_client)
+        # The key is an ObjectSummary bound to the client, like the one got without a client:
+        self.assertEqual(type(key).__name__, 's3.ObjectSummary')
+        self.assertEqual((key.bucket_name, key.key, key.size, key.last_modified),
+                         ('bucket', 'some/key', 1, last_modified))
+        self.assertIs(key.meta.client, mock_client)
+        mock_client.get_paginator.assert_called_with('list_objects_v2')
+        mock_client.get_paginator.return_value.paginate.assert_called_with(
+            Bucket='bucket', Prefix='some/key', PaginationConfig={'MaxItems': 1})
+        self.mock_s3_bucket.objects.filter.assert_not_called()
+
+        mock_client.get_paginator.return_value.paginate.return_value.search.return_value = iter(
+            [{'Key': 'some/key/other'}])
+        self.assertIsNone(s3.get_key('some/key', 'bucket', client=mock_client))
+
     @patch('watchmen.utils.s3.boto3_session')
     def test_get_key_none(self, mock_boto3):
         """
@@ -575,38 +968,530 @@ def test_get_keys(self, mock_check, mock_boto3):
         self.assertEqual(len(result), len(self.mock_prefix_test_json))
         self.assertEqual(result, keys)
 
-    @patch('watchmen.utils.s3.get_content')
-    def test_get_parquet_data(self, mock_get_content):
+    def test_get_parquet_data(self):
         """
-        test watchmen.utils.s3.get_json_data
+        test watchmen.utils.s3.get_parquet_data
         """
         key_name, bucket = "part-", "b"
-        contents = '''
+        contents = b'''
         {"prop1": "value1"}
         {"prop2": "value2"}
         {"prop3": "value3"}
         '''
-        mock_get_content.return_value = contents
-        result = s3.get_parquet_data(key_name, bucket)
+        self.mock_client.get_object.return_value = self._get_streaming_response(contents)
+        result = s3.get_parquet_data(key_name, bucket, client=self.mock_client)
+        self.mock_client.get_object.assert_called_with(Bucket=bucket, Key=key_name)
         self.assertEqual(result[0], {"prop1": "value1"})
         self.assertEqual(result[1], {"prop2": "value2"})
         self.assertEqual(result[2], {"prop3": "value3"})
 
-    @patch('watchmen.utils.s3.convert_parquet_to_json')
-    @patch('watchmen.utils.s3.get_content')
-    def test_get_parquet_data_exception(self, mock_get_content, mock_convert_parquet_to_json):
+        self.mock_client.get_object.return_value = self._get_streaming_response(contents)
+        result = s3.get_parquet_data(key_name, bucket, client=self.mock_client, limit=1)
+        self.assertEqual(result, [{"prop1": "value1"}])
+
+    def test_get_parquet_data_exception(self):
         key_name, bucket = "part-", "b"
-        contents = '''
+        contents = b'''
         {"prop1": "value1"}
-        {"prop2": "value2"}
-        {"prop3": "value3"}
+        {"prop2": "value2"
         '''
-        mock_get_content.return_value = contents
-        mock_convert_parquet_to_json.side_effect = Exception("Something went wrong :(")
+        self.mock_client.get_object.return_value = self._get_streaming_response(contents)
         expected_result = None
-        returned_result = s3.get_parquet_data(key_name, bucket)
+        returned_result = s3.get_parquet_data(key_name, bucket, client=self.mock_client)
         self.assertEqual(expected_result, returned_result)
 
+        self.mock_client.get_object.side_effect = ClientError({}, {})
+        returned_result = s3.get_parquet_data(key_name, bucket, client=self.mock_client)
+        self.assertEqual(expected_result, returned_result)
+
+    def test_head_object(self):
+        """
+        test watchmen.utils.s3.head_object
+        """
+        self.mock_client.head_object.return_value = {'ContentLength': 10, 'ETag': '"abc"'}
+        result = s3.head_object('some/key', self.bucket, client=self.mock_client)
+        self.mock_client.head_object.assert_called_with(Bucket=self.bucket, Key='some/key')
+        self.assertEqual(result, {'ContentLength': 10, 'ETag': '"abc"', 'Key': 'some/key', 'Exists': True})
+
+        # Test a missing key, also when it is forbidden because the bucket cannot be listed:
+        for code in ['404', '403']:
+            self.mock_client.head_object.side_effect = ClientError({'Error': {'Code': code}}, 'HeadObject')
+            result = s3.head_object('some/key', self.bucket, client=self.mock_client)
+            self.assertEqual(result, {'Key': 'some/key', 'Exists': False})
+
+        for error in [self.mock_client_err, self.mock_exception]:
+            self.mock_client.head_object.side_effect = error
+            result = s3.head_object('some/key', self.bucket, client=self.mock_client)
+            self.assertIsNone(result['Exists'])
+            self.assertIn('Traceback', result['Error'])
+
+    def test_head_objects(self):
+        """
+        test watchmen.utils.s3.head_objects
+        """
+        def head_object(Bucket, Key):
+            if Key.startswith('missing'):
+                raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+            return {'ContentLength': len(Key)}
+
+        self.mock_client.head_object.side_effect = head_object
+        keys = ['a/1', 'missing/2', 'a/333', 'a/1']
+        result = s3.head_objects(self.bucket, keys, client=self.mock_client, max_workers=2)
+        self.assertEqual(list(result), ['a/1', 'missing/2', 'a/333'])
+        self.assertEqual(result['a/1']['ContentLength'], 3)
+        self.assertTrue(result['a/333']['Exists'])
+        self.assertEqual(result['missing/2'], {'Key': 'missing/2', 'Exists': False})
+        self.assertEqual(self.mock_client.head_object.call_count, 3)
+        self.assertEqual(s3.head_objects(self.bucket, [], client=self.mock_client), {})
+
+    @staticmethod
+    def _get_streaming_response(contents):
+        """
+        Create a get_object response with a streaming body of the @contents bytes
+        """
+        return {'Body': StreamingBody(io.BytesIO(contents), len(contents)), 'ContentLength': len(contents)}
+
+    def test_aggregate_objects(self):
+        """
+        test watchmen.utils.s3.aggregate_objects
+        """
+        last_modified = datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc)
+        objects = ({
+            'Key': 'prefix/{:04}{}'.format(index, '.json' if index % 3 else '.gz'),
+            'Size': index % 2,
+            'LastModified': last_modified + datetime.timedelta(minutes=index)
+        } for index in range(10))
+        aggregate = s3.aggregate_objects(
+            objects, suffix='.gz', whitelist=['0008.json'], start_time=last_modified + datetime.timedelta(minutes=1),
+            max_samples=2)
+
+        self.assertEqual((aggregate.listed, aggregate.count, aggregate.total_size), (10, 8, 5))
+        self.assertEqual((aggregate.empty_count, aggregate.empty_keys), (3, ['prefix/0002.json', 'prefix/0004.json']))
+        self.assertEqual((aggregate.suffix_mismatch_count, aggregate.suffix_mismatches),
+                         (5, ['prefix/0001.json', 'prefix/0002.json']))
+        self.assertEqual(aggregate.min_last_modified, last_modified + datetime.timedelta(minutes=1))
+        self.assertEqual(aggregate.max_last_modified, last_modified + datetime.timedelta(minutes=9))
+
+        aggregate = s3.ListingAggregate(end_time=last_modified)
+        self.assertTrue(aggregate.add({'Key': 'a', 'Size': 1, 'LastModified': last_modified}))
+        self.assertFalse(aggregate.add({'Key': 'b', 'Size': 1, 'LastModified': last_modified + datetime.timedelta(1)}))
+        self.assertEqual(aggregate.update([]), 0)
+        self.assertEqual((aggregate.listed, aggregate.count, aggregate.suffix_mismatch_count), (2, 1, 0))
+
+    def test_aggregate_stop_when_satisfied(self):
+        """
+        test watchmen.utils.s3.ListingAggregate stops reading objects once min_count and min_total_size are met
+        """
+        objects = ({'Key': 'prefix/{}'.format(index), 'Size': 10, 'LastModified': None} for index in range(10))
+        aggregate = s3.ListingAggregate(min_count=2, min_total_size=30)
+        self.assertFalse(aggregate.is_satisfied())
+        self.assertEqual(aggregate.update(objects, stop_when_satisfied=True), 3)
+        self.assertTrue(aggregate.stopped_early)
+        self.assertEqual(list(objects), [])
+
+        aggregate = s3.ListingAggregate(min_count=20)
+        objects = [{'Key': 'prefix/{}'.format(index), 'Size': 10, 'LastModified': None} for index in range(10)]
+        self.assertEqual(aggregate.update(objects, stop_when_satisfied=True), 10)
+        self.assertFalse(aggregate.stopped_early)
+
+        # Test an aggregate without thresholds is never satisfied:
+        aggregate = s3.ListingAggregate()
+        self.assertEqual(aggregate.update(objects, stop_when_satisfied=True), 10)
+        self.assertFalse(aggregate.is_satisfied())
+
+    def test_aggregate_columns(self):
+        """
+        test watchmen.utils.s3.ListingAggregate counts ListingColumns like the objects they hold
+        """
+        last_modified = datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc)
+        objects = [{
+            'Key': 'prefix/{:04}{}'.format(index, '.json' if index % 3 else '.gz'),
+            'Size': index % 2,
+            'LastModified': last_modified + datetime.timedelta(minutes=index)
+        } for index in range(10)]
+        parameters = {'suffix': '.gz', 'whitelist': ['0008.json'], 'max_samples': 2, 'keep_keys': True,
+                      'start_time': last_modified + datetime.timedelta(minutes=1),
+                      'end_time': last_modified + datetime.timedelta(minutes=8)}
+        expected = s3.aggregate_objects(objects, **parameters)
+        aggregate = s3.ListingAggregate(**parameters)
+        self.assertEqual(aggregate.update(s3.ListingColumns.from_objects(objects[:4])), 4)
+        self.assertEqual(aggregate.update(s3.ListingColumns.from_objects(objects[4:])), 6)
+
+        names = ['listed', 'count', 'total_size', 'keys', 'empty_count', 'empty_keys', 'suffix_mismatch_count',
+                 'suffix_mismatches', 'min_last_modified', 'max_last_modified']
+        for name in names:
+            self.assertEqual(getattr(aggregate, name), getattr(expected, name), name)
+
+        # Test the objects of a listing are added a page of columns at a time:
+        expected = s3.ListingAggregate(**parameters)
+        for obj in objects:
+            expected.add(obj)
+        aggregate = s3.ListingAggregate(**parameters)
+        with patch.object(aggregate, 'add', side_effect=AssertionError):
+            self.assertEqual(aggregate.update(iter(objects), page_size=3), 10)
+        for name in names:
+            self.assertEqual(getattr(aggregate, name), getattr(expected, name), name)
+
+        # Test the objects read before the listing fails are still counted:
+        def fail_listing():
+            yield from objects[:5]
+            raise RuntimeError('listing failed')
+
+        aggregate = s3.ListingAggregate()
+        with self.assertRaises(RuntimeError):
+            aggregate.update(fail_listing(), page_size=3)
+        self.assertEqual((aggregate.listed, aggregate.count, aggregate.total_size), (5, 5, 2))
+
+    def test_listing_columns(self):
+        """
+        test watchmen.utils.s3.ListingColumns masks
+        """
+        last_modified = datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc)
+        columns = s3.ListingColumns.from_objects([
+            {'Key': 'a/1.gz', 'Size': 10, 'LastModified': last_modified},
+            {'Key': 'a/_SUCCESS', 'Size': 0, 'LastModified': last_modified + datetime.timedelta(hours=1)},
+            {'Key': 'a/2.json', 'Size': 5, 'LastModified': None},
+        ])
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns.suffix_mask('.gz'), [True, False, False])
+        self.assertEqual(columns.empty_mask(), [False, True, False])
+        self.assertEqual(columns.whitelist_mask(['_SUCCESS']), [True, False, True])
+        self.assertEqual(columns.whitelist_mask(None), [True, True, True])
+        self.assertEqual(columns.time_mask(), [True, True, True])
+        self.assertEqual(columns.time_mask(last_modified, last_modified), [True, False, False])
+        self.assertEqual(columns.time_mask(end_time=last_modified + datetime.timedelta(hours=1)), [True, True, False])
+
+        selected = columns.select(s3.mask_all(columns.whitelist_mask(['_SUCCESS']), columns.empty_mask()))
+        self.assertEqual(len(selected), 0)
+        selected = columns.select(columns.whitelist_mask(['_SUCCESS']))
+        self.assertEqual((selected.keys, selected.total_size()), (['a/1.gz', 'a/2.json'], 15))
+        self.assertEqual(list(selected.to_objects()), [
+            {'Key': 'a/1.gz', 'Size': 10, 'LastModified': last_modified},
+            {'Key': 'a/2.json', 'Size': 5, 'LastModified': None},
+        ])
+
+    @staticmethod
+    def _build_inventory(source_bucket, data_files, schema='Bucket, Key, Size, LastModifiedDate', name='data'):
+        """
+        Build the manifest (dict) and the gzip CSV data files (dict of key to bytes) of an S3 Inventory report
+        @param data_files: a list of the rows of every data file
+        @param name: the name of the data files, followed by their index
+        """
+        files = {}
+        for index, rows in enumerate(data_files):
+            contents = io.StringIO()
+            csv.writer(contents, quoting=csv.QUOTE_ALL).writerows(rows)
+            files['inventory/{}/daily/data/{}{}.csv.gz'.format(source_bucket, name, index)] = \
+                gzip.compress(contents.getvalue().encode('utf-8'))
+        manifest = {
+            'sourceBucket': source_bucket,
+            'destinationBucket': 'arn:aws:s3:::inventory-bucket',
+            'fileFormat': 'CSV',
+            'fileSchema': schema,
+            'creationTimestamp': '1590969600000',
+            'files': [{'key': key_name, 'size': len(contents)} for key_name, contents in files.items()],
+        }
+        return manifest, files
+
+    def test_inventory_index(self):
+        """
+        test watchmen.utils.s3.InventoryIndex
+        """
+        last_modified = datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc)
+        index = s3.InventoryIndex()
+        for key_name in ['day=02/b', 'day=01/', 'day=01/b', 'day=01/a', 'day=010/a', 'day=1']:
+            index.add(key_name, len(key_name), last_modified)
+
+        self.assertEqual([obj['Key'] for obj in index.list_objects('day=01/')], ['day=01/a', 'day=01/b'])
+        self.assertEqual(list(index.list_objects('day=02/')),
+                         [{'Key': 'day=02/b', 'Size': 8, 'LastModified': last_modified}])
+        self.assertEqual([obj['Key'] for obj in index.list_objects('day=01')], ['day=01/a', 'day=01/b', 'day=010/a'])
+        self.assertEqual([obj['Key'] for obj in index.list_objects('day=01', max_items=1)], ['day=01/a'])
+        self.assertEqual(list(index.list_objects('day=03/')), [])
+        self.assertEqual(list(index.list_columns('day=01').to_objects()), list(index.list_objects('day=01')))
+        self.assertEqual(index.list_columns('day=01', max_items=2, start_after='day=01/a').keys,
+                         ['day=01/b', 'day=010/a'])
+        self.assertEqual(len(index.list_columns('day=03/')), 0)
+        self.assertEqual(len(index.list_columns('')), 5)
+        self.assertEqual([obj['Key'] for obj in index.list_objects('day=01', start_after='day=01/a')],
+                         ['day=01/b', 'day=010/a'])
+        self.assertEqual([obj['Key'] for obj in index.list_objects('day=01/', start_after='day=0')],
+                         ['day=01/a', 'day=01/b'])
+        self.assertEqual(len(index), 6)
+
+        # Test CSV rows, with url-encoded keys, old versions and delete markers:
+        index = s3.InventoryIndex()
+        schema = ['Bucket', 'Key', 'VersionId', 'IsLatest', 'IsDeleteMarker', 'Size', 'LastModifiedDate']
+        index.add_csv_rows([
+            ['bucket', 'a/file+name%2B1.gz', '2', 'true', 'false', '10', '2020-06-01T12:00:00.000Z'],
+            ['bucket', 'a/file+name%2B1.gz', '1', 'false', 'false', '5', '2020-05-01T12:00:00.000Z'],
+            ['bucket', 'a/deleted.gz', '3', 'true', 'true', '', '2020-06-01T12:00:00.000Z'],
+        ], schema)
+        self.assertEqual(list(index.list_objects('a/')),
+                         [{'Key': 'a/file name+1.gz', 'Size': 10, 'LastModified': last_modified}])
+
+    @patch('watchmen.utils.s3.generate_pages')
+    def test_listing_cache(self, mock_pages):
+        """
+        test watchmen.utils.s3.ListingCache serves the prefixes under a complete listing
+        """
+        objects = [{'Key': 'day=01/hour={:02d}/part-{}'.format(hour, part), 'Size': part, 'LastModified': None}
+                   for hour in range(3) for part in range(2)]
+        mock_pages.side_effect = lambda prefix, **kwargs: iter(
+            [obj for obj in objects if obj['Key'].startswith(prefix)])
+        cache = s3.ListingCache()
+
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket)), objects)
+        mock_pages.assert_called_once_with('day=01/', bucket=self.bucket)
+        self.assertEqual(list(cache.generate_pages('day=01/hour=01/', bucket=self.bucket)), objects[2:4])
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket, max_items=1)), objects[:1])
+        self.assertEqual(mock_pages.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # Test other buckets and parent prefixes are listed:
+        self.assertEqual(len(list(cache.generate_pages('day=01/', bucket='other-bucket'))), 6)
+        self.assertEqual(len(list(cache.generate_pages('day=0', bucket=self.bucket))), 6)
+        self.assertEqual((mock_pages.call_count, cache.hits, cache.misses), (3, 2, 3))
+
+        # Test listings cut by max_items or beyond max_objects, and unfinished listings, are not cached:
+        cache = s3.ListingCache(max_objects=4)
+        for prefix, max_items in [('day=01/', None), ('day=01/hour=00/', 2), ('day=01/hour=01/', 3)]:
+            list(cache.generate_pages(prefix, bucket=self.bucket, max_items=max_items))
+        next(cache.generate_pages('day=01/hour=02/', bucket=self.bucket))
+        self.assertIsNone(cache.get(self.bucket, 'day=01/hour=00/'))
+        self.assertIsNone(cache.get(self.bucket, 'day=01/hour=02/'))
+        self.assertEqual(cache.get(self.bucket, 'day=01/hour=01/').keys, [obj['Key'] for obj in objects[2:4]])
+
+        cache.clear()
+        self.assertEqual((cache.get(self.bucket, 'day=01/hour=01/'), cache.hits, cache.misses), (None, 0, 1))
+        self.assertEqual(cache._pending, {})
+
+        # Test concurrent listings of a prefix wait for the first one:
+        cache = s3.ListingCache()
+        mock_pages.reset_mock()
+        started = threading.Event()
+
+        def list_slowly(prefix, **kwargs):
+            started.set()
+            time.sleep(0.05)
+            return iter(objects)
+
+        mock_pages.side_effect = list_slowly
+        thread = threading.Thread(target=lambda: list(cache.generate_pages('day=01/', bucket=self.bucket)))
+        thread.start()
+        started.wait()
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket)), objects)
+        thread.join()
+        self.assertEqual((mock_pages.call_count, cache.hits, cache.misses), (1, 1, 1))
+
+        # Test a listing in progress holds no lock: others list the prefix on their own after wait_seconds
+        cache = s3.ListingCache(wait_seconds=0.01)
+        mock_pages.reset_mock()
+        mock_pages.side_effect = lambda prefix, **kwargs: iter(objects)
+        first = cache.generate_pages('day=01/', bucket=self.bucket)
+        self.assertEqual(next(first), objects[0])
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket)), objects)
+        self.assertIsNone(cache.get(self.bucket, 'day=01/hour=00/'))
+        self.assertEqual(list(first), objects[1:])
+        self.assertEqual((mock_pages.call_count, cache._pending), (2, {}))
+        self.assertIsNotNone(cache.get(self.bucket, 'day=01/hour=00/'))
+        self.assertEqual(list(cache._listings), [self.bucket])
+
+    @patch('watchmen.utils.s3.generate_pages')
+    def test_listing_cache_shards(self, mock_pages):
+        """
+        test watchmen.utils.s3.ListingCache does not cache the listings limited to configured shards
+        """
+        objects = [{'Key': 'day=01/_SUCCESS', 'Size': 0, 'LastModified': None}] + [
+            {'Key': 'day=01/hour={:02d}/part-0'.format(hour), 'Size': hour, 'LastModified': None} for hour in range(3)]
+
+        def generate_pages(prefix, **kwargs):
+            sub_prefixes = [prefix + shard for shard in kwargs['shards']] if kwargs.get('shards') else [prefix]
+            return iter([obj for sub_prefix in sub_prefixes for obj in objects if obj['Key'].startswith(sub_prefix)])
+
+        mock_pages.side_effect = generate_pages
+        cache = s3.ListingCache()
+
+        # A sharded item and an unsharded item share a prefix:
+        sharded = list(cache.generate_pages('day=01/', bucket=self.bucket, sharded=True,
+                                            shards=['hour=02/', 'hour=00/']))
+        self.assertEqual(sharded, [objects[3], objects[1]])
+        self.assertIsNone(cache.get(self.bucket, 'day=01/'))
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket)), objects)
+        self.assertEqual(list(cache.generate_pages('day=01/hour=01/', bucket=self.bucket)), [objects[2]])
+        self.assertEqual(mock_pages.call_count, 2)
+
+        # The shards are served from a complete listing, in the shard order and up to max_items:
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket, sharded=True,
+                                                   shards=['hour=02/', 'hour=00/'])), [objects[3], objects[1]])
+        self.assertEqual(list(cache.generate_pages('day=01/', bucket=self.bucket, sharded=True,
+                                                   shards=['hour=02/', 'hour=00/'], max_items=1)), [objects[3]])
+        self.assertEqual(mock_pages.call_count, 2)
+
+    def test_load_inventory(self):
+        """
+        test watchmen.utils.s3.find_inventory_manifest and load_inventory
+        """
+        last_modified = '2020-06-01T12:00:00.000Z'
+        manifest, files = self._build_inventory('source-bucket', [
+            [['source-bucket', 'day=01/b', '2', last_modified], ['source-bucket', 'day=02/a', '3', last_modified]],
+            [['source-bucket', 'day=01/a', '1', last_modified]],
+        ])
+        manifest_key = 'inventory/source-bucket/daily/2020-06-01T00-00Z/manifest.json'
+        files[manifest_key] = json.dumps(manifest).encode('utf-8')
+        self.mock_client.get_object.side_effect = \
+            lambda **kwargs: self._get_streaming_response(files[kwargs['Key']])
+
+        index = s3.load_inventory(manifest_key, 'inventory-bucket', client=self.mock_client)
+        self.assertEqual(index.keys, ['day=01/a', 'day=01/b', 'day=02/a'])
+        self.assertEqual(list(index.sizes), [1, 2, 3])
+        self.assertEqual(index.get_object(0)['LastModified'], datetime.datetime(2020, 6, 1, 12, 0, tzinfo=pytz.utc))
+        self.assertEqual(index.source_bucket, 'source-bucket')
+        self.assertEqual(index.created_at, datetime.datetime(2020, 6, 1, tzinfo=pytz.utc))
+
+        # Test a missing manifest and an unsupported format:
+        self.mock_client.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        with self.assertRaises(ValueError):
+            s3.load_inventory(manifest_key, 'inventory-bucket', client=self.mock_client)
+        with self.assertRaises(ValueError):
+            s3._load_inventory_files({'fileFormat': 'Parquet', 'fileSchema': 'Key'}, None)
+
+        # Test the latest manifest is found:
+        listing = dict(('inventory/source-bucket/daily/{}/manifest.json'.format(folder), 1)
+                       for folder in ['2020-06-01T00-00Z', '2020-06-02T00-00Z', 'hive'])
+        mock_client = self.get_sharded_client(listing)
+        self.assertEqual(
+            s3.find_inventory_manifest('inventory/source-bucket/daily', 'inventory-bucket', client=mock_client),
+            'inventory/source-bucket/daily/2020-06-02T00-00Z/manifest.json')
+        mock_client = self.get_sharded_client({})
+        self.assertIsNone(s3.find_inventory_manifest('inventory/', 'inventory-bucket', client=mock_client))
+
+    def test_load_local_inventory(self):
+        """
+        test watchmen.utils.s3.load_local_inventory from a local copy of the inventory bucket
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for folder, key_name in [('2020-06-01T00-00Z', 'day=01/old'), ('2020-06-02T00-00Z', 'day=01/new')]:
+            manifest, files = self._build_inventory('source-bucket', [[['source-bucket', key_name, '1', '']]],
+                                                    name=folder)
+            files['inventory/source-bucket/daily/{}/manifest.json'.format(folder)] = json.dumps(manifest).encode()
+            for file_key, contents in files.items():
+                path = os.path.join(directory, file_key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as local_file:
+                    local_file.write(contents)
+
+        index = s3.load_local_inventory(directory)
+        self.assertEqual(list(index.list_objects('day=01/')), [{'Key': 'day=01/new', 'Size': 1, 'LastModified': None}])
+        index = s3.load_local_inventory(directory, 'inventory/source-bucket/daily/2020-06-01T00-00Z/manifest.json')
+        self.assertEqual(index.keys, ['day=01/old'])
+        with self.assertRaises(ValueError):
+            s3.load_local_inventory(os.path.join(directory, 'inventory/source-bucket/daily/data'))
+
+    def test_iter_json_lines(self):
+        """
+        test watchmen.utils.s3.iter_json_lines for plain and gzip (multi-member) files read in small chunks
+        """
+        records = [{'id': index, 'name': 'record-{}'.format(index)} for index in range(50)]
+        contents = ''.join('{}\n'.format(json.dumps(record)) for record in records).encode('utf-8')
+        half = len(contents) // 2
+        gzip_contents = gzip.compress(contents[:half]) + gzip.compress(contents[half:])
+
+        for body, gzipped in [(contents, None), (gzip_contents, None), (gzip_contents, True)]:
+            self.mock_client.get_object.return_value = self._get_streaming_response(body)
+            result = list(s3.iter_json_lines('key.json', self.bucket, client=self.mock_client, gzipped=gzipped,
+                                             chunk_size=7))
+            self.assertEqual(result, records)
+
+        # Test limit and early stop close the body:
+        response = self._get_streaming_response(gzip_contents)
+        self.mock_client.get_object.return_value = response
+        result = list(s3.iter_json_lines('key.json.gz', self.bucket, client=self.mock_client, limit=3, chunk_size=7))
+        self.assertEqual(result, records[:3])
+        self.assertTrue(response['Body']._raw_stream.closed)
+
+        response = self._get_streaming_response(contents)
+        self.mock_client.get_object.return_value = response
+        records_iterator = s3.iter_json_lines('key.json', self.bucket, client=self.mock_client)
+        self.assertEqual(next(records_iterator), records[0])
+        records_iterator.close()
+        self.assertTrue(response['Body']._raw_stream.closed)
+
+        # Test last line without a newline, and zero limit:
+        self.mock_client.get_object.return_value = self._get_streaming_response(b'{"a": 1}\n\n{"b": 2}')
+        self.assertEqual(list(s3.iter_json_lines('key', self.bucket, client=self.mock_client)), [{'a': 1}, {'b': 2}])
+        self.assertEqual(list(s3.iter_json_lines('key', self.bucket, client=self.mock_client, limit=0)), [])
+
+    def test_verify_gzip_stream(self):
+        """
+        test watchmen.utils.s3.verify_gzip_stream checks complete, truncated and corrupted gzip streams
+        """
+        contents = b''.join(b'line ' + str(index).encode('utf-8') + b'\n' for index in range(2000))
+        gzip_contents = gzip.compress(contents) + gzip.compress(b'last\nline')
+
+        def get_chunks(data, size=100):
+            return (data[index:index + size] for index in range(0, len(data), size))
+
+        result = s3.verify_gzip_stream(get_chunks(gzip_contents), count_lines=True, buffer_size=64)
+        self.assertEqual(result, {'Valid': True, 'Members': 2, 'CompressedSize': len(gzip_contents),
+                                  'UncompressedSize': len(contents) + 9, 'NumLines': 2002})
+        self.assertNotIn('NumLines', s3.verify_gzip_stream([gzip_contents]))
+
+        # Test a truncated stream, a bad CRC, a bad length, a non-gzip file and an empty file:
+        first_member = gzip.compress(contents)
+        bad_crc, bad_length = bytearray(first_member), bytearray(first_member)
+        bad_crc[-8] ^= 1
+        bad_length[-1] ^= 1
+        tests = [(gzip_contents[:-5], 'truncated'), (bytes(bad_crc), 'incorrect data check'),
+                 (bytes(bad_length), 'incorrect length check'), (contents, 'incorrect header check'), (b'', 'empty')]
+        for data, error in tests:
+            result = s3.verify_gzip_stream(get_chunks(data), buffer_size=64)
+            self.assertFalse(result['Valid'])
+            self.assertIn(error, result['Error'])
+
+    def test_verify_gzips(self):
+        """
+        test watchmen.utils.s3.verify_gzip and verify_gzips, within a byte budget
+        """
+        files = {
+            'a.gz': gzip.compress(b'a\nb\nc\n'),
+            'b.gz': gzip.compress(b'd\ne\n')[:-4],
+        }
+
+        def get_object(**kwargs):
+            if kwargs['Key'] not in files:
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+            return self._get_streaming_response(files[kwargs['Key']])
+
+        response = self._get_streaming_response(files['a.gz'])
+        self.mock_client.get_object.return_value = response
+        result = s3.verify_gzip('a.gz', self.bucket, client=self.mock_client, count_lines=True, chunk_size=4)
+        self.assertEqual((result['Key'], result['Valid'], result['NumLines']), ('a.gz', True, 3))
+        self.assertTrue(response['Body']._raw_stream.closed)
+
+        self.mock_client.get_object.side_effect = get_object
+        results = s3.verify_gzips(self.bucket, ['a.gz', 'b.gz', 'c.gz', 'a.gz'], client=self.mock_client,
+                                  count_lines=True)
+        self.assertEqual(list(results), ['a.gz', 'b.gz', 'c.gz'])
+        self.assertEqual((results['a.gz']['Valid'], results['a.gz']['NumLines']), (True, 3))
+        self.assertEqual((results['b.gz']['Valid'], results['b.gz']['Error']), (False, 'The gzip stream is truncated'))
+        self.assertIsNone(results['c.gz']['Valid'])
+        self.assertIn('NoSuchKey', results['c.gz']['Error'])
+        self.assertEqual(s3.verify_gzips(self.bucket, [], client=self.mock_client), {})
+
+        # Test the files beyond the byte budget are skipped without being read:
+        results = s3.verify_gzips(self.bucket, ['a.gz', 'b.gz'], client=self.mock_client, max_workers=1,
+                                  byte_budget=len(files['a.gz']))
+        self.assertTrue(results['a.gz']['Valid'])
+        self.assertEqual((results['b.gz']['Valid'], results['b.gz']['Skipped']), (None, True))
+
+        budget = s3.ByteBudget(10)
+        self.assertTrue(budget.reserve(6))
+        self.assertFalse(budget.reserve(5))
+        self.assertTrue(budget.reserve(4))
+        self.assertEqual(budget.used, 10)
+
     @patch('watchmen.utils.s3.boto3_session')
     def test_mv(self, mock_boto3):
         """
@@ -791,6 +1676,93 @@ def test_process_keys(self, mock_check, mock_boto3):
         self.mock_iterator.search.assert_called_with('Contents')
         # Minus 1 at the end since the directory gets removed
         self.assertEqual(counts, len(self.mock_prefix_test_dirs) - 1)
+        self.mock_client.delete_objects.assert_called_once_with(
+            Bucket=self.bucket, Delete={'Objects': [{'Key': 'empty/'}], 'Quiet': True})
+
+    @patch('watchmen.utils.s3.delete_keys')
+    @patch('watchmen.utils.s3.check_bucket')
+    def test_process_keys_empty_folders(self, mock_check, mock_delete_keys):
+        """
+        process_keys should delete only the folder markers with no key under them, in one batch
+        """
+        mock_check.return_value = self.mock_check_true
+        mock_client = self.get_sharded_client({
+            'test/': 0, 'test/a/': 0, 'test/a/b/': 0, 'test/a/b/c': 1, 'test/a/d/': 0, 'test/e': 1, 'test/f/': 0})
+        counts = s3.process_keys(self.doFunc, "test/", bucket=self.bucket, client=mock_client, sharded=True)
+        self.assertEqual(counts, 2)
+        mock_delete_keys.assert_called_once_with(['test/a/d/', 'test/f/'], self.bucket, client=mock_client)
+
+    def test_delete_keys(self):
+        """
+        test watchmen.utils.s3.delete_keys in batches of DELETE_BATCH_SIZE keys
+        """
+        keys = ['results/{:04}.json'.format(index) for index in range(2500)]
+        self.mock_client.delete_objects.side_effect = [
+            {'Errors': [{'Key': keys[1], 'Code': 'AccessDenied', 'Message': 'Access Denied'}]},
+            {},
+            ClientError({'Error': {'Code': 'SlowDown'}}, 'DeleteObjects'),
+        ]
+        progress = MagicMock()
+        result = s3.delete_keys(keys + keys[:10], self.bucket, client=self.mock_client, progress=progress)
+
+        self.assertEqual(self.mock_client.delete_objects.call_count, 3)
+        self.mock_client.delete_objects.assert_any_call(
+            Bucket=self.bucket, Delete={'Objects': [{'Key': key_name} for key_name in keys[:1000]], 'Quiet': True})
+        self.assertEqual(result['Deleted'], keys[:1] + keys[2:2000])
+        self.assertEqual(len(result['Errors']), 501)
+        self.assertEqual(result['Errors'][keys[1]], 'AccessDenied: Access Denied')
+        self.assertIn('SlowDown', result['Errors'][keys[2000]])
+        self.assertEqual(progress.call_count, 2500)
+        progress.assert_any_call(keys[0], None)
+        progress.assert_any_call(keys[1], 'AccessDenied: Access Denied')
+
+        self.assertEqual(s3.delete_keys([], self.bucket, client=self.mock_client), {'Deleted': [], 'Errors': {}})
+
+    def test_copy_keys(self):
+        """
+        test watchmen.utils.s3.copy_keys
+        """
+        def copy_object(**kwargs):
+            if kwargs['Key'] == 'new/b':
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'CopyObject')
+
+        self.mock_client.copy_object.side_effect = copy_object
+        progress = MagicMock()
+        result = s3.copy_keys([('old/a', 'new/a'), ('old/b', 'new/b')], self.bucket, 'target_bucket',
+                              client=self.mock_client, progress=progress)
+        self.mock_client.copy_object.assert_any_call(
+            Bucket='target_bucket', CopySource={'Bucket': self.bucket, 'Key': 'old/a'}, Key='new/a')
+        self.assertEqual(result['Copied'], ['old/a'])
+        self.assertEqual(list(result['Errors']), ['old/b'])
+        progress.assert_any_call('old/a', None)
+        self.assertEqual(progress.call_count, 2)
+
+        self.assertEqual(s3.copy_keys({}, self.bucket, client=self.mock_client), {'Copied': [], 'Errors': {}})
+
+    def test_move_keys(self):
+        """
+        test watchmen.utils.s3.move_keys copies concurrently then deletes the copied sources in batch
+        """
+        def copy_object(**kwargs):
+            if kwargs['Key'] == 'new/b':
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'CopyObject')
+
+        self.mock_client.copy_object.side_effect = copy_object
+        self.mock_client.delete_objects.return_value = {
+            'Errors': [{'Key': 'old/c', 'Code': 'AccessDenied', 'Message': 'Access Denied'}]}
+        progress = MagicMock()
+        result = s3.move_keys({'old/a': 'new/a', 'old/b': 'new/b', 'old/c': 'new/c'}, self.bucket,
+                              client=self.mock_client, progress=progress)
+
+        self.mock_client.copy_object.assert_any_call(
+            Bucket=self.bucket, CopySource={'Bucket': self.bucket, 'Key': 'old/a'}, Key='new/a')
+        self.mock_client.delete_objects.assert_called_once_with(
+            Bucket=self.bucket, Delete={'Objects': [{'Key': 'old/a'}, {'Key': 'old/c'}], 'Quiet': True})
+        self.assertEqual(result['Moved'], ['old/a'])
+        self.assertEqual(sorted(result['Errors']), ['old/b', 'old/c'])
+        self.assertEqual(result['Errors']['old/c'], 'Copied but not deleted: AccessDenied: Access Denied')
+        self.assertEqual(progress.call_count, 3)
+        progress.assert_any_call('old/a', None)
 
     @patch('watchmen.utils.s3.boto3_session')
     @patch('watchmen.utils.s3.check_bucket')
@@ -820,23 +1792,252 @@ def test_generate_pages(self, mock_check, mock_boto3):
 
         self.mock_iterator.search.assert_called_with('Contents')
 
-    @mock_s3
-    @patch('watchmen.utils.s3.boto3.resource')
-    def test_validate_file_on_s3(self, mock_resource):
+    @patch('watchmen.utils.s3.boto3_session')
+    @patch('watchmen.utils.s3.check_bucket')
+    def test_generate_pages_client(self, mock_check, mock_boto3):
+        """
+        generate_pages should list through an injected client
+        """
+        mock_check.return_value = self.mock_check_true
+        self.mock_iterator.search.return_value = self.mock_prefix_more_keys
+        result = list(s3.generate_pages("test", bucket=self.bucket, client=self.mock_client))
+        self.assertEqual(result, self.mock_prefix_more_keys)
+        mock_boto3.Session.assert_not_called()
+
+    @patch('watchmen.utils.s3.check_bucket')
+    def test_generate_pages_start_after(self, mock_check):
+        """
+        generate_pages should only list the keys after 'start_after', with ListObjectsV2 StartAfter
+        """
+        mock_check.return_value = self.mock_check_true
+        mock_client = self.get_sharded_client({'day/0900.gz': 1, 'day/0930.gz': 2, 'day/1000.gz': 3})
+        paginate = mock_client.get_paginator.return_value.paginate.side_effect
+
+        def search_pages(**kwargs):
+            pages = MagicMock()
+            pages.search.side_effect = lambda _: [obj for page in paginate(**kwargs) for obj in page['Contents']]
+            pages.__iter__.side_effect = lambda: iter(paginate(**kwargs))
+            return pages
+
+        mock_client.get_paginator.return_value.paginate.side_effect = search_pages
+        result = list(s3.generate_pages('day/', bucket=self.bucket, client=mock_client, start_after='day/0930'))
+        self.assertEqual([obj['Key'] for obj in result], ['day/0930.gz', 'day/1000.gz'])
+        mock_client.get_paginator.assert_called_once_with('list_objects_v2')
+        self.assertEqual(mock_client.get_paginator.return_value.paginate.call_args[1]['StartAfter'], 'day/0930')
+
+        # Test sharded listings drop the keys before it:
+        result = list(s3.generate_pages(
+            'day/', bucket=self.bucket, client=mock_client, sharded=True, shards=[''], start_after='day/0930.gz'))
+        self.assertEqual([obj['Key'] for obj in result], ['day/1000.gz'])
+
+        # Test listings with start_after are served from, but not kept in, a listing cache:
+        cache = s3.ListingCache()
+        list(cache.generate_pages('day/', bucket=self.bucket, client=mock_client, start_after='day/0930'))
+        self.assertIsNone(cache.get(self.bucket, 'day/'))
+        list(cache.generate_pages('day/', bucket=self.bucket, client=mock_client))
+        result = list(cache.generate_pages('day/', bucket=self.bucket, client=mock_client, start_after='day/0930'))
+        self.assertEqual([obj['Key'] for obj in result], ['day/0930.gz', 'day/1000.gz'])
+        self.assertEqual(mock_client.get_paginator.return_value.paginate.call_count, 4)
+
+    def get_sharded_client(self, listing, delimiter_page_size=None):
+        """
+        mock a client whose list_objects paginator serves pages of the listing per prefix and delimiter
+        @param delimiter_page_size: the number of objects and sub-prefixes per page of a Delimiter listing; one page
+                                    by default
+        """
+        class PageIterator(list):
+            def search(self, expression):
+                return (obj for page in self for obj in page.get(expression, []))
+
+        def paginate(Bucket, Prefix, Delimiter='', PaginationConfig=None, StartAfter=''):
+            keys = sorted(key for key in listing if key.startswith(Prefix) and key > StartAfter)
+            if Delimiter:
+                # (name, is a sub-prefix) of the objects and the sub-prefixes, in key order:
+                entries = sorted({(Prefix + key[len(Prefix):].split(Delimiter)[0] + Delimiter, True)
+                                  if Delimiter in key[len(Prefix):] else (key, False) for key in keys})
+                page_size = delimiter_page_size or len(entries) or 1
+                pages = PageIterator()
+                for i in range(0, len(entries), page_size):
+                    page = entries[i:i + page_size]
+                    pages.append({
+                        'CommonPrefixes': [{'Prefix': name} for name, is_prefix in page if is_prefix],
+                        'Contents': [{'Key': name, 'Size': listing[name]} for name, is_prefix in page if not is_prefix],
+                        'IsTruncated': i + page_size < len(entries)})
+                return pages
+            contents = [{'Key': key, 'Size': listing[key]} for key in keys][:(PaginationConfig or {}).get('MaxItems')]
+            return PageIterator({'Contents': contents[i:i + 2]} for i in range(0, len(contents), 2))
+
+        mock_client = MagicMock()
+        mock_client.get_paginator.return_value.paginate.side_effect = paginate
+        return mock_client
+
+    def test_discover_prefixes(self):
+        """
+        test watchmen.utils.s3.discover_prefixes
+        """
+        mock_client = self.get_sharded_client({'day/hour=01/a': 1, 'day/hour=00/b': 1, 'day/_SUCCESS': 0})
+        sub_prefixes, objects = s3.discover_prefixes('day/', self.bucket, client=mock_client)
+        self.assertEqual(sub_prefixes, ['day/hour=00/', 'day/hour=01/'])
+        self.assertEqual(objects, [{'Key': 'day/_SUCCESS', 'Size': 0}])
+
+        # Test the listing stops once max_items objects are found directly under the prefix:
+        listing = dict(('day/{}'.format(part), 1) for part in range(1, 7))
+        listing['day/0/a'] = 1
+        mock_client = self.get_sharded_client(listing, delimiter_page_size=2)
+        sub_prefixes, objects = s3.discover_prefixes('day/', self.bucket, client=mock_client, max_items=2)
+        self.assertEqual((sub_prefixes, [obj['Key'] for obj in objects]), (['day/0/'], ['day/1', 'day/2']))
+
+        # Test a flat prefix is not listed further than its first page:
+        mock_client = self.get_sharded_client({'day/{}'.format(part): 1 for part in range(6)}, delimiter_page_size=2)
+        sub_prefixes, objects = s3.discover_prefixes('day/', self.bucket, client=mock_client)
+        self.assertEqual((sub_prefixes, objects), ([], None))
+
+    def test_generate_sharded_objects(self):
+        """
+        test watchmen.utils.s3.generate_sharded_objects
+        """
+        listing = {'day/_SUCCESS': 0, 'day/hour=00/': 0}
+        for hour in range(3):
+            for part in range(5):
+                listing['day/hour={:02d}/part-{}'.format(hour, part)] = hour + part
+        mock_client = self.get_sharded_client(listing)
+
+        # discovered shards, in a deterministic order:
+        result = [obj['Key'] for obj in s3.generate_sharded_objects('day/', bucket=self.bucket, client=mock_client)]
+        self.assertEqual(result, sorted(listing))
+
+        # configured shards:
+        result = list(s3.generate_sharded_objects(
+            'day/', bucket=self.bucket, client=mock_client, shards=['hour=02/', 'hour=00/'], max_workers=1))
+        self.assertEqual([obj['Key'] for obj in result][:5], ['day/hour=02/part-{}'.format(i) for i in range(5)])
+        self.assertEqual(len(result), 11)
+
+        # max_items across shards:
+        result = list(s3.generate_sharded_objects('day/', bucket=self.bucket, client=mock_client, max_items=7))
+        self.assertEqual(len(result), 7)
+
+        # a flat prefix is listed without a Delimiter, serially:
+        listing = dict(('day/part-{}'.format(part), 1) for part in range(5))
+        mock_client = self.get_sharded_client(listing, delimiter_page_size=2)
+        result = list(s3.generate_sharded_objects('day/', bucket=self.bucket, client=mock_client, max_items=4))
+        self.assertEqual([obj['Key'] for obj in result], sorted(listing)[:4])
+        paginate = mock_client.get_paginator.return_value.paginate
+        self.assertEqual(paginate.call_count, 2)
+        paginate.assert_called_with(Bucket=self.bucket, Prefix='day/', Delimiter='', PaginationConfig={'MaxItems': 4})
+
+    def test_generate_sharded_objects_stopped(self):
+        """
+        test watchmen.utils.s3.generate_sharded_objects lists no more shards once its consumer stops
+        """
+        listing = dict(('day/{}/part-{}'.format(shard, part), 1) for shard in 'abcd' for part in range(3))
+        mock_client = self.get_sharded_client(listing)
+        objects = s3.generate_sharded_objects('day/', bucket=self.bucket, client=mock_client,
+                                              shards=['a/', 'b/', 'c/', 'd/'], max_workers=1)
+        self.assertEqual(next(objects)['Key'], 'day/a/part-0')
+        objects.close()
+        time.sleep(0.3)
+        listed_shards = [call[1]['Prefix'] for call in mock_client.get_paginator.return_value.paginate.call_args_list]
+        self.assertEqual(listed_shards, ['day/a/'])
+
+        # A shard started after the consumer stopped sends no request:
+        stop_event = threading.Event()
+        stop_event.set()
+        mock_client = MagicMock()
+        s3._list_shard(mock_client, self.bucket, 'day/a/', None, Mock(), stop_event)
+        mock_client.get_paginator.assert_not_called()
+
+    def test_generate_sharded_objects_exception(self):
+        """
+        test watchmen.utils.s3.generate_sharded_objects raises the errors of the shard listings
+        """
+        mock_client = MagicMock()
+        mock_client.get_paginator.return_value.paginate.side_effect = self.mock_client_err
+        with self.assertRaises(ClientError):
+            list(s3.generate_sharded_objects('day/', bucket=self.bucket, client=mock_client, shards=['a/', 'b/']))
+
+    @patch('watchmen.utils.s3.check_bucket')
+    def test_generate_pages_sharded(self, mock_check):
+        """
+        generate_pages should list the shards when 'sharded' is set and skip folder markers
+        """
+        mock_check.return_value = self.mock_check_true
+        mock_client = self.get_sharded_client({'day/hour=00/': 0, 'day/hour=00/a': 1, 'day/hour=01/b': 2})
+        result = list(s3.generate_pages('day/', bucket=self.bucket, client=mock_client, sharded=True))
+        self.assertEqual([obj['Key'] for obj in result], ['day/hour=00/a', 'day/hour=01/b'])
+
+    @patch('watchmen.utils.s3.generate_sharded_objects')
+    @patch('watchmen.utils.s3.check_bucket')
+    def test_process_keys_sharded(self, mock_check, mock_sharded):
+        """
+        process_keys should process the objects of the sharded listing when 'sharded' is set
+        """
+        mock_check.return_value = self.mock_check_true
+        mock_sharded.return_value = iter(self.mock_prefix_more_keys)
+        counts = s3.process_keys(self.doFunc, "more", bucket=self.bucket, sharded=True)
+        self.assertEqual(counts, len(self.mock_prefix_more_keys))
+        mock_sharded.assert_called_with("more", bucket=self.bucket, sharded=True)
+
+    def test_validate_file_on_s3(self):
+        mock_client = MagicMock()
         # When file size is zero
-        mock_resource.return_value.Object.return_value.get.return_value = self.example_content_length_zero
+        mock_client.head_object.return_value = self.example_content_length_zero
         expected = False
-        returned = validate_file_on_s3(self.bucket, self.example_path)
+        returned = validate_file_on_s3(self.bucket, self.example_path, client=mock_client)
         self.assertEqual(expected, returned)
 
         # When file size is non-zero
-        mock_resource.return_value.Object.return_value.get.return_value = self.example_content_length
+        mock_client.head_object.return_value = self.example_content_length
         expected = True
-        returned = validate_file_on_s3(self.bucket, self.example_path)
+        returned = validate_file_on_s3(self.bucket, self.example_path, client=mock_client)
         self.assertEqual(expected, returned)
+        mock_client.head_object.assert_called_with(Bucket=self.bucket, Key=self.example_path)
+        mock_client.get_object.assert_not_called()
+
+        # When the file doesn't exist, or is forbidden because the bucket cannot be listed
+        for code in ['404', '403', 'AccessDenied']:
+            mock_client.head_object.side_effect = ClientError({'Error': {'Code': code}}, 'HeadObject')
+            expected = False
+            returned = validate_file_on_s3(self.bucket, self.example_path, client=mock_client)
+            self.assertEqual(expected, returned)
 
-        # When a client error occurs
-        mock_resource.return_value.Object.return_value.get.side_effect = ClientError({}, {})
-        expected = False
-        returned = validate_file_on_s3(self.bucket, self.example_path)
-        self.assertEqual(expected, returned)
+        # When any other client error occurs
+        mock_client.head_object.side_effect = self.mock_client_err
+        with self.assertRaises(s3.ObjectMetadataError) as context:
+            validate_file_on_s3(self.bucket, self.example_path, client=mock_client)
+        self.assertTrue(self.err_boto3_msg in str(context.exception))
+
+    def test_get_object(self):
+        """
+        test watchmen.utils.s3.get_object
+        """
+        self.mock_client.head_object.return_value = self.example_content_length
+        returned = s3.get_object(self.bucket, self.example_path, client=self.mock_client)
+        self.assertEqual(returned['ContentLength'], 200)
+
+        self.mock_client.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        returned = s3.get_object(self.bucket, self.example_path, client=self.mock_client)
+        self.assertFalse(returned)
+
+    def test_object_metadata_probe(self):
+        """
+        test watchmen.utils.s3.ObjectMetadataProbe sends one HEAD request per key
+        """
+        self.mock_client.head_object.return_value = {'ContentLength': 200, 'ETag': '"abc"'}
+        probe = s3.ObjectMetadataProbe(client=self.mock_client)
+
+        self.assertTrue(validate_file_on_s3(self.bucket, self.example_path, probe=probe))
+        self.assertEqual(s3.get_object(self.bucket, self.example_path, probe=probe)['ETag'], '"abc"')
+        self.assertTrue(s3.check_size(self.example_path, self.bucket, probe=probe))
+        self.assertEqual(self.mock_client.head_object.call_count, 1)
+        self.assertEqual(probe.requests, 1)
+
+        result = probe.prefetch(self.bucket, [self.example_path, 'other/key'])
+        self.assertEqual(list(result), [self.example_path, 'other/key'])
+        self.assertEqual(self.mock_client.head_object.call_count, 2)
+        self.mock_client.head_object.assert_called_with(Bucket=self.bucket, Key='other/key')
+        probe.get(self.bucket, 'other/key')
+        self.assertEqual(probe.requests, 2)
+
+        probe.clear()
+        probe.get(self.bucket, 'other/key')
+        self.assertEqual(self.mock_client.head_object.call_count, 3)
@@ -11,6 +11,10 @@
 
 from watchmen.utils import s3_storage
 
+import gzip
+import json
+import os
+import tempfile
 import unittest
 
 
@@ -24,9 +28,8 @@ def setUp(self):
         setup test
         """
         self.bucket = "s3-bucket"
-        self.s3_storage = s3_storage.S3Storage(self.bucket)
-        self.s3_resource = self.s3_storage.resource
-        self.s3_client = self.s3_storage.client
+        self.s3_client = MagicMock()
+        self.s3_storage = s3_storage.S3Storage(self.bucket, client=self.s3_client)
 
         self.doFunc = lambda x, **kwargs: MagicMock()()
         pass
@@ -62,13 +65,25 @@ def test_delete(self, mock_s3):
         mock_s3.delete_key.assert_called_with(
             's3/key/path', bucket=self.bucket, client=self.s3_client)
 
+    @patch('watchmen.utils.s3_storage.s3')
+    def test_delete_keys(self, mock_s3):
+        """
+        test utils.s3_storage.S3Storage interfaces - delete_keys method
+        """
+        self.s3_storage.delete_keys(['s3/key/a', 's3/key/b'])
+        mock_s3.delete_keys.assert_called_with(
+            ['s3/key/a', 's3/key/b'], bucket=self.bucket, client=self.s3_client, progress=None)
+
     @patch('watchmen.utils.s3_storage.s3')
     def test_exists(self, mock_s3):
         """
         test utils.s3_storage.S3Storage interfaces - exists method
         """
-        self.s3_storage.exists('s3/key/path')
-        mock_s3.check_key.assert_called_with(
+        tests = [({'Exists': True}, True), ({'Exists': False}, False), ({'Exists': None, 'Error': 'tb'}, False)]
+        for metadata, expected in tests:
+            mock_s3.head_object.return_value = metadata
+            self.assertEqual(self.s3_storage.exists('s3/key/path'), expected)
+        mock_s3.head_object.assert_called_with(
             's3/key/path', bucket=self.bucket, client=self.s3_client)
 
     @patch('watchmen.utils.s3_storage.s3')
@@ -94,10 +109,14 @@ def test_get_last_modified(self, mock_s3):
         """
         test utils.s3_storage.S3Storage interfaces - get_last_modified method
         """
-        self.s3_storage.get_last_modified('s3/key/path')
-        mock_s3.get_key.assert_called_with(
+        mock_s3.head_object.return_value = {'Exists': True, 'LastModified': 'last-modified'}
+        self.assertEqual(self.s3_storage.get_last_modified('s3/key/path'), 'last-modified')
+        mock_s3.head_object.assert_called_with(
             's3/key/path', bucket=self.bucket, client=self.s3_client)
 
+        mock_s3.head_object.return_value = {'Exists': False}
+        self.assertIsNone(self.s3_storage.get_last_modified('s3/key/path'))
+
     @patch('watchmen.utils.s3_storage.s3')
     def test_get_parquet_content(self, mock_s3):
         """
@@ -105,17 +124,38 @@ def test_get_parquet_content(self, mock_s3):
         """
         self.s3_storage.get_parquet_content('s3/key/path')
         mock_s3.get_parquet_data.assert_called_with(
-            's3/key/path', bucket=self.bucket, client=self.s3_client)
+            's3/key/path', bucket=self.bucket, client=self.s3_client, limit=None)
+
+    @patch('watchmen.utils.s3_storage.s3')
+    def test_init(self, mock_s3):
+        """
+        test utils.s3_storage.S3Storage interfaces - __init__ uses the pooled client of the bucket
+        """
+        storage = s3_storage.S3Storage(self.bucket)
+        mock_s3.get_bucket_client.assert_called_with(self.bucket)
+        self.assertEqual(storage.client, mock_s3.get_bucket_client.return_value)
+
+    @patch('watchmen.utils.s3_storage.s3')
+    def test_list_objects(self, mock_s3):
+        """
+        test utils.s3_storage.S3Storage interfaces - list_objects method
+        """
+        self.s3_storage.list_objects('s3/key/prefix/', max_items=10)
+        mock_s3.generate_pages.assert_called_with(
+            's3/key/prefix/', bucket=self.bucket, client=self.s3_client, max_items=10)
 
     @patch('watchmen.utils.s3_storage.s3')
     def test_move(self, mock_s3):
         """
-        test utils.s3_storage.S3Storage interfaces - exists method
+        test utils.s3_storage.S3Storage interfaces - move method
         """
-        self.s3_storage.move('s3/key/source_path', 's3/key/target_path')
-        mock_s3.mv_key.assert_called_with(
-            's3/key/source_path', 's3/key/target_path',
-            bucket=self.bucket, client=self.s3_resource)
+        tests = [({'Moved': ['s3/key/source_path'], 'Errors': {}}, True),
+                 ({'Moved': [], 'Errors': {'s3/key/source_path': 'error'}}, False)]
+        for result, expected in tests:
+            mock_s3.move_keys.return_value = result
+            self.assertEqual(self.s3_storage.move('s3/key/source_path', 's3/key/target_path'), expected)
+        mock_s3.move_keys.assert_called_with(
+            [('s3/key/source_path', 's3/key/target_path')], bucket=self.bucket, client=self.s3_client)
 
     @patch('watchmen.utils.s3_storage.s3')
     def test_process(self, mock_s3):
@@ -132,6 +172,11 @@ def test_process(self, mock_s3):
         mock_s3.process_keys.assert_called_with(
             self.doFunc, prefix='s3/key/prefix/', client=self.s3_client, **kwargs)
 
+        # The bucket of the storage is used by default
+        self.s3_storage.process(self.doFunc, 's3/key/prefix/')
+        mock_s3.process_keys.assert_called_with(
+            self.doFunc, prefix='s3/key/prefix/', client=self.s3_client, bucket=self.bucket)
+
     @patch('watchmen.utils.s3_storage.s3')
     def test_save(self, mock_s3):
         """
@@ -140,3 +185,134 @@ def test_save(self, mock_s3):
         self.s3_storage.save('s3/key/path', 'contents')
         mock_s3.copy_contents_to_bucket.assert_called_with(
             'contents', 's3/key/path', bucket=self.bucket, client=self.s3_client)
+
+
+class TestLocalStorage(unittest.TestCase):
+    """
+    TestLocalStorage includes all unit tests for utils.s3_storage.LocalStorage
+    """
+
+    def setUp(self):
+        """
+        setup test
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, 'local-bucket')
+        self.storage = s3_storage.LocalStorage(self.root)
+
+    def tearDown(self):
+        """
+        tear down each test
+        """
+        self.directory.cleanup()
+
+    def test_create(self):
+        """
+        test utils.s3_storage.LocalStorage - create, head, exists and get_content
+        """
+        self.assertEqual(self.storage.bucket, 'local-bucket')
+        metadata = self.storage.create('a/b/c.json', '{"k": 1}')
+        self.assertEqual((metadata['Key'], metadata['Exists'], metadata['ContentLength']), ('a/b/c.json', True, 8))
+        self.assertIsNotNone(metadata['LastModified'].tzinfo)
+        self.assertEqual(self.storage.get_last_modified('a/b/c.json'), metadata['LastModified'])
+        self.assertTrue(self.storage.exists('a/b/c.json'))
+        self.assertEqual(self.storage.get_content('a/b/c.json'), b'{"k": 1}')
+        self.assertEqual(self.storage.get_json_data('a/b/c.json'), {'k': 1})
+
+        # Test empty, missing and invalid keys:
+        self.storage.save('a/empty.json', b'')
+        self.assertEqual(self.storage.get_content('a/empty.json'), "")
+        self.assertIsNone(self.storage.get_json_data('a/empty.json'))
+        self.assertEqual(self.storage.head('a/missing.json'), {'Key': 'a/missing.json', 'Exists': False})
+        self.assertFalse(self.storage.exists('a/missing.json'))
+        self.assertIsNone(self.storage.get_content('a/missing.json'))
+        self.assertIsNone(self.storage.get_last_modified('a/missing.json'))
+        self.assertIsNone(self.storage.create('../outside.json', 'contents'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, 'outside.json')))
+
+    def test_delete(self):
+        """
+        test utils.s3_storage.LocalStorage - delete and delete_keys
+        """
+        for key_path in ['a/1.json', 'a/2.json', 'a/3.json']:
+            self.storage.create(key_path, 'contents')
+        self.assertTrue(self.storage.delete('a/1.json'))
+        self.assertFalse(self.storage.delete('a/1.json'))
+
+        progress = MagicMock()
+        result = self.storage.delete_keys(['a/2.json', 'a/3.json', 'a/2.json', '../outside.json'], progress=progress)
+        self.assertEqual(result['Deleted'], ['a/2.json', 'a/3.json'])
+        self.assertEqual(list(result['Errors']), ['../outside.json'])
+        self.assertEqual(progress.call_count, 3)
+        self.assertEqual(list(self.storage.list_objects('a/')), [])
+
+    def test_get_parquet_content(self):
+        """
+        test utils.s3_storage.LocalStorage - get_parquet_content of plain and gzipped JSON lines
+        """
+        records = [{'id': index} for index in range(5)]
+        lines = '\n'.join(json.dumps(record) for record in records) + '\n'
+        self.storage.create('plain.parquet', lines)
+        self.storage.create('gzipped.parquet', gzip.compress(lines.encode('utf-8')))
+        self.assertEqual(self.storage.get_parquet_content('plain.parquet'), records)
+        self.assertEqual(self.storage.get_parquet_content('gzipped.parquet'), records)
+        self.assertEqual(self.storage.get_parquet_content('gzipped.parquet', limit=2), records[:2])
+        self.assertIsNone(self.storage.get_parquet_content('missing.parquet'))
+
+    def test_list_objects(self):
+        """
+        test utils.s3_storage.LocalStorage - list_objects and process in S3 key order
+        """
+        key_paths = ['data/day=02/b.json', 'data/day=01/a.json', 'data/day=01.json', 'data2/c.json', 'other.json']
+        for key_path in key_paths:
+            self.storage.create(key_path, 'abc')
+
+        objects = list(self.storage.list_objects('data/'))
+        self.assertEqual([obj['Key'] for obj in objects], ['data/day=01.json', 'data/day=01/a.json',
+                                                           'data/day=02/b.json'])
+        self.assertEqual(set(obj['Size'] for obj in objects), {3})
+        self.assertEqual([obj['Key'] for obj in self.storage.list_objects('data')],
+                         ['data/day=01.json', 'data/day=01/a.json', 'data/day=02/b.json', 'data2/c.json'])
+        self.assertEqual([obj['Key'] for obj in self.storage.list_objects('data/day=01')],
+                         ['data/day=01.json', 'data/day=01/a.json'])
+        self.assertEqual(len(list(self.storage.list_objects(max_items=2))), 2)
+        self.assertEqual(list(self.storage.list_objects('missing/')), [])
+
+        func = MagicMock()
+        self.assertEqual(self.storage.process(func, 'data/day=02/', counter=0), 1)
+        func.assert_called_once_with(objects[2], counter=0)
+
+    def test_move(self):
+        """
+        test utils.s3_storage.LocalStorage - move
+        """
+        self.storage.create('a/source.json', 'contents')
+        self.assertTrue(self.storage.move('a/source.json', 'b/target.json'))
+        self.assertFalse(self.storage.exists('a/source.json'))
+        self.assertEqual(self.storage.get_content('b/target.json'), b'contents')
+        self.assertFalse(self.storage.move('a/source.json', 'b/target.json'))
+
+    def test_interface(self):
+        """
+        test utils.s3_storage.Storage - abstract interface
+        """
+        with self.assertRaises(TypeError):
+            s3_storage.Storage()
+
+    @patch('watchmen.utils.s3_storage.s3')
+    @patch('watchmen.utils.s3_storage.settings')
+    def test_get_storage(self, mock_settings, mock_s3):
+        """
+        test utils.s3_storage.get_storage - LocalStorage per storage.local_root, else S3Storage
+        """
+        mock_settings.return_value = self.directory.name
+        storage = s3_storage.get_storage('local-bucket')
+        mock_settings.assert_called_with('storage.local_root')
+        self.assertIsInstance(storage, s3_storage.LocalStorage)
+        self.assertEqual((storage.root, storage.bucket), (self.root, 'local-bucket'))
+
+        mock_settings.return_value = ''
+        client = MagicMock()
+        storage = s3_storage.get_storage('bucket', client=client)
+        self.assertIsInstance(storage, s3_storage.S3Storage)
+        self.assertEqual((storage.bucket, storage.client), ('bucket', client))
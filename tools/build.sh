@@ -88,6 +88,9 @@ function build() {
     conf_yml=${SOURCE_DIR}/config-${BUILD_ENV}.yaml
     echo ""
   fi
+  log_trace "- compiling the target configs to plans ..."
+  (cd ${builds_path}/${FEATURE} && ${PYTHON_EXEC} -m ${PROJECT}.common.target_plans ${PROJECT}/process/configs) \
+    || log_error "Invalid target configs in ${SOURCE_DIR}/process/configs"
   cd ${builds_path}/${FEATURE} && zip -r ../${BUILD_PACKAGE} .
   cd -P "${script_base}" && pwd
 
@@ -0,0 +1,35 @@
+"""
+watchmen/common/rorschach_handlers.py
+This file holds the Rorschach Lambda handlers shared by the main modules of every account (main_saas, main_atg and
+main_cyberintel), which import them as their own entry points.
+"""
+from watchmen.common.result_svc import ResultSvc
+from watchmen.process.rorschach import Rorschach
+from watchmen.utils import arrivals
+
+
+def start_arrival_counter(event, context):
+    """
+    Count the S3 objects created per the S3 ObjectCreated notifications of the event, for the Rorschach items checked
+    with "arrival_counters".
+    :return: The number of objects counted.
+    """
+    return arrivals.count_arrivals(event)
+
+
+def start_rorschach_sweep(event, context):
+    """
+    Start the rorschach watcher for every schedule due in the time window of the event, e.g.
+    {"Start": "2020-05-26T14:00:00Z", "End": "2020-05-26T15:00:00Z"}, the last minutes by default.
+    The alerts are sent and the results are saved per schedule, as if each schedule was run on its own.
+    :return: The lambda messages of the schedules.
+    """
+    rorschach = Rorschach(event, context)
+    sweep_results = rorschach.sweep(event.get('Start'), event.get('End'))
+    lambda_messages = []
+    for _, results in sweep_results:
+        result_svc = ResultSvc(results)
+        result_svc.send_alert()
+        result_svc.save_results(results)
+        lambda_messages.append(result_svc.create_lambda_message())
+    return lambda_messages
@@ -1,7 +1,7 @@
 """
 Created on April 30, 2021
 watchmen/common/storage_service.py
-This class is used to store Watchmen Result objects. At the moment, it only stores Results in S3.
+This class is used to store Watchmen Result objects in S3, or in the local directory of storage.local_root.
 @author: Saba Farheen
 @email: sfarheen@infoblox.com
 """
@@ -10,7 +10,7 @@
 import json
 
 from watchmen.config import LOGGER, settings
-from watchmen.utils.s3 import create_key
+from watchmen.utils.s3_storage import get_storage
 
 FOLDER = settings('storage_service.s3_prefix')
 NOW = datetime.datetime.utcnow()
@@ -55,7 +55,7 @@ def _save_to_s3(results, bucket):
                                       NOW.strftime('%d'),
                                       NOW.strftime('%Y-%m-%d%X.%f'))
             result_data = json.dumps(data, indent=4)  # data is converted to json form to get an organised output.
-            return create_key(result_data, s3_prefix, bucket=bucket)
+            return get_storage(bucket).create(s3_prefix, result_data)
         except Exception as ex:
             LOGGER.exception('{}'.format(ex))
             return None
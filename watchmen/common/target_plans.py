@@ -0,0 +1,336 @@
+"""
+# target_plans module compiles the target configs of the watchmen into validated plans
+
+A plan is a target config (s3_targets_*.yaml, github_targets.yaml or api_targets.yaml) checked against the tags the
+watchman understands, with its targets indexed by schedule, e.g. 'Weekly,Tue,08:00' for the Rorschach event type
+{"Weekly": "Tue,08:00"}. Config errors are then reported all at once, at build time, rather than at run time.
+An S3 item with problems (e.g. an unknown tag, or neither "prefix" nor "full_path") is reported and left out of the
+plan, so it does not stop the other targets from being checked.
+
+At build time, `python -m watchmen.common.target_plans [configs directory]` validates every target config and writes
+its plan next to it as `<config name>.plan.json`, so a Lambda loads JSON instead of parsing YAML. Plans are cached per
+process by load_plan(), so warm invocations reuse them.
+"""
+import copy
+import hashlib
+import json
+import os
+import sys
+import threading
+from logging import getLogger
+
+import yaml
+
+LOGGER = getLogger(__name__)
+
+API_TARGETS = 'api'
+GITHUB_TARGETS = 'github'
+S3_TARGETS = 's3'
+
+CONFIGS_DIR = os.path.join(os.path.realpath(os.path.dirname(os.path.dirname(__file__))), 'process', 'configs')
+PLAN_SUFFIX = '.plan.json'
+PLAN_VERSION = 2
+
+S3_EVENT_TYPES = ['Minutely', 'Hourly', 'Daily', 'Weekly', 'Monthly']
+# The tags of an S3 target item and their types; see "Adding S3 Targets to Rorschach" in watchmen/README.md
+S3_ITEM_TAGS = {
+    'arrival_counters': bool,
+    'bucket_name': str,
+    'early_exit': bool,
+    'expected_columns': list,
+    'full_path': str,
+    'inventory_bucket': str,
+    'inventory_prefix': str,
+    'max_items': int,
+    'min_lines': int,
+    'min_total_files': int,
+    'min_total_rows': int,
+    'min_total_size_kb': (int, float),
+    'offset_type': str,
+    'partial_empty_check': bool,
+    'path_vars': list,
+    'prefix': str,
+    'prefix_offset': int,
+    'prefix_offset_type': str,
+    'sharded': bool,
+    'shards': list,
+    'start_after': str,
+    'suffix': str,
+    'time_offset': int,
+    'verify_gzip': bool,
+    'whitelist': list,
+}
+GITHUB_CHECKS = ['Commits', 'Releases']
+GITHUB_TARGET_TAGS = {
+    'checks': list,
+    'offset_type': str,
+    'owner': str,
+    'repo': str,
+    'target_name': str,
+    'target_path': (str, list),
+    'time_offset': int,
+}
+# The API targets also take free-form tags (e.g. in 'head' and 'url_arguments'), so only these are type-checked:
+API_TARGET_TAGS = {
+    'encode': str,
+    'hash': str,
+    'head': dict,
+    'increment': (int, float),
+    'quotas': list,
+    'target_name': str,
+    'threshold_start': (int, float),
+    'timestamp': str,
+    'url': str,
+    'url_arguments': dict,
+}
+
+_PLANS = {}
+_PLANS_LOCK = threading.Lock()
+
+
+def _check_tags(entry, tag_types, where, errors, required=(), strict=True):
+    """
+    Check the tags of a config entry (dict) against their types, appending the problems to @errors
+    @param strict: report the tags missing from @tag_types as unknown
+    """
+    if not isinstance(entry, dict):
+        errors.append('{}: expected a mapping, not {}'.format(where, type(entry).__name__))
+        return False
+    for tag in required:
+        if entry.get(tag) is None:
+            errors.append('{}: missing required tag "{}"'.format(where, tag))
+    for tag, value in entry.items():
+        if tag not in tag_types:
+            if strict:
+                errors.append('{}: unknown tag "{}"'.format(where, tag))
+            continue
+        types = tag_types[tag] if isinstance(tag_types[tag], tuple) else (tag_types[tag],)
+        # booleans are ints in python, but not in a config
+        if value is not None and (not isinstance(value, types) or isinstance(value, bool) and bool not in types):
+            errors.append('{}: tag "{}" must be {}, not {}'.format(
+                where, tag, ' or '.join(t.__name__ for t in types), type(value).__name__))
+    return True
+
+
+def _check_s3_item(item, where, errors):
+    """
+    Check an S3 item, appending its problems to @errors
+    """
+    if not _check_tags(item, S3_ITEM_TAGS, where, errors, required=['bucket_name']):
+        return
+    paths = [tag for tag in ('prefix', 'full_path') if item.get(tag)]
+    if len(paths) != 1:
+        errors.append('{}: expected either "prefix" or "full_path"'.format(where))
+    for tag in ('offset_type', 'prefix_offset_type'):
+        if item.get(tag) and item[tag] not in S3_EVENT_TYPES:
+            errors.append('{}: "{}" must be one of {}'.format(where, tag, S3_EVENT_TYPES))
+    if item.get('path_vars') and paths and '{var}' not in str(item.get(paths[0])):
+        errors.append('{}: "path_vars" needs a {{var}} placeholder in "{}"'.format(where, paths[0]))
+
+
+def _check_targets(targets, where, errors, skipped, check_target):
+    """
+    Check a list of targets, appending their problems to @errors and the problems of the items left out to @skipped
+    @return: the targets to keep in the plan
+    """
+    if not isinstance(targets, list) or not targets:
+        errors.append('{}: expected a list of targets'.format(where))
+        return targets
+    checked_targets = []
+    for index, target in enumerate(targets):
+        name = target.get('target_name') if isinstance(target, dict) else None
+        checked_targets.append(
+            check_target(target, '{} > {}'.format(where, name or 'target #{}'.format(index + 1)), errors, skipped))
+    return checked_targets
+
+
+def _check_s3_target(target, where, errors, skipped):
+    """
+    Check an S3 target, leaving out the items with problems
+    @return: the target, with the valid items only
+    """
+    if not _check_tags(target, {'target_name': str, 'items': list}, where, errors, required=['target_name', 'items']):
+        return target
+    items = []
+    for index, item in enumerate(target.get('items') or []):
+        item_errors = []
+        _check_s3_item(item, '{} > item #{}'.format(where, index + 1), item_errors)
+        if item_errors:
+            skipped.extend(item_errors)
+        else:
+            items.append(item)
+    return dict(target, items=items) if target.get('items') else target
+
+
+def _check_github_target(target, where, errors, skipped):
+    if not _check_tags(target, GITHUB_TARGET_TAGS, where, errors, required=['target_name', 'owner', 'repo', 'checks']):
+        return target
+    unknown_checks = [check for check in target.get('checks') or [] if check not in GITHUB_CHECKS]
+    if unknown_checks:
+        errors.append('{}: unknown checks {}, expected {}'.format(where, unknown_checks, GITHUB_CHECKS))
+    return target
+
+
+def _check_api_target(target, where, errors, skipped):
+    _check_tags(target, API_TARGET_TAGS, where, errors, required=['target_name', 'url'], strict=False)
+    return target
+
+
+def _index_schedules(config, path, schedules, errors, skipped, check_target):
+    """
+    Index the targets of a schedule tree, e.g. {'Weekly': {'Tue': {'08:00': [...]}}}, by their joined path
+    """
+    for key, value in config.items():
+        key_path = path + [key]
+        where = ','.join(str(part) for part in key_path)
+        if not isinstance(key, str):
+            errors.append('{}: schedule "{}" must be a quoted string'.format(where, key))
+        elif isinstance(value, dict):
+            _index_schedules(value, key_path, schedules, errors, skipped, check_target)
+        else:
+            schedules[where] = _check_targets(value, where, errors, skipped, check_target)
+
+
+def compile_plan(kind, config, digest=None):
+    """
+    Validate a target config and compile it into a plan
+    @param kind: S3_TARGETS, GITHUB_TARGETS or API_TARGETS
+    @param config: the loaded YAML config
+    @param digest: the SHA-1 of the YAML file the config is loaded from, to tell if a written plan is stale
+    @return: the plan, a dict with 'schedules' (S3 and GitHub targets) or 'targets' (API targets), and
+             'skipped_items' listing the problems of the S3 items left out of it;
+             raises ValueError listing every other problem found in the config
+    """
+    errors = []
+    skipped = []
+    plan = {'version': PLAN_VERSION, 'kind': kind, 'digest': digest, 'skipped_items': skipped}
+    if kind == API_TARGETS:
+        plan['targets'] = _check_targets(config, 'targets', errors, skipped, _check_api_target)
+    elif kind in (S3_TARGETS, GITHUB_TARGETS):
+        plan['schedules'] = {}
+        if not isinstance(config, dict):
+            errors.append('schedules: expected a mapping of event types')
+        else:
+            for event in config:
+                if kind == S3_TARGETS and event not in S3_EVENT_TYPES:
+                    errors.append('{}: unknown event type, expected one of {}'.format(event, S3_EVENT_TYPES))
+            check_target = _check_s3_target if kind == S3_TARGETS else _check_github_target
+            _index_schedules(config, [], plan['schedules'], errors, skipped, check_target)
+    else:
+        raise ValueError('Unknown target config kind: {}'.format(kind))
+
+    if errors:
+        raise ValueError('Invalid {} target config:\n{}'.format(kind, '\n'.join(errors)))
+    return plan
+
+
+def get_kind(config_name):
+    """
+    Get the kind of a target config from its file name; None if it is not a target config
+    """
+    if config_name.startswith('s3_targets_') and config_name.endswith('.yaml'):
+        return S3_TARGETS
+    return {'github_targets.yaml': GITHUB_TARGETS, 'api_targets.yaml': API_TARGETS}.get(config_name)
+
+
+def get_plan_path(config_path):
+    return os.path.splitext(config_path)[0] + PLAN_SUFFIX
+
+
+def write_plan(kind, config_path):
+    """
+    Compile a target config file and write its plan next to it
+    @return: the path of the plan file; raises ValueError if the config is invalid
+    """
+    with open(config_path, 'rb') as config_file:
+        content = config_file.read()
+    plan = compile_plan(kind, yaml.load(content, Loader=yaml.FullLoader), hashlib.sha1(content).hexdigest())
+    plan_path = get_plan_path(config_path)
+    with open(plan_path, 'w') as plan_file:
+        json.dump(plan, plan_file, separators=(',', ':'), sort_keys=True)
+    return plan_path
+
+
+def _read_plan(kind, config_path):
+    """
+    Read the written plan of a config file if it is up to date, else load and compile the config file
+    """
+    plan_path = get_plan_path(config_path)
+    if os.path.isfile(plan_path):
+        with open(plan_path) as plan_file:
+            plan = json.load(plan_file)
+        with open(config_path, 'rb') as config_file:
+            digest = hashlib.sha1(config_file.read()).hexdigest()
+        if plan.get('version') == PLAN_VERSION and plan.get('kind') == kind and plan.get('digest') == digest:
+            return plan
+        LOGGER.warning('- stale plan ignored: %s', plan_path)
+
+    with open(config_path) as config_file:
+        config = yaml.load(config_file, Loader=yaml.FullLoader)
+    return compile_plan(kind, config)
+
+
+def load_plan(kind, config_path):
+    """
+    Load the plan of a target config file, once per process
+    @return: the plan; raises ValueError if the config is invalid, or the errors of reading it
+    """
+    key = (kind, config_path)
+    with _PLANS_LOCK:
+        if key not in _PLANS:
+            plan = _PLANS[key] = _read_plan(kind, config_path)
+            for problem in plan['skipped_items']:
+                LOGGER.warning('- item skipped: %s', problem)
+        return _PLANS[key]
+
+
+def clear_cache():
+    """
+    Forget the loaded plans, e.g. after changing a config file
+    """
+    with _PLANS_LOCK:
+        _PLANS.clear()
+
+
+def get_schedule_targets(plan, schedule_path):
+    """
+    Get the targets of a schedule
+    @param schedule_path: the keys of the schedule, e.g. ['Weekly', 'Tue', '08:00']
+    @return: a copy of the targets, to be changed freely; raises KeyError if the schedule is not in the plan
+    """
+    return copy.deepcopy(plan['schedules'][','.join(schedule_path)])
+
+
+def get_targets(plan):
+    """
+    Get a copy of the targets of a plan without schedules, i.e. of API targets
+    """
+    return copy.deepcopy(plan['targets'])
+
+
+def main(argv):
+    """
+    Write the plans of every target config of a directory (the package configs by default), reporting the items
+    left out of them
+    @return: the exit code, 1 if any config is invalid
+    """
+    configs_dir = argv[0] if argv else CONFIGS_DIR
+    exit_code = 0
+    for config_name in sorted(os.listdir(configs_dir)):
+        kind = get_kind(config_name)
+        if not kind:
+            continue
+        try:
+            plan_path = write_plan(kind, os.path.join(configs_dir, config_name))
+            print('- compiled {}'.format(plan_path))
+            with open(plan_path) as plan_file:
+                for problem in json.load(plan_file)['skipped_items']:
+                    print('- {}: item skipped: {}'.format(config_name, problem), file=sys.stderr)
+        except ValueError as ex:
+            print('- {}: {}'.format(config_name, ex), file=sys.stderr)
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
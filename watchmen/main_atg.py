@@ -41,6 +41,8 @@
 }
 """
 from watchmen.common.result_svc import ResultSvc
+# the Rorschach sweep and arrival counter Lambda handlers, shared by the main modules
+from watchmen.common.rorschach_handlers import start_arrival_counter, start_rorschach_sweep  # noqa: F401
 from watchmen.process.bernard import Bernard
 from watchmen.process.comedian import Comedian
 from watchmen.process.jupiter import Jupiter
@@ -202,6 +202,9 @@
     "exception_message": "Exception occurred when checking S3 targets! Please check the logs for more details.",
     "exception_string_format": "Item: {}\nException: {}",
     "exception_subject": "EXCEPTION: Unable to Check S3 files for {}!",
+    "exception_time_budget": "The check ran out of its time budget after {} seconds.",
+    "exception_time_budget_abandoned": "The check was abandoned: the run ran out of time before it completed.",
+    "exception_time_budget_partial": "The listing of {} stopped with {} file(s) ({} KB) found.",
     "failure_bucket_not_found": "FAILURE: The following bucket was not found: {}.\n",
     "failure_details": "The following failures were encountered while performing checks:\n\n{}",
     "failure_event_check": "Invalid event parameter type passed in from Lambda: {}.",
@@ -209,25 +212,36 @@
                                  " for more details!",
     "failure_exception_subject": "FAILURE AND EXCEPTION: Unable to Check S3 files for {}!",
     "failure_file_empty": "The following S3 file is empty: {}",
+    "failure_gzip_invalid": "The following file is not a valid gzip file: {} ({})",
     "failure_invalid_s3_key": "The following key was not found in S3: {}",
     "failure_invalid_suffix": "The following file(s) did not have the required suffix \"{}\":\n{}",
     "failure_message": "FAILURE: At least one S3 file check did not pass, please check the logs for more details!",
+    "failure_more_files": "... and {} more file(s).",
     "failure_multiple_file_size": "The size of all files found in {} is {} KB, which is less than expected"
                                   " total file size {} KB.",
     "failure_no_files": "The following key has NO FILES on S3: {}",
+    "failure_parquet_columns": "The following parquet file is missing the expected column(s) {}: {}",
+    "failure_parquet_invalid": "The following file is not a valid parquet file: {} ({})",
     "failure_single_file_size": "The following file did not meet the {} KB size threshold: {}",
     "failure_subject": "FAILURE: S3 File Checks Failed for {}!",
     "failure_total_objects": "The number of objects found in {} is {}, which is less than expected total objects count:"
                              " {}.",
+    "failure_total_lines": "The number of lines found in {} is {}, which is less than expected total lines count: {}.",
+    "failure_total_rows": "The number of rows found in {} is {}, which is less than expected total rows count: {}.",
     "failure_last_modified_date": "FAILURE: S3 Target file {} has not been updated during {}",
     "generic_exception_subject": "EXCEPTION: At Least One S3 Target Has An Exception!",
     "generic_failure_exception_subject": "EXCEPTION and FAILURE: At Least One S3 Target Has An Exception and Failure!",
     "generic_failure_subject": "FAILURE: At Least One S3 Target Has Failed!",
     "generic_success_subject": "SUCCESS: All S3 Targets Passed!",
     "success_details": "All of the S3 file checks for the {} target passed successfully!",
+    "success_arrival_counter": "Counted the files of {} from its arrival counter: {} file(s).",
     "success_event_check": "The event parameter passed in from Lambda is valid.",
     "success_message": "SUCCESS: All S3 File Checks passed!",
+    "success_partial_empty_check": "Empty files were only looked for among the files listed before the listing of"
+                                   " these prefixes stopped early:\n{}",
+    "success_stopped_early": "Stopped listing {} early: the {} file(s) ({} KB) found already meet the thresholds.",
     "success_subject": "SUCCESS: All S3 File Checks for {} Passed!",
+    "success_sweep": "Sweeping {} schedule(s) due after {} until {}: {}",
 }
 
 SILHOUETTE = {
@@ -13,11 +13,11 @@
 import os
 import requests
 import traceback
-import yaml
 
 from datetime import datetime
 from watchmen import const
 from watchmen import messages
+from watchmen.common import target_plans
 from watchmen.common.result_svc import Result
 from watchmen.common.watchman import Watchman
 from watchmen.config import settings
@@ -621,13 +621,12 @@ def _get_virustotal_data(self, api):
 
     def _load_config(self):
         """
-        Loads the config file, api_targets.yaml
+        Loads the validated plan of the config file, api_targets.yaml
         :returns: List of config details for each api
         """
         try:
-            with open(CONFIG_PATH) as f:
-                api_targets = yaml.load(f, Loader=yaml.FullLoader)
-            return api_targets, None
+            plan = target_plans.load_plan(target_plans.API_TARGETS, CONFIG_PATH)
+            return target_plans.get_targets(plan), None
         except Exception as ex:
             self.logger.error("ERROR Loading Config!")
             self.logger.info(const.MESSAGE_SEPARATOR)
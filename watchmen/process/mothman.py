@@ -16,7 +16,7 @@
 from watchmen.common.result_svc import Result
 from watchmen.common.watchman import Watchman
 from watchmen.config import settings
-from watchmen.utils.s3 import get_key, check_unequal_files
+from watchmen.utils.s3 import ObjectMetadataError, head_objects
 
 BUCKET_NAME = settings("mothman.bucket_name")
 MESSAGES = messages.MOTHMAN
@@ -50,11 +50,12 @@ def _check_s3_files(self, files_info):
         "details" which contains information about the file checks.
         """
         files_check_info = []
+        files_metadata = self._get_files_metadata(files_info)
         for file_info in files_info:
-            files_check_info.append(self._check_s3_file(file_info))
+            files_check_info.append(self._check_s3_file(file_info, files_metadata))
         return files_check_info
 
-    def _check_s3_file(self, file_info):
+    def _check_s3_file(self, file_info, files_metadata):
         """
         Checks the MTA S3 files to ensure files are being uploaded as expected. The "0000.tar.gz" file does not
         exist, which is not an error. If the latest_file exists and there is any problem retrieving the previous_file,
@@ -62,6 +63,7 @@ def _check_s3_file(self, file_info):
         problem and sent a notification. This prevents Mothman from sending redundant alerts.
         :param file_info: A dictionary containing the file paths for two S3 files, along with their hour_minute
                           attributes.
+        :param files_metadata: A dictionary mapping each file path to its metadata from "_get_files_metadata".
         :return: Dictionary containing information about the result of the file checks. This information includes the
         boolean "success" which indicates if the S3 files are being uploaded as expected and the string "details" which
         contains information about the file checks.
@@ -81,8 +83,8 @@ def _check_s3_file(self, file_info):
                 details = MESSAGES.get("success_latest_hm").format(latest_file_path)
                 return {"success": True, "details": details}
 
-            latest_file_obj = get_key(latest_file_path, BUCKET_NAME)
-            if latest_file_obj is None:
+            latest_file_obj = self._get_file_metadata(latest_file_path, files_metadata)
+            if not latest_file_obj.get("Exists"):
                 details = MESSAGES.get("failure_latest_file_dne").format(latest_file_path)
                 return {"success": False, "details": details}
 
@@ -90,12 +92,12 @@ def _check_s3_file(self, file_info):
                 details = MESSAGES.get("success_previous_hm")
                 return {"success": True, "details": details}
 
-            previous_file_object = get_key(previous_file_path, BUCKET_NAME)
-            if previous_file_object is None:
+            previous_file_object = self._get_file_metadata(previous_file_path, files_metadata)
+            if not previous_file_object.get("Exists"):
                 details = MESSAGES.get("success_previous_file_dne").format(previous_file_path)
                 return {"success": True, "details": details}
 
-            unequal_files = check_unequal_files(latest_file_obj, previous_file_object)
+            unequal_files = latest_file_obj.get("ContentLength") != previous_file_object.get("ContentLength")
 
             if unequal_files:
                 details = MESSAGES.get("success_unequal_files").format(latest_file_path, previous_file_path)
@@ -229,6 +231,43 @@ def _create_result_parameters(self, files_check_info):
             parameters["details"] += file_check_info["details"] + '\n\n'
         return parameters
 
+    def _get_file_metadata(self, file_path, files_metadata):
+        """
+        Returns the metadata of one S3 file from the metadata fetched by "_get_files_metadata".
+        :param file_path: The S3 path of the file.
+        :param files_metadata: A dictionary mapping each file path to its metadata.
+        :return: The metadata dictionary of the file. "Exists" is True if the file exists and False if it doesn't.
+        :raise: ObjectMetadataError if the metadata could not be fetched, so the check is reported as an exception.
+        """
+        file_metadata = files_metadata.get(file_path)
+        if file_metadata is None:
+            raise ObjectMetadataError("Metadata was not fetched for: {}".format(file_path))
+        if file_metadata.get("Exists") is None:
+            raise ObjectMetadataError(file_metadata.get("Error"))
+        return file_metadata
+
+    def _get_files_metadata(self, files_info):
+        """
+        Fetches the metadata of every S3 file to be checked with one concurrent batch of HEAD requests, instead of one
+        listing per file.
+        :param files_info: A list of dictionaries containing the file paths for two S3 files, along with their
+                           hour_minute attributes.
+        :return: A dictionary mapping each file path to its metadata, or an empty dictionary if the batch failed. Files
+                 without metadata are reported as exceptions by "_check_s3_file".
+        """
+        file_paths = []
+        for file_info in files_info:
+            # The "0000.tar.gz" files are never uploaded, so they are not requested.
+            for position in ["latest", "previous"]:
+                if file_info.get("{}_hour_minute".format(position)) != "0000":
+                    file_paths.append(file_info.get("{}_file_path".format(position)))
+        try:
+            return head_objects(BUCKET_NAME, file_paths)
+        except Exception as ex:
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            return {}
+
     def _get_times_to_check(self):
         """
         Returns two datetime strings that represent the time 10 minutes ago and another string for 20 minutes ago. The
@@ -14,9 +14,9 @@
 import datetime
 import os
 import traceback
-import yaml
 
 from watchmen import const, messages
+from watchmen.common import target_plans
 from watchmen.common.result import Result
 from watchmen.common.watchman import Watchman
 from watchmen.config import settings
@@ -391,13 +391,14 @@ def _is_valid_event(self):
 
     def _load_config(self):
         """
-        Loads github_targets.yaml and returns the targets for the event type.
+        Loads the validated plan of github_targets.yaml and returns the targets for the event type.
         :returns: <list<dict>> A list of targets with the needed information
         """
         try:
-            with open(CONFIG_PATH) as f:
-                github_targets = yaml.load(f, Loader=yaml.FullLoader).get(self.event)
-            return github_targets, None
+            plan = target_plans.load_plan(target_plans.GITHUB_TARGETS, CONFIG_PATH)
+            if self.event not in plan['schedules']:
+                return None, None
+            return target_plans.get_schedule_targets(plan, [self.event]), None
         except Exception as ex:
             self.logger.error("ERROR Loading Config!")
             self.logger.info(const.MESSAGE_SEPARATOR)
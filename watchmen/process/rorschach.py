@@ -21,19 +21,28 @@
 
 # Python Imports
 import datetime as _datetime
+import json
 import os
 import pytz
+import re
+import sys
+import threading
+import time
 import traceback
-import yaml
+from concurrent.futures import ThreadPoolExecutor, wait
+from dateutil.parser import isoparse
 from dateutil.relativedelta import relativedelta
+from itertools import compress
 
 # External Libraries
 from watchmen.utils.extension import date_range
 import watchmen.utils.s3 as _s3
+from watchmen.utils import arrivals
 from watchmen import const, messages
+from watchmen.common import target_plans
 from watchmen.common.result import Result
 from watchmen.common.watchman import Watchman
-from watchmen.config import settings
+from watchmen.config import get_uint, settings
 
 # Rorschach Constants:
 DAILY = "Daily"
@@ -52,8 +61,46 @@
     os.path.realpath(os.path.dirname(__file__)), 'configs', CONFIG_NAME)
 GENERIC_TARGET = 'Generic S3 {}'.format(TARGET_ACCOUNT)
 TRIMMABLE_EVENT_TYPES = [HOURLY, MINUTELY, WEEKLY]
+# strftime tokens (with an optional flag, e.g. %0H or %-M) of prefixes partitioned by hour or by minute:
+HOUR_FORMAT_TOKENS = re.compile(r'%[-0_^#]?[HIkl]')
+MINUTE_FORMAT_TOKENS = re.compile(r'%[-0_^#]?[MRTXc]')
+# minute partitions listed at most per time window; a longer window lists the partitions of the hour instead
+MAX_MINUTE_PREFIXES = 5
 
 DEFAULT_MAX_FILES_TO_CHECK = 2000
+# Items checked concurrently, unless overridden for the schedule with rorschach.schedule_max_workers.<event>:
+MAX_WORKERS = get_uint('rorschach.max_workers', 8)
+# Minutes between the runs of a Minutely schedule, as in its CloudWatch cron(0/10 * * * ? *):
+MINUTELY_INTERVAL = get_uint('rorschach.minutely_interval', 10)
+# Minutes a sweep looks back for due schedules when its event has no time window, i.e. the interval of its own runs:
+SWEEP_MINUTES = get_uint('rorschach.sweep_minutes', 10)
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Seconds an item may take to be checked (0 for no limit but the deadline of the run), and seconds of the remaining
+# time of the Lambda kept to create, send and save the results after the deadline of the run:
+ITEM_BUDGET_SECONDS = get_uint('rorschach.item_budget_seconds', 120)
+DEADLINE_RESERVE_SECONDS = get_uint('rorschach.deadline_reserve_seconds', 15)
+# Seconds the items still being checked at the deadline of the run are waited for before they are abandoned:
+ABANDON_GRACE_SECONDS = 2
+
+
+class TimeBudgetExceeded(Exception):
+    """
+    Raised when the check of an item runs out of its time budget. It carries the partial results of the check: the
+    prefix being listed, and the number and the total size (bytes) of the files found before the listing stopped.
+    """
+    def __init__(self, elapsed_seconds, s3_prefix=None, count=None, total_size=None):
+        super().__init__(elapsed_seconds)
+        self.elapsed_seconds = elapsed_seconds
+        self.s3_prefix = s3_prefix
+        self.count = count
+        self.total_size = total_size
+
+    def __str__(self):
+        message = MESSAGES.get("exception_time_budget").format(round(self.elapsed_seconds, 1))
+        if self.s3_prefix:
+            message += ' ' + MESSAGES.get("exception_time_budget_partial").format(
+                self.s3_prefix, self.count, self.total_size / 1000)
+        return message
 
 
 class Rorschach(Watchman):
@@ -66,6 +113,25 @@ def __init__(self, event, context):
         super().__init__()
         self.event_frequency = event.get("Type")
         self.event = ''
+        # Memoizes the metadata of single files, so each key costs one HEAD request per run:
+        self.metadata_probe = _s3.ObjectMetadataProbe()
+        # Each run gets the full retry budget of the S3 request governor:
+        _s3.GOVERNOR.reset()
+        # S3 Inventory indexes loaded in this run, per (inventory bucket, inventory prefix):
+        self.inventory_indexes = {}
+        self.inventory_lock = threading.Lock()
+        # Complete listings of this run, serving the items whose prefixes are under an already-listed prefix:
+        self.listing_cache = _s3.ListingCache()
+        # S3 prefixes whose listing stopped as soon as their thresholds were met (see _can_stop_early):
+        self.stopped_early_prefixes = []
+        # The time the schedule is checked at, the current time unless a sweep checks a schedule at its due time:
+        self.check_time = None
+        # The results of the items checked by a sweep, per _get_item_key; None if this run is not a sweep:
+        self.item_results = None
+        # The time.monotonic() the items must be checked by, per the remaining time of the Lambda; None if unlimited:
+        self.deadline = self._get_deadline(context)
+        # The start and the deadline of the time budget of the item checked by each thread (see _check_time_budget):
+        self.item_budget = threading.local()
 
     def monitor(self):
         """
@@ -81,29 +147,147 @@ def monitor(self):
         if tb:
             return self._create_config_not_load_result(tb)
 
-        check_results = self._process_checking(s3_targets)
-        summary_parameters = self._create_summary_parameters(check_results)
-        results = self._create_results(summary_parameters)
+        results = self._monitor_targets(s3_targets)
+        self._log_run_metrics()
+        self._record_request_timings()
 
         return results
 
-    def _check_file_suffix(self, contents, suffix):
+    def sweep(self, start_time=None, end_time=None):
+        """
+        Monitors every schedule of the s3_targets{ENV}.yaml file due in a time window with one run, instead of one run
+        per schedule. Each schedule is checked as if it was triggered at its due time, so it gets the results of its
+        own run, while the schedules share the listings, the bucket checks and the file metadata of the run, and the
+        items of the schedules due at the same time are checked once.
+        :param start_time: <datetime|string> The (ISO 8601) start of the time window, excluded; SWEEP_MINUTES before
+                           the end of the window by default.
+        :param end_time: <datetime|string> The (ISO 8601) end of the time window, included; the current minute by
+                         default.
+        :return: <list<tuple>> The event type of each due schedule, such as {"Hourly": "00"}, with its list of Result
+                               objects, in the order the schedules are due; or None with the exception results if the
+                               time window is invalid or the config file cannot be loaded.
+        """
+        window, tb = self._get_sweep_window(start_time, end_time)
+        if tb:
+            return [(None, self._create_invalid_event_result())]
+
+        try:
+            plan = target_plans.load_plan(target_plans.S3_TARGETS, CONFIG_PATH)
+        except Exception as ex:
+            self.logger.error("ERROR Loading Config!")
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            return [(None, self._create_config_not_load_result(traceback.format_exc()))]
+
+        due_schedules = self._get_due_schedules(plan['schedules'], *window)
+        self.logger.info(MESSAGES.get("success_sweep").format(
+            len(due_schedules), window[0], window[1], [event for _, event in due_schedules]))
+
+        sweep_results = []
+        self.item_results = {}
+        try:
+            for due_time, event_frequency in due_schedules:
+                self.event_frequency = event_frequency
+                self.event, config_target_path, _ = self._parse_event()
+                self.check_time = due_time
+                self.stopped_early_prefixes = []
+                s3_targets = target_plans.get_schedule_targets(plan, config_target_path)
+                sweep_results.append((event_frequency, self._monitor_targets(s3_targets)))
+        finally:
+            self.check_time = None
+            self.item_results = None
+        self._log_run_metrics()
+        self._record_request_timings()
+
+        return sweep_results
+
+    def explain(self, check_time=None, counter_store=None):
+        """
+        Explains the checks of the schedule of the event without sending any request to the S3 targets: the keys or
+        the prefixes of each item, the S3 requests they take and how long the run takes, estimated from the request
+        latencies recorded by the runs (see rorschach.timings_path), e.g. to tune "time_offset", "max_items" or
+        "path_vars" before deploying them.
+        The requests are counted per operation as [fewest, most], depending on the objects found, the most being None
+        when it depends on more than the config (discovered shards, inventory data files). Each item is counted as if
+        it was checked alone, so items sharing a listing or an inventory send fewer requests.
+        :param check_time: <datetime|string> The (ISO 8601) time the schedule is checked at; the current minute by
+                           default.
+        :param counter_store: <arrivals.CounterStore> The store the items with "arrival_counters" are explained with,
+                              e.g. arrivals.get_counter_store(); None to explain them as listings, so the arrival
+                              counters are left alone.
+        :return: <dict>, <string>
+                 <dict>: The "event", the "check_time", the "max_workers", the "targets" with the explanation of each
+                         of their items, and the "requests" and the "seconds" of the run.
+                 <string>: Traceback if the event, the check time or the config is invalid, None otherwise.
+        """
+        self.event, config_target_path, tb = self._parse_event()
+        if self._check_invalid_event() or tb:
+            return None, tb if tb else MESSAGES.get("failure_event_check").format(self.event_frequency)
+
+        window, tb = self._get_sweep_window(None, check_time)
+        if tb:
+            return None, tb
+
+        s3_targets, tb = self._load_config(config_target_path)
+        if tb:
+            return None, tb
+
+        timings = self._load_request_timings()
+        max_workers = self._get_max_workers()
+        self.check_time = window[1]
+        try:
+            explained_targets = []
+            run_requests = {}
+            item_seconds = []
+            buckets = set()
+            for target in s3_targets:
+                explained_items = []
+                for item in target['items']:
+                    explained_item = self._explain_item(item, counter_store)
+                    # A bucket is checked once per run, by its first item:
+                    if item.get('bucket_name') not in buckets:
+                        buckets.add(item.get('bucket_name'))
+                        self._add_requests(explained_item['requests'], 'HeadBucket', 1, 1)
+                    seconds = [timings.estimate(dict((name, counts[index]) for name, counts in
+                                                     explained_item['requests'].items())) for index in (0, 1)]
+                    explained_item['seconds'] = [None if value is None else round(value, 3) for value in seconds]
+                    for name, (fewest, most) in explained_item['requests'].items():
+                        self._add_requests(run_requests, name, fewest, most)
+                    item_seconds.append(seconds)
+                    explained_items.append(explained_item)
+                explained_targets.append({'target_name': target.get('target_name'), 'items': explained_items})
+
+            run_seconds = [self._estimate_run_seconds([seconds[index] for seconds in item_seconds], max_workers)
+                           for index in (0, 1)]
+            return {
+                'event': self.event_frequency,
+                'check_time': self.check_time.isoformat(),
+                'max_workers': max_workers,
+                'targets': explained_targets,
+                'requests': run_requests,
+                'seconds': [None if value is None else round(value, 3) for value in run_seconds],
+            }, None
+        finally:
+            self.check_time = None
+
+    def _check_file_suffix(self, aggregate):
         """
-        This method verifies that each file in the contents has the expected suffix, such as ".parquet".
-        :param contents: <list> The generated contents for the item currently being checked.
-        :param suffix: <string> Contains the suffix to check for in all files.
+        This method verifies that each file in the aggregated contents has the expected suffix, such as ".parquet".
+        :param aggregate: <_s3.ListingAggregate> The aggregated contents for the item currently being checked.
         :return: <String>, <String>
-                 <String>: String containing all of the file(s) that did not have the correct suffix.
+                 <String>: String containing the file(s) that did not have the correct suffix, up to the number of
+                           sampled keys, followed by the count of the remaining ones.
                  <String>: Traceback if an exception occurred, None otherwise.
         """
         try:
             incorrect_suffix_files = ""
 
-            for file in contents:
-                s3_key = file.get("Key")
+            for s3_key in aggregate.suffix_mismatches:
+                incorrect_suffix_files += "{}{}".format(s3_key, const.LINE_SEPARATOR)
 
-                if not s3_key or not s3_key.endswith(suffix):
-                    incorrect_suffix_files += "{}{}".format(s3_key, const.LINE_SEPARATOR)
+            unsampled_count = aggregate.suffix_mismatch_count - len(aggregate.suffix_mismatches)
+            if unsampled_count > 0:
+                incorrect_suffix_files += MESSAGES.get('failure_more_files').format(unsampled_count)
 
             return incorrect_suffix_files, None
         except Exception as ex:
@@ -130,6 +314,48 @@ def _check_invalid_event(self):
 
         return False
 
+    def _check_item(self, item):
+        """
+        Method to perform all of the required checks for one item. Items are checked concurrently, so the item is
+        copied before being checked and any exception is caught, without affecting the other items. The item is
+        checked within its time budget (see _start_time_budget); running out of it is reported as an exception, with
+        the partial results of the check.
+        :param item: <dict>: The current item that is being checked. This item is a member of a "target" which are all
+                             defined in the s3_targets config file.
+        :return: <list>, <list>
+                    <list>: "exception_strings" which contains strings that detail any exceptions encountered.
+                    <list>: "failure_strings" which contains strings that detail any failures encountered.
+        """
+        item = dict(item)
+        self._start_time_budget()
+        try:
+            self._check_time_budget()
+            bucket_exists, tb = _s3.check_bucket(item.get('bucket_name'))
+
+            if tb:
+                return [MESSAGES.get("exception_string_format").format(item, tb)], []
+            elif not bucket_exists:
+                return [], [MESSAGES.get('failure_bucket_not_found').format(item.get('bucket_name'))]
+
+            if item.get('path_vars'):
+                return self._check_multiple_file_paths(item)
+
+            # If an item has the attribute 'full_path', then only one file is being checked.
+            elif item.get('full_path'):
+                return self._check_single_file(item)
+            return self._check_multiple_files(item)
+        except TimeBudgetExceeded as ex:
+            self.logger.error("ERROR Time Budget Exceeded!")
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.error("{}: {}".format(type(ex).__name__, ex))
+            return [MESSAGES.get("exception_string_format").format(item, ex)], []
+        except Exception as ex:
+            self.logger.error("ERROR Checking Item!")
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            tb = traceback.format_exc()
+            return [MESSAGES.get("exception_string_format").format(item, tb)], []
+
     def _check_multiple_files(self, item):
         """
         Method to perform all of the required checks if an item consists of multiple files.
@@ -149,7 +375,7 @@ def _check_multiple_files(self, item):
             exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
             return exception_strings, failure_strings
 
-        contents = contents_dict.get("contents")
+        aggregate = contents_dict.get("aggregate")
         count = contents_dict.get("count")
         s3_prefix = contents_dict.get("s3_prefix")
 
@@ -160,7 +386,7 @@ def _check_multiple_files(self, item):
 
         # Check the suffix of all files:
         if item.get("suffix"):
-            incorrect_suffix_files, tb = self._check_file_suffix(contents, item.get("suffix"))
+            incorrect_suffix_files, tb = self._check_file_suffix(aggregate)
             if tb:
                 exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
             if incorrect_suffix_files:
@@ -168,7 +394,7 @@ def _check_multiple_files(self, item):
                                                                                      incorrect_suffix_files))
 
         # Check for empty files and total file size:
-        file_size_failure_strings, tb = self._check_multiple_files_size(contents, item, s3_prefix)
+        file_size_failure_strings, tb = self._check_multiple_files_size(aggregate, item, s3_prefix)
         if tb:
             exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
 
@@ -181,12 +407,36 @@ def _check_multiple_files(self, item):
                 failure_strings.append(MESSAGES.get('failure_total_objects').format(s3_prefix, count,
                                                                                     item['min_total_files']))
 
+        # The files are read within the time budget of the item, so the checks above are reported if it runs out:
+        if self._has_parquet_checks(item) or self._has_gzip_checks(item):
+            try:
+                self._check_time_budget()
+            except TimeBudgetExceeded as ex:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, ex))
+                return exception_strings, failure_strings
+
+        # Check the row count and the columns of parquet files from their footers:
+        if self._has_parquet_checks(item):
+            parquet_failure_string, tb = self._check_parquet_files(item, aggregate.keys, s3_prefix)
+            if tb:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
+            if parquet_failure_string:
+                failure_strings.append(parquet_failure_string)
+
+        # Check the integrity and the line count of gzip files by streaming them:
+        if self._has_gzip_checks(item):
+            gzip_failure_string, tb = self._check_gzip_files(item, aggregate.keys, s3_prefix)
+            if tb:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
+            if gzip_failure_string:
+                failure_strings.append(gzip_failure_string)
+
         return exception_strings, failure_strings
 
-    def _check_multiple_files_size(self, contents, item, s3_prefix):
+    def _check_multiple_files_size(self, aggregate, item, s3_prefix):
         """
         Method to perform the empty file check and/or the total file size check for multiple files.
-        :param contents: <list> Contents containing all of the files for the current item being checked.
+        :param aggregate: <_s3.ListingAggregate> The aggregated contents for the current item being checked.
         :param item: <dict> The current item being checked.
         :param s3_prefix: <string> The formatted S3 prefix of the current item being checked. This is required to make
                           the message if the total file size requirement is not met.
@@ -194,28 +444,23 @@ def _check_multiple_files_size(self, contents, item, s3_prefix):
                  <list>: List of all strings for all of the possible failures encountered during the checks.
                  <string>: Traceback if an exception was encountered, else None.
         """
-        empty_file_list = []
         failure_string = ""
-        total_size = 0
 
         try:
-            for file in contents:
-                file_size = file.get('Size')
-                total_size += file_size
-
-                if file_size == 0:
-                    empty_file_list.append(file['Key'])
-
-            if empty_file_list:
+            if aggregate.empty_count:
                 empty_file_string = ""
-                for empty_file in empty_file_list:
+                for empty_file in aggregate.empty_keys:
                     empty_file_string += "{}\n\n".format(MESSAGES.get('failure_file_empty').format(empty_file))
 
+                unsampled_count = aggregate.empty_count - len(aggregate.empty_keys)
+                if unsampled_count > 0:
+                    empty_file_string += "{}\n\n".format(MESSAGES.get('failure_more_files').format(unsampled_count))
+
                 failure_string += empty_file_string
 
             if item.get('min_total_size_kb'):
                 kb_size_threshold = item.get('min_total_size_kb')
-                kb_total_size = total_size / 1000
+                kb_total_size = aggregate.total_size / 1000
 
                 if kb_total_size < kb_size_threshold:
                     failure_string += (MESSAGES.get('failure_multiple_file_size').format(
@@ -229,6 +474,55 @@ def _check_multiple_files_size(self, contents, item, s3_prefix):
             tb = traceback.format_exc()
             return None, tb
 
+    def _check_gzip_files(self, item, s3_keys, s3_prefix):
+        """
+        Method to check the gzip files of an item by streaming and decompressing them concurrently, within the byte
+        budget of _s3.verify_gzips: every file must be a complete gzip file whose CRC matches, and the total number of
+        lines must meet the minimum.
+        :param item: <dict> The current item being checked, with "verify_gzip" and/or "min_lines".
+        :param s3_keys: <list> The keys of the gzip files to check.
+        :param s3_prefix: <string> The formatted S3 prefix (or key) of the item, used in the total lines message.
+        :return: <string>, <string>
+                 <string>: String of all the failures encountered during the checks.
+                 <string>: Traceback if an exception was encountered or a file could not be read, else None.
+        """
+        failure_string = ""
+        read_errors = []
+        skipped_keys = []
+
+        try:
+            min_lines = item.get("min_lines")
+            files_results = _s3.verify_gzips(item['bucket_name'], s3_keys, count_lines=bool(min_lines))
+
+            total_lines = 0
+            for s3_key, result in files_results.items():
+                if result.get("Skipped"):
+                    skipped_keys.append(s3_key)
+                    continue
+                if result.get("Valid") is None:
+                    read_errors.append(result.get("Error"))
+                    continue
+                if not result.get("Valid"):
+                    failure_string += "{}\n\n".format(
+                        MESSAGES.get('failure_gzip_invalid').format(s3_key, result.get("Error")))
+                    continue
+                total_lines += result.get("NumLines", 0)
+
+            if skipped_keys:
+                self.logger.info("Byte budget exhausted, {} gzip file(s) not verified in {}.".format(
+                    len(skipped_keys), s3_prefix))
+            # The total is only known when every file was read:
+            if min_lines and not read_errors and not skipped_keys and total_lines < min_lines:
+                failure_string += MESSAGES.get('failure_total_lines').format(s3_prefix, total_lines, min_lines)
+
+            return failure_string, const.LINE_SEPARATOR.join(read_errors) if read_errors else None
+        except Exception as ex:
+            self.logger.error("ERROR Checking Gzip Files!")
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            tb = traceback.format_exc()
+            return None, tb
+
     def _check_multiple_file_paths(self, item):
         """
         Method to create multiple paths based on the path_var tag in s3_targets, then checks those s3 items
@@ -253,16 +547,71 @@ def _check_multiple_file_paths(self, item):
             'prefix': self._check_multiple_files
         }
 
+        if path_tag == 'full_path':
+            self._prefetch_single_files(item, [path.format(var=path_var) for path_var in item.get('path_vars')])
+
         for path_var in item.get('path_vars'):
 
             item.update({path_tag: path.format(var=path_var)})
-            file_check_exceptions, file_check_failures = check_method.get(path_tag)(item)
+            try:
+                file_check_exceptions, file_check_failures = check_method.get(path_tag)(item)
+            except TimeBudgetExceeded as ex:
+                # The paths checked within the time budget of the item are still reported:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, ex))
+                break
 
             exception_strings.extend(file_check_exceptions)
             failure_strings.extend(file_check_failures)
 
         return exception_strings, failure_strings
 
+    def _check_parquet_files(self, item, s3_keys, s3_prefix):
+        """
+        Method to check the parquet files of an item from their footers, which are read concurrently without downloading
+        the files: every file must be a valid parquet file with the expected columns, and the total number of rows must
+        meet the minimum.
+        :param item: <dict> The current item being checked, with "min_total_rows" and/or "expected_columns".
+        :param s3_keys: <list> The keys of the parquet files to check.
+        :param s3_prefix: <string> The formatted S3 prefix (or key) of the item, used in the total rows message.
+        :return: <string>, <string>
+                 <string>: String of all the failures encountered during the checks.
+                 <string>: Traceback if an exception was encountered or a footer could not be read, else None.
+        """
+        failure_string = ""
+        read_errors = []
+
+        try:
+            total_rows = 0
+            expected_columns = item.get("expected_columns") or []
+            files_metadata = _s3.get_parquet_metadatas(item['bucket_name'], s3_keys)
+
+            for s3_key, metadata in files_metadata.items():
+                if metadata.get("Valid") is None:
+                    read_errors.append(metadata.get("Error"))
+                    continue
+                if not metadata.get("Valid"):
+                    failure_string += "{}\n\n".format(
+                        MESSAGES.get('failure_parquet_invalid').format(s3_key, metadata.get("Error")))
+                    continue
+
+                total_rows += metadata.get("NumRows")
+                missing_columns = [column for column in expected_columns if column not in metadata.get("Schema")]
+                if missing_columns:
+                    failure_string += "{}\n\n".format(
+                        MESSAGES.get('failure_parquet_columns').format(missing_columns, s3_key))
+
+            min_total_rows = item.get("min_total_rows")
+            if min_total_rows and not read_errors and total_rows < min_total_rows:
+                failure_string += MESSAGES.get('failure_total_rows').format(s3_prefix, total_rows, min_total_rows)
+
+            return failure_string, const.LINE_SEPARATOR.join(read_errors) if read_errors else None
+        except Exception as ex:
+            self.logger.error("ERROR Checking Parquet Files!")
+            self.logger.info(const.MESSAGE_SEPARATOR)
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            tb = traceback.format_exc()
+            return None, tb
+
     def _check_single_file(self, item):
         """
         Method to perform all of the required checks if an item consists of only one file.
@@ -302,10 +651,10 @@ def _check_single_file(self, item):
         offset_type = item.get('offset_type') if item.get('offset_type') else self.event
 
         if offset_type in TRIMMABLE_EVENT_TYPES:
-            file_obj = _s3.get_object(item['bucket_name'], s3_key)
-            contents = self._trim_contents([file_obj], time_offset, offset_type)
+            file_obj = _s3.get_object(item['bucket_name'], s3_key, probe=self.metadata_probe)
+            contents = self._trim_contents([file_obj], time_offset, offset_type) if file_obj else []
             if not contents:
-                end_time = _datetime.datetime.now(pytz.utc).replace(second=0, microsecond=0)
+                end_time = self._get_now().replace(second=0, microsecond=0)
                 start_time = end_time - _datetime.timedelta(**{EVENT_AND_OFFSET[offset_type]: time_offset})
                 date_range = "{} to {}".format(start_time.strftime('%M-%H-%d-%m-%y'),
                                                end_time.strftime('%M-%H-%d-%m-%y'))
@@ -320,6 +669,22 @@ def _check_single_file(self, item):
             if not valid_file_size:
                 failure_strings.append(MESSAGES.get('failure_single_file_size').format(item.get("min_total_size_kb"),
                                                                                        s3_key))
+
+        # Checking the row count and the columns of a parquet file from its footer:
+        if self._has_parquet_checks(item):
+            parquet_failure_string, tb = self._check_parquet_files(item, [s3_key], s3_key)
+            if tb:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
+            if parquet_failure_string:
+                failure_strings.append(parquet_failure_string)
+
+        # Checking the integrity and the line count of a gzip file by streaming it:
+        if self._has_gzip_checks(item):
+            gzip_failure_string, tb = self._check_gzip_files(item, [s3_key], s3_key)
+            if tb:
+                exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
+            if gzip_failure_string:
+                failure_strings.append(gzip_failure_string)
         return exception_strings, failure_strings
 
     def _check_single_file_existence(self, item, s3_key):
@@ -332,7 +697,8 @@ def _check_single_file_existence(self, item, s3_key):
                  <string>: Traceback if an exception was encountered, None otherwise.
         """
         try:
-            found_file = _s3.validate_file_on_s3(bucket_name=item['bucket_name'], key=s3_key)
+            found_file = _s3.validate_file_on_s3(bucket_name=item['bucket_name'], key=s3_key,
+                                                 probe=self.metadata_probe)
             return found_file, None
         except Exception as ex:
             self.logger.error("ERROR Checking Single File Existence!")
@@ -352,8 +718,7 @@ def _check_single_file_size(self, item, s3_key):
         """
         try:
             kb_threshold = item.get("min_total_size_kb")
-            s3_client = _s3.get_client()
-            s3_key_size = s3_client.get_object(Bucket=item.get("bucket_name"), Key=s3_key)['ContentLength']
+            s3_key_size = self.metadata_probe.get(item.get("bucket_name"), s3_key)['ContentLength']
 
             # Size from the s3_key_object is in bytes.
             valid_file_size = (s3_key_size / 1000) >= kb_threshold
@@ -444,11 +809,19 @@ def _create_generic_result(self, failure_in_parameters, exception_in_parameters,
             subject = MESSAGES.get("generic_success_subject")
             success = True
 
+        # The prefixes whose listing stopped early are reported in the snapshot, and their partial empty file check in
+        # the details:
+        snapshot = {}
+        if self.stopped_early_prefixes:
+            snapshot = {"stopped_early": sorted(self.stopped_early_prefixes)}
+            details += "{}\n\n".format(MESSAGES.get("success_partial_empty_check").format(
+                "\n".join(snapshot["stopped_early"])))
+
         return (Result(
             details=details,
             disable_notifier=disable_notifier,
             short_message=short_message,
-            snapshot={},
+            snapshot=snapshot,
             state=state,
             subject=subject,
             success=success,
@@ -571,6 +944,108 @@ def _create_summary_parameters(self, processed_targets):
 
         return summary_parameters
 
+    def _explain_item(self, item, counter_store=None):
+        """
+        Method to explain the checks of an item without sending any request: the keys or the prefixes it checks, the
+        paths of its "path_vars" included, and the S3 requests they take.
+        :param item: <dict> The item to explain.
+        :param counter_store: <arrivals.CounterStore> The store of the arrival counters, None if they are not used.
+        :return: <dict> The "bucket_name", the "keys" (single files) or the "prefixes" (multiple files), and the
+                        "requests" per operation as [fewest, most]; or the "error" if the keys or the prefixes cannot
+                        be generated.
+        """
+        path_tag = 'full_path' if item.get('full_path') else 'prefix'
+        paths = [item.get(path_tag)]
+        if item.get('path_vars'):
+            paths = [item.get(path_tag).format(var=path_var) for path_var in item['path_vars']]
+
+        explained_item = {'bucket_name': item.get('bucket_name'), 'requests': {}}
+        generated_paths = []
+        try:
+            for path in paths:
+                if path_tag == 'full_path':
+                    self._explain_single_file(dict(item, full_path=path), generated_paths, explained_item['requests'])
+                else:
+                    self._explain_multiple_files(dict(item, prefix=path), generated_paths, explained_item['requests'],
+                                                 counter_store)
+        except Exception as ex:
+            explained_item['error'] = '{}: {}'.format(type(ex).__name__, ex)
+        explained_item['keys' if path_tag == 'full_path' else 'prefixes'] = generated_paths
+        return explained_item
+
+    def _explain_multiple_files(self, item, prefixes, requests, counter_store=None):
+        """
+        Method to explain the checks of the files of a prefix, as _generate_contents and the checks of the files run
+        them: the files are counted from an inventory, from the arrival counters or by listing the generated prefixes,
+        up to "max_items" files in total.
+        :param item: <dict> The item to explain, with a "prefix".
+        :param prefixes: <list<string>> The generated prefixes, to add those of the item to.
+        :param requests: <dict> The requests per operation as [fewest, most], to add those of the item to.
+        :param counter_store: <arrivals.CounterStore> The store of the arrival counters, None if they are not used.
+        """
+        time_offset = item.get("time_offset", 1)
+        offset_type = item.get('offset_type') if item.get('offset_type') else self.event
+        generated_prefixes, tb = self._generate_prefixes(item['prefix'], offset_type, time_offset)
+        if tb:
+            raise ValueError("Cannot generate the prefixes of {}".format(item['prefix']))
+        prefixes.extend(generated_prefixes)
+
+        max_items = item.get('max_items', DEFAULT_MAX_FILES_TO_CHECK)
+        # The GET requests of each file kept: its parquet footer (one or two reads) and its gzip stream:
+        file_gets = (2 if self._has_parquet_checks(item) else 0) + (1 if self._has_gzip_checks(item) else 0)
+        if item.get('inventory_prefix'):
+            # The latest manifest is found with a listing, then read with every data file of the inventory:
+            self._add_requests(requests, 'ListObjects', 1, None)
+            self._add_requests(requests, 'GetObject', 2, None)
+            if file_gets:
+                self._add_requests(requests, 'GetObject', 0, None)
+            return
+
+        fewest_pages = 1 if self._can_stop_early(item) else \
+            min(len(generated_prefixes), max(1, -(-max_items // _s3.LIST_PAGE_SIZE)))
+        most_pages = len(generated_prefixes) + max_items // _s3.LIST_PAGE_SIZE
+        if item.get('sharded'):
+            # Every shard is listed, and shards not configured are discovered with one more listing:
+            shard_count = len(item['shards']) if item.get('shards') else None
+            fewest_pages = shard_count if shard_count else 1
+            most_pages = len(generated_prefixes) * shard_count + max_items // _s3.LIST_PAGE_SIZE \
+                if shard_count else None
+
+        if counter_store and self._can_use_arrival_counters(item):
+            # Every partition may be answered by its counter, else it is listed:
+            if isinstance(counter_store, arrivals.DynamoCounterStore):
+                partition_count = len([prefix for prefix in generated_prefixes if prefix.endswith('/')])
+                self._add_requests(requests, 'GetItem', partition_count, partition_count)
+            fewest_pages = 0
+
+        uses_start_after = item.get('start_after') and offset_type in TRIMMABLE_EVENT_TYPES and \
+            not item.get('sharded')
+        self._add_requests(requests, 'ListObjectsV2' if uses_start_after else 'ListObjects', fewest_pages, most_pages)
+        if file_gets:
+            self._add_requests(requests, 'GetObject', 0, max_items * file_gets)
+
+    def _explain_single_file(self, item, keys, requests):
+        """
+        Method to explain the checks of a single file, as _check_single_file runs them: one HEAD request, then the
+        GET requests of the parquet and the gzip checks if the file is found.
+        :param item: <dict> The item to explain, with a "full_path".
+        :param keys: <list<string>> The generated keys, to add that of the item to.
+        :param requests: <dict> The requests per operation as [fewest, most], to add those of the item to.
+        """
+        prefix_offset = item.get("prefix_offset", 0)
+        prefix_offset_type = item.get('prefix_offset_type') if item.get('prefix_offset_type') else self.event
+        s3_key, tb = self._generate_key(item['full_path'], prefix_offset_type, prefix_offset)
+        if tb:
+            raise ValueError("Cannot generate the key of {}".format(item['full_path']))
+        keys.append(s3_key)
+
+        self._add_requests(requests, 'HeadObject', 1, 1)
+        # The parquet footer is read with one range request, and a second one when it is larger than the first read:
+        if self._has_parquet_checks(item):
+            self._add_requests(requests, 'GetObject', 0, 2)
+        if self._has_gzip_checks(item):
+            self._add_requests(requests, 'GetObject', 0, 1)
+
     def _generate_contents(self, item):
         """
         Method to generate contents for the given s3 path configuration.
@@ -580,9 +1055,10 @@ def _generate_contents(self, item):
                  <string>: Traceback if an exception was encountered, None otherwise.
         """
         contents_dict = {
-            "contents": None,
+            "aggregate": None,
             "count": None,
-            "s3_prefix": None
+            "s3_prefix": None,
+            "stopped_early": False
         }
 
         try:
@@ -594,39 +1070,80 @@ def _generate_contents(self, item):
             if tb:
                 return contents_dict, tb
 
-            contents = []
+            # Objects are streamed into the aggregate a page of columns at a time, which drops whitelisted files and,
+            # for trimmable events, files outside of the time offset:
+            start_time, end_time = None, None
+            if offset_type in TRIMMABLE_EVENT_TYPES:
+                start_time, end_time = self._get_time_window(time_offset, offset_type)
+            # Keys named in time order skip every key before the time window with StartAfter:
+            start_after = None
+            if start_time and item.get('start_after'):
+                start_after = start_time.strftime(item['start_after'])
+            aggregate = _s3.ListingAggregate(
+                suffix=item.get("suffix"), whitelist=item.get("whitelist"), start_time=start_time, end_time=end_time,
+                keep_keys=self._has_parquet_checks(item) or self._has_gzip_checks(item))
+            # Listings stop as soon as the thresholds are met when no check needs the remaining files:
+            stop_early = self._can_stop_early(item)
+            if stop_early:
+                aggregate.min_count = item.get('min_total_files')
+                if item.get('min_total_size_kb'):
+                    aggregate.min_total_size = item['min_total_size_kb'] * 1000
+
+            # Prefixes with an S3 Inventory are answered from its index, with no listing and no max_items:
+            inventory_index = self._get_inventory_index(item) if item.get('inventory_prefix') else None
+            # Prefixes with arrival counters are answered from them when they can be, see _get_arrival_counter:
+            counter_store = arrivals.get_counter_store() if self._can_use_arrival_counters(item) else None
+
             max_items = item.get('max_items', DEFAULT_MAX_FILES_TO_CHECK)
             for generated_prefix in generated_prefixes:
                 s3_prefix = 's3://' + item['bucket_name'] + '/' + generated_prefix
-                s3_objects = list(
-                    _s3.generate_pages(
+                self._check_time_budget()
+                if counter_store:
+                    answered, counter = self._get_arrival_counter(
+                        counter_store, item['bucket_name'], generated_prefix, start_time, end_time)
+                    if answered:
+                        if counter:
+                            aggregate.add_counter(counter)
+                        continue
+                if inventory_index:
+                    aggregate.update(inventory_index.list_columns(generated_prefix, start_after=start_after))
+                    continue
+                listed_count = aggregate.update(
+                    self._generate_within_time_budget(self.listing_cache.generate_pages(
                         generated_prefix,
-                        **{'bucket': item['bucket_name'], 'max_items': max_items}
-                    )
+                        **{
+                            'bucket': item['bucket_name'],
+                            'max_items': max_items,
+                            'sharded': item.get('sharded', False),
+                            'shards': item.get('shards'),
+                            'start_after': start_after
+                        }
+                    )),
+                    stop_when_satisfied=stop_early
                 )
-                contents.extend(s3_objects)
 
                 # check to see if we've already loaded the max number of items and if so don't bother
                 # checking the next prefix (if there are multiple prefixes to check)
-                max_items = max_items - len(s3_objects)
-                if max_items <= 0:
+                max_items = max_items - listed_count
+                if max_items <= 0 or aggregate.stopped_early:
                     break
 
-            # Trim contents to include only object within the time offset
-            if offset_type in TRIMMABLE_EVENT_TYPES:
-                contents = self._trim_contents(contents, time_offset, offset_type)
-
-            # Removing whitelisted files from contents:
-            if item.get("whitelist"):
-                self._remove_whitelisted_files_from_contents(item.get("whitelist"), contents)
-
-            count = len(contents)
+            count = aggregate.count
 
             self.logger.info("Checking s3 path: {}".format(s3_prefix))
             self.logger.info("Checking {} files.".format(count))
+            if aggregate.stopped_early:
+                self.logger.info(MESSAGES.get("success_stopped_early").format(
+                    s3_prefix, count, aggregate.total_size / 1000))
+                self.stopped_early_prefixes.append(s3_prefix)
 
-            contents_dict.update({"contents": contents, "count": count, "s3_prefix": s3_prefix})
+            contents_dict.update({"aggregate": aggregate, "count": count, "s3_prefix": s3_prefix,
+                                  "stopped_early": aggregate.stopped_early})
             return contents_dict, None
+        except TimeBudgetExceeded as ex:
+            # The files found before the listing stopped are the partial results of the check:
+            ex.s3_prefix, ex.count, ex.total_size = s3_prefix, aggregate.count, aggregate.total_size
+            raise
         except Exception as ex:
             self.logger.error("ERROR Generating Contents!")
             self.logger.info(const.MESSAGE_SEPARATOR)
@@ -634,6 +1151,22 @@ def _generate_contents(self, item):
             tb = traceback.format_exc()
             return contents_dict, tb
 
+    def _generate_within_time_budget(self, objects):
+        """
+        Method to yield the objects of a listing while the item has time budget left. Once it runs out, the listing
+        is closed, so it requests no more pages (and a sharded listing stops its shards), and TimeBudgetExceeded is
+        raised.
+        :param objects: <iterator<dict>> The objects of the listing.
+        :return: <dict> One object at a time.
+        """
+        try:
+            for obj in objects:
+                self._check_time_budget()
+                yield obj
+        finally:
+            if hasattr(objects, 'close'):
+                objects.close()
+
     def _generate_key(self, prefix_format, offset_type, prefix_offset=1):
         """
         Method to generate the key for each target based on the event frequency.
@@ -646,7 +1179,7 @@ def _generate_key(self, prefix_format, offset_type, prefix_offset=1):
                  <string>: Traceback if an exception was encountered, None otherwise.
         """
         try:
-            check_time = _datetime.datetime.now(pytz.utc) - \
+            check_time = self._get_now() - \
                          relativedelta(**{EVENT_AND_OFFSET[offset_type]: prefix_offset})
 
             prefix = check_time.strftime(prefix_format)
@@ -691,17 +1224,43 @@ def _generate_day_overlap_prefixes(self, prefix_format, offset_type, time_offset
         Method to generate the prefix for each target based on the event frequency.
         Will return multiple prefixes if they are variable by day and the time_offset brings us
         back so we are looking at multiple days worth of data (i.e. running at 1am with a time_offset of 4)
+        Prefixes partitioned by hour or by minute (with hour or minute format tokens) are generated for every
+        hour or minute of the time window instead, so only the partitions inside the window are listed rather than
+        whole days. A window of more than MAX_MINUTE_PREFIXES minutes lists the prefixes of its hours, i.e. the
+        prefix format cut at its minute token.
         :param prefix_format: <string> The S3 key prefix format.
         :param offset_type: <string> The event type.
         :param time_offset: <int> The number of time frames to offset the file checks, defaults at 1.
         :return: <list<string>>, <string>
                  <list<string>>: The properly formatted S3 prefixes with the correct date based off the time_offset.
         """
-        prefixes = set()
-        now = _datetime.datetime.now(pytz.utc)
+        now = self._get_now()
         check_time = now - relativedelta(**{EVENT_AND_OFFSET[offset_type]: time_offset})
-        for check_date in date_range(check_time.date(), now.date()):
-            prefixes.add(check_date.strftime(prefix_format))
+        minute_token = MINUTE_FORMAT_TOKENS.search(prefix_format)
+        if minute_token:
+            check_time = check_time.replace(second=0, microsecond=0)
+            if now - check_time >= _datetime.timedelta(minutes=MAX_MINUTE_PREFIXES):
+                prefix_format = prefix_format[:minute_token.start()]
+                minute_token = None
+        if minute_token:
+            step = _datetime.timedelta(minutes=1)
+        elif HOUR_FORMAT_TOKENS.search(prefix_format):
+            step = _datetime.timedelta(hours=1)
+            check_time = check_time.replace(minute=0, second=0, microsecond=0)
+        else:
+            prefixes = []
+            for check_date in date_range(check_time.date(), now.date()):
+                prefix = check_date.strftime(prefix_format)
+                if prefix not in prefixes:
+                    prefixes.append(prefix)
+            return prefixes
+
+        prefixes = []
+        while check_time <= now:
+            prefix = check_time.strftime(prefix_format)
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+            check_time += step
         return prefixes
 
     def _generate_prefix(self, prefix_format, offset_type, time_offset):
@@ -713,25 +1272,183 @@ def _generate_prefix(self, prefix_format, offset_type, time_offset):
         :return: <list<string>>, <string>
                  <list<string>>: The properly formatted S3 prefixes with the correct date based off the time_offset.
         """
-        now = _datetime.datetime.now(pytz.utc)
+        now = self._get_now()
         check_time = now - relativedelta(**{EVENT_AND_OFFSET[offset_type]: time_offset})
         return [check_time.strftime(prefix_format)]
 
+    def _get_inventory_index(self, item):
+        """
+        Method to get the S3 Inventory index of an item, loading the latest inventory once per run.
+        :param item: <dict> The current item being checked, with "inventory_prefix" and an optional "inventory_bucket"
+                     (the destination bucket of the inventory, the "bucket_name" of the item by default).
+        :return: <_s3.InventoryIndex> The index of the objects of the item bucket.
+        """
+        inventory_bucket = item.get('inventory_bucket') or item['bucket_name']
+        inventory_prefix = item['inventory_prefix']
+        cache_key = (inventory_bucket, inventory_prefix)
+        # Items are checked concurrently: the lock makes the items sharing an inventory wait for it to be loaded once
+        with self.inventory_lock:
+            if cache_key not in self.inventory_indexes:
+                manifest_key = _s3.find_inventory_manifest(inventory_prefix, inventory_bucket)
+                if not manifest_key:
+                    raise ValueError("No inventory manifest found in s3://{}/{}".format(
+                        inventory_bucket, inventory_prefix))
+                self.inventory_indexes[cache_key] = _s3.load_inventory(manifest_key, inventory_bucket)
+            inventory_index = self.inventory_indexes[cache_key]
+
+        if inventory_index.source_bucket and inventory_index.source_bucket != item['bucket_name']:
+            raise ValueError("The inventory in s3://{}/{} is for the bucket {}, not {}".format(
+                inventory_bucket, inventory_prefix, inventory_index.source_bucket, item['bucket_name']))
+        self.logger.info("Using the inventory of {} objects created at {}.".format(
+            len(inventory_index), inventory_index.created_at))
+        return inventory_index
+
+    def _can_stop_early(self, item):
+        """
+        Method to check if the listing of an item can stop as soon as its thresholds are met: the item sets
+        "early_exit" with "min_total_files" and/or "min_total_size_kb", opts out of looking for empty files among
+        every file with "partial_empty_check", and has no check that needs every file ("suffix", parquet or gzip
+        checks). Empty files are then only looked for among the files listed.
+        :param item: <dict> The current item being checked.
+        :return: <bool> True if the listing of the item can stop early, False otherwise.
+        """
+        if not item.get("early_exit") or not (item.get("min_total_files") or item.get("min_total_size_kb")):
+            return False
+        if not item.get("partial_empty_check"):
+            return False
+        return not (item.get("suffix") or self._has_parquet_checks(item) or self._has_gzip_checks(item))
+
+    def _can_use_arrival_counters(self, item):
+        """
+        Method to check if the files of an item can be counted from the arrival counters (see watchmen.utils.arrivals):
+        the item sets "arrival_counters" and has no check that needs the files themselves ("suffix", "whitelist",
+        parquet or gzip checks). Empty files are then reported by count, without their keys.
+        :param item: <dict> The current item being checked.
+        :return: <bool> True if the arrival counters of the item can be used, False otherwise.
+        """
+        if not item.get("arrival_counters"):
+            return False
+        return not (item.get("suffix") or item.get("whitelist") or self._has_parquet_checks(item) or
+                    self._has_gzip_checks(item))
+
+    def _get_arrival_counter(self, counter_store, bucket, prefix, start_time=None, end_time=None):
+        """
+        Method to get the arrival counter of a prefix, if it answers for the files of the prefix in the time window:
+        the prefix is a partition (ending with "/") with a counter, and its files arrived either all inside the window
+        or all outside of it. Otherwise, the prefix has to be listed.
+        :param counter_store: <arrivals.CounterStore> The store of the arrival counters.
+        :param bucket: <string> The bucket of the prefix.
+        :param prefix: <string> The generated S3 prefix.
+        :param start_time: <datetime> The start of the time window, None if the files are not trimmed.
+        :param end_time: <datetime> The end of the time window, None if the files are not trimmed.
+        :return: <bool>, <dict>
+                 <bool>: True if the counter answers for the prefix, False if the prefix has to be listed.
+                 <dict>: The counter if its files arrived inside the window, None if they arrived outside of it.
+        """
+        if not prefix.endswith('/'):
+            return False, None
+        try:
+            counter = counter_store.get(bucket, prefix)
+        except Exception as ex:
+            self.logger.info("Could not get the arrival counter of {}: {}: {}".format(prefix, type(ex).__name__, ex))
+            return False, None
+        if not counter:
+            return False, None
+        if (start_time and counter['LastArrival'] < start_time) or (end_time and counter['FirstArrival'] > end_time):
+            return True, None
+        if (start_time and counter['FirstArrival'] < start_time) or (end_time and counter['LastArrival'] > end_time):
+            return False, None
+        self.logger.info(MESSAGES.get("success_arrival_counter").format(prefix, counter['Count']))
+        return True, counter
+
+    @staticmethod
+    def _add_requests(requests, operation_name, fewest, most):
+        """
+        Method to add requests to the requests per operation of an explanation.
+        :param requests: <dict> The requests per operation as [fewest, most].
+        :param operation_name: <string> The operation of the requests, such as "ListObjects".
+        :param fewest: <int> The fewest requests to add.
+        :param most: <int> The most requests to add, None if unknown.
+        """
+        counts = requests.setdefault(operation_name, [0, 0])
+        counts[0] += fewest
+        counts[1] = None if counts[1] is None or most is None else counts[1] + most
+
+    @staticmethod
+    def _estimate_run_seconds(item_seconds, max_workers):
+        """
+        Method to estimate how long the items of a run take, as _check_items checks them: in order, each item by the
+        first worker available.
+        :param item_seconds: <list<float>> The seconds each item takes, None if unknown.
+        :param max_workers: <int> The number of items checked concurrently.
+        :return: <float> The seconds of the run, None if those of an item are unknown.
+        """
+        if None in item_seconds:
+            return None
+        workers = [0.0] * max(1, min(max_workers, len(item_seconds)))
+        for seconds in item_seconds:
+            workers[workers.index(min(workers))] += seconds
+        return max(workers)
+
+    @staticmethod
+    def _has_gzip_checks(item):
+        """
+        Method to check if an item requires its gzip files to be streamed and decompressed.
+        :param item: <dict> The current item being checked.
+        :return: <bool> True if the item has "verify_gzip" or "min_lines", False otherwise.
+        """
+        return bool(item.get("verify_gzip") or item.get("min_lines"))
+
+    @staticmethod
+    def _has_parquet_checks(item):
+        """
+        Method to tell if the files of an item need to be checked from their parquet footers.
+        :param item: <dict> The current item being checked.
+        :return: <bool> True if the item has "min_total_rows" or "expected_columns", False otherwise.
+        """
+        return bool(item.get("min_total_rows") or item.get("expected_columns"))
+
+    @staticmethod
+    def _is_schedule_due(event, schedule_time, due_time):
+        """
+        Method to check if a schedule of the config is due at a time, per the cron schedules of its CloudWatch events.
+        :param event: <string> The event type of the schedule, such as "Weekly".
+        :param schedule_time: <list<string>> The time of the schedule, such as ["Mon", "10:30"]: the minute for Minutely
+                              (every MINUTELY_INTERVAL minutes from it) and Hourly schedules, the hour and minute
+                              (HH:MM) for Daily schedules, and the weekday (Weekly) or the day of the month (Monthly)
+                              before the hour and minute.
+        :param due_time: <datetime> The time to check.
+        :return: <bool> True if the schedule is due, False otherwise, including for the schedules not understood.
+        """
+        try:
+            if event == MINUTELY:
+                return due_time.minute % MINUTELY_INTERVAL == int(schedule_time[0]) % MINUTELY_INTERVAL
+            if event == HOURLY:
+                return due_time.minute == int(schedule_time[0])
+            if schedule_time[-1] != due_time.strftime('%H:%M'):
+                return False
+            if event == DAILY:
+                return len(schedule_time) == 1
+            if event == WEEKLY:
+                return schedule_time[0] == WEEKDAYS[due_time.weekday()]
+            if event == MONTHLY:
+                return int(schedule_time[0]) == due_time.day
+        except (IndexError, ValueError):
+            pass
+        return False
+
     def _load_config(self, config_target_path):
         """
-        Method to load the .yaml config file that contains configuration details of each s3 target.
+        Method to load the s3 targets of the event from the validated plan of the .yaml config file, which is compiled
+        at build time (or on the first load) and reused by the warm invocations.
+        :param config_target_path: <list<string>> The keys of the schedule in the config, such as ["Daily", "15:00"].
         :return: <dictionary>, <string>
                  <dictionary>: A dictionary of dictionaries containing the s3 target check configurations.
                  <string>: A string containing the traceback if an exception occurs, else None.
         """
         try:
-            with open(CONFIG_PATH) as f:
-                s3_targets = yaml.load(f, Loader=yaml.FullLoader)
-
-            for path in config_target_path:
-                s3_targets = s3_targets[path]
-
-            return s3_targets, None
+            plan = target_plans.load_plan(target_plans.S3_TARGETS, CONFIG_PATH)
+            return target_plans.get_schedule_targets(plan, config_target_path), None
         except Exception as ex:
             self.logger.error("ERROR Processing Data!")
             self.logger.info(const.MESSAGE_SEPARATOR)
@@ -739,6 +1456,38 @@ def _load_config(self, config_target_path):
             tb = traceback.format_exc()
             return None, tb
 
+    def _load_request_timings(self):
+        """
+        Method to load the S3 request latencies recorded by the runs, from rorschach.timings_path.
+        :return: <_s3.RequestTimings> The recorded timings, the default ones if none are recorded or can be loaded.
+        """
+        timings_path = settings('rorschach.timings_path')
+        if not timings_path:
+            return _s3.RequestTimings()
+        try:
+            return _s3.RequestTimings.load(timings_path)
+        except Exception as ex:
+            self.logger.info("Could not load the S3 request timings: {}: {}".format(type(ex).__name__, ex))
+            return _s3.RequestTimings()
+
+    def _log_run_metrics(self):
+        """
+        Method to log the S3 requests and the listing cache use of the run.
+        """
+        self.logger.info("S3 requests: {}".format(_s3.GOVERNOR.get_metrics()))
+        self.logger.info("Listing cache: {} hits, {} misses.".format(
+            self.listing_cache.hits, self.listing_cache.misses))
+
+    def _monitor_targets(self, s3_targets):
+        """
+        Method to check the S3 targets of a schedule and create their results.
+        :param s3_targets: <list> of dictionaries loaded from the s3_targets config file.
+        :return: <list> List of Result objects containing information from the file checks performed.
+        """
+        check_results = self._process_checking(s3_targets)
+        summary_parameters = self._create_summary_parameters(check_results)
+        return self._create_results(summary_parameters)
+
     def _parse_event(self):
         """
         This method will parse the data in the event "Type" into the event and a path to access the specified
@@ -761,6 +1510,28 @@ def _parse_event(self):
             tb = traceback.format_exc()
             return None, None, tb
 
+    def _prefetch_single_files(self, item, full_paths):
+        """
+        Method to fetch the metadata of several single files with one concurrent batch of HEAD requests. The results are
+        memoized by the metadata probe, so the following single file checks do not send any more requests. Keys that
+        cannot be generated are skipped here and reported by the single file checks.
+        :param item: <dict> The current item being checked.
+        :param full_paths: <list<string>> The S3 key formats of the files to fetch.
+        """
+        prefix_offset = item.get("prefix_offset", 0)
+        prefix_offset_type = item.get('prefix_offset_type') if item.get('prefix_offset_type') else self.event
+
+        s3_keys = []
+        for full_path in full_paths:
+            s3_key, tb = self._generate_key(full_path, prefix_offset_type, prefix_offset)
+            if not tb:
+                s3_keys.append(s3_key)
+
+        try:
+            self.metadata_probe.prefetch(item['bucket_name'], s3_keys)
+        except Exception as ex:
+            self.logger.info("Could not prefetch single files: {}: {}".format(type(ex).__name__, ex))
+
     def _process_checking(self, s3_targets):
         """
         Method to conduct the various files checks for each S3 item under each target. The specific checks for each
@@ -798,30 +1569,23 @@ def _process_checking(self, s3_targets):
         """
         processed_targets = {}
 
+        # Items are checked concurrently, then their results are gathered in the config order:
+        items = [item for target in s3_targets for item in target['items']]
+        if self.item_results is None:
+            item_results = iter(self._check_items(items))
+        else:
+            # A sweep checks each item once per due time, whichever schedules it is in:
+            item_keys = [self._get_item_key(item) for item in items]
+            new_items = {key: item for key, item in zip(item_keys, items) if key not in self.item_results}
+            self.item_results.update(zip(new_items, self._check_items(list(new_items.values()))))
+            item_results = iter([self.item_results[key] for key in item_keys])
+
         for target in s3_targets:
             exception_strings = []
             failure_strings = []
 
-            for item in target['items']:
-                bucket_name = item.get('bucket_name')
-                bucket_exists, tb = _s3.check_bucket(bucket_name)
-
-                if tb:
-                    exception_strings.append(MESSAGES.get("exception_string_format").format(item, tb))
-                    continue
-                elif not bucket_exists:
-                    failure_strings.append(MESSAGES.get('failure_bucket_not_found').format(item.get('bucket_name')))
-                    continue
-
-                if item.get('path_vars'):
-                    file_check_exceptions, file_check_failures = self._check_multiple_file_paths(item)
-
-                # If an item has the attribute 'full_path', then only one file is being checked.
-                elif item.get('full_path'):
-                    file_check_exceptions, file_check_failures = self._check_single_file(item)
-                else:
-                    file_check_exceptions, file_check_failures = self._check_multiple_files(item)
-
+            for _ in target['items']:
+                file_check_exceptions, file_check_failures = next(item_results)
                 exception_strings.extend(file_check_exceptions)
                 failure_strings.extend(file_check_failures)
 
@@ -839,34 +1603,213 @@ def _process_checking(self, s3_targets):
 
         return processed_targets
 
-    def _remove_whitelisted_files_from_contents(self, whitelist, contents):
+    def _record_request_timings(self):
         """
-        Method to remove the whitelisted files from the contents.
-        :param whitelist: <list> File names that should be removed from the contents.
-        :param contents: <list> Dictionaries containing all of the files to be checked.
-        :return: <list>: Updated contents with whitelisted files removed.
+        Method to add the S3 request latencies of the run to those recorded at rorschach.timings_path, if it is set,
+        for the estimates of explain(). A run is not failed by its timings not being recorded.
         """
-        for file in list(contents):
-            if file.get("Key").split('/')[-1] in whitelist:
-                contents.remove(file)
+        timings_path = settings('rorschach.timings_path')
+        if not timings_path:
+            return
+        try:
+            timings = _s3.RequestTimings.load(timings_path)
+            timings.update(_s3.GOVERNOR.get_metrics())
+            timings.save(timings_path)
+        except Exception as ex:
+            self.logger.info("Could not record the S3 request timings: {}: {}".format(type(ex).__name__, ex))
 
-        return contents
+    def _check_items(self, items):
+        """
+        Method to check items concurrently, up to the max number of workers of the schedule. The items still being
+        checked ABANDON_GRACE_SECONDS after the deadline of the run, or not started by then, are abandoned and reported
+        as exceptions, so the results of the other items are created before the Lambda times out.
+        :param items: <list<dict>> The items to check.
+        :return: <list<tuple>> The exception strings and the failure strings of each item, in the order of the items.
+        """
+        max_workers = self._get_max_workers()
+        if max_workers > 1 and len(items) > 1:
+            executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+            try:
+                futures = [executor.submit(self._check_item, item) for item in items]
+                timeout = None
+                if self.deadline is not None:
+                    timeout = max(0, self.deadline + ABANDON_GRACE_SECONDS - time.monotonic())
+                wait(futures, timeout=timeout)
+                return [future.result() if future.done() else (
+                    [MESSAGES.get("exception_string_format").format(
+                        item, MESSAGES.get("exception_time_budget_abandoned"))], [])
+                    for future, item in zip(futures, items)]
+            finally:
+                # The abandoned items are not waited for: those not started are cancelled, and the others stop at
+                # their next time budget check
+                executor.shutdown(wait=False, cancel_futures=True)
+        return [self._check_item(item) for item in items]
+
+    def _check_time_budget(self):
+        """
+        Method to check that the item checked by the current thread has time budget left (see _start_time_budget).
+        Items checked outside of _check_item have no time budget.
+        :raise TimeBudgetExceeded: if the time budget of the item has run out.
+        """
+        deadline = getattr(self.item_budget, 'deadline', None)
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeBudgetExceeded(time.monotonic() - self.item_budget.started_at)
 
-    def _trim_contents(self, contents, offset, event):
+    def _get_due_schedules(self, schedules, start_time, end_time):
         """
-        This just removes contents in the last <offset minutes>.
+        Method to get the schedules of the config due in a time window, every minute of which is a possible due time.
+        :param schedules: <list<string>> The schedules of the config, such as "Weekly,Mon,10:30".
+        :param start_time: <datetime> The start of the time window, excluded.
+        :param end_time: <datetime> The end of the time window, included.
+        :return: <list<tuple>> The due time and the event type, such as {"Weekly": "Mon,10:30"}, of each due schedule,
+                               in due time order, then in the config order.
+        """
+        due_schedules = []
+        due_time = start_time.replace(second=0, microsecond=0) + _datetime.timedelta(minutes=1)
+        while due_time <= end_time:
+            for schedule in schedules:
+                event, _, schedule_time = schedule.partition(',')
+                if self._is_schedule_due(event, schedule_time.split(','), due_time):
+                    due_schedules.append((due_time, {event: schedule_time}))
+            due_time += _datetime.timedelta(minutes=1)
+        return due_schedules
+
+    @staticmethod
+    def _get_deadline(context):
+        """
+        Method to get the deadline of the run from the remaining time of the Lambda, keeping DEADLINE_RESERVE_SECONDS
+        to create, send and save the results.
+        :param context: <LambdaContext> The context of the Lambda invocation, None when not run by a Lambda.
+        :return: <float> The time.monotonic() the items must be checked by, None if the run has no time limit.
+        """
+        get_remaining_time = getattr(context, 'get_remaining_time_in_millis', None)
+        remaining_millis = get_remaining_time() if callable(get_remaining_time) else None
+        if not isinstance(remaining_millis, (int, float)):
+            return None
+        return time.monotonic() + remaining_millis / 1000 - DEADLINE_RESERVE_SECONDS
+
+    def _get_item_key(self, item):
+        """
+        Method to get the key of an item checked by a sweep: the same items of the same event type (or with the same
+        offset types) are checked alike at the same time.
+        :param item: <dict> The item to check.
+        :return: <tuple> The check time, the offset types and the item as JSON.
+        """
+        return (self.check_time, item.get('offset_type') or self.event, item.get('prefix_offset_type') or self.event,
+                json.dumps(item, sort_keys=True, default=str))
+
+    def _get_max_workers(self):
+        """
+        Method to get the number of items checked concurrently for the schedule (event type) of this run.
+        :return: <int> rorschach.schedule_max_workers.<event> if set, else MAX_WORKERS; at least 1.
+        """
+        return max(1, get_uint('rorschach.schedule_max_workers.{}'.format(self.event), MAX_WORKERS))
+
+    def _get_now(self):
+        """
+        Method to get the time the schedule is checked at.
+        :return: <datetime> The check time of a sweep, else the current time (UTC).
+        """
+        return self.check_time if self.check_time else _datetime.datetime.now(pytz.utc)
+
+    def _get_sweep_window(self, start_time, end_time):
+        """
+        Method to get the time window of a sweep, in UTC; times without a time zone are in UTC.
+        :param start_time: <datetime|string> The (ISO 8601) start of the time window; SWEEP_MINUTES before the end of
+                           the window if None.
+        :param end_time: <datetime|string> The (ISO 8601) end of the time window; the current minute if None.
+        :return: <tuple>, <string>
+                 <tuple>: The start time and the end time of the window.
+                 <string>: Traceback if the time window is invalid, None otherwise.
+        """
+        try:
+            window = []
+            for window_time in (start_time, end_time):
+                if isinstance(window_time, str):
+                    window_time = isoparse(window_time)
+                if window_time and not window_time.tzinfo:
+                    window_time = pytz.utc.localize(window_time)
+                window.append(window_time.astimezone(pytz.utc) if window_time else None)
+            start_time, end_time = window
+            if not end_time:
+                end_time = _datetime.datetime.now(pytz.utc).replace(second=0, microsecond=0)
+            if not start_time:
+                start_time = end_time - _datetime.timedelta(minutes=SWEEP_MINUTES)
+            if start_time >= end_time:
+                raise ValueError("The start of the time window is not before its end: {}".format(start_time))
+            return (start_time, end_time), None
+        except Exception as ex:
+            self.logger.error("ERROR Getting Sweep Window!")
+            self.logger.info(MESSAGES.get("failure_event_check").format((start_time, end_time)))
+            self.logger.exception("{}: {}".format(type(ex).__name__, ex))
+            tb = traceback.format_exc()
+            return None, tb
+
+    def _get_time_window(self, offset, event):
+        """
+        Method to get the time window of the last <offset> event periods, up to the current minute.
         :param offset: <int> offset count to go back
-        :param contents: <[S3 objects]> S3 contents of the path with no filtering
-        :return: Pruned contents
+        :param event: <string> The event type the offset is counted in, such as "Hourly".
+        :return: <datetime>, <datetime> The start time and the end time of the window.
         """
         # Get the end time up to the minute, but clear out seconds and microseconds
         # We want to make sure we're checking the desired range. For example, if this is triggered at 10:30
         # and set to check back 1 hour, we want to look at 9:30-10:30, not 9:30:08-10:30:08
-        end_time = _datetime.datetime.now(pytz.utc).replace(second=0, microsecond=0)
+        end_time = self._get_now().replace(second=0, microsecond=0)
         start_time = end_time - _datetime.timedelta(**{EVENT_AND_OFFSET[event]: offset})
+        return start_time, end_time
 
-        for file in list(contents):
-            if file.get("LastModified") > end_time or file.get("LastModified") < start_time:
-                contents.remove(file)
+    def _start_time_budget(self):
+        """
+        Method to start the time budget of the item checked by the current thread: ITEM_BUDGET_SECONDS from now, up to
+        the deadline of the run.
+        """
+        started_at = time.monotonic()
+        deadline = started_at + ITEM_BUDGET_SECONDS if ITEM_BUDGET_SECONDS else None
+        if self.deadline is not None:
+            deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+        self.item_budget.started_at = started_at
+        self.item_budget.deadline = deadline
 
-        return contents
+    def _trim_contents(self, contents, offset, event):
+        """
+        This just removes contents in the last <offset minutes>.
+        :param offset: <int> offset count to go back
+        :param contents: <[S3 objects]> S3 contents of the path with no filtering
+        :return: Pruned contents
+        """
+        start_time, end_time = self._get_time_window(offset, event)
+        time_mask = _s3.ListingColumns.from_objects(contents).time_mask(start_time, end_time)
+        return list(compress(contents, time_mask))
+
+
+def main(argv):
+    """
+    Prints the explanation (see Rorschach.explain) of the checks of a schedule as JSON, e.g.
+        python -m watchmen.process.rorschach '{"Hourly": "15"}' 2020-05-26T14:15:00Z
+    :param argv: <list<string>> The event, or its "Type", as JSON, an optional (ISO 8601) check time, and an optional
+                 --arrival-counters flag to explain the items with "arrival_counters" with the counter store of the
+                 config rather than as listings.
+    :return: <int> The exit code, 1 if the event, the check time or the config is invalid.
+    """
+    counter_store = None
+    if '--arrival-counters' in argv:
+        argv = [arg for arg in argv if arg != '--arrival-counters']
+        counter_store = arrivals.get_counter_store()
+    if not 1 <= len(argv) <= 2:
+        print('usage: python -m watchmen.process.rorschach <event JSON> [<check time>] [--arrival-counters]',
+              file=sys.stderr)
+        return 1
+    event = json.loads(argv[0])
+    if 'Type' not in event:
+        event = {'Type': event}
+    explanation, tb = Rorschach(event, None).explain(argv[1] if len(argv) > 1 else None, counter_store)
+    if tb:
+        print(tb, file=sys.stderr)
+        return 1
+    print(json.dumps(explanation, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
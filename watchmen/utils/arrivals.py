@@ -0,0 +1,287 @@
+"""
+# arrivals module counts the S3 objects arriving in each partition (folder) of a bucket
+
+The counters are fed by S3 ObjectCreated notifications (see watchmen.common.rorschach_handlers.start_arrival_counter)
+so the number, the total size and the arrival times of the objects of a partition are read with one lookup instead of
+a listing.
+An object is counted in every folder it is in, e.g. 'logs/year=2020/month=05/day=26/part-0.json' is counted in 'logs/',
+'logs/year=2020/', 'logs/year=2020/month=05/' and 'logs/year=2020/month=05/day=26/'.
+
+The counters are kept in a DynamoDB table (arrivals.table in config.yaml, with the hash key "bucket" and the range key
+"partition", both strings) or in a local JSON file (arrivals.file), e.g. for tests.
+
+S3 delivers each notification at least once: the DynamoDB table also keeps a marker of each notification counted, so
+one delivered more than once is counted once. The markers expire after arrivals.marker_ttl_days, once the time to live
+of the table is enabled on its "expires_at" attribute.
+"""
+import abc
+import datetime
+import json
+import os
+import threading
+from logging import getLogger
+from urllib.parse import unquote_plus
+
+import boto3
+from botocore.exceptions import ClientError
+from dateutil.parser import isoparse
+
+from watchmen.config import get_uint, settings
+
+LOGGER = getLogger(__name__)
+
+OBJECT_CREATED = 'ObjectCreated:'
+MARKER_TTL = get_uint('arrivals.marker_ttl_days', 14) * 24 * 3600
+# DynamoDB transactions write up to 100 items: the marker and the counters of the partitions of an object
+MAX_TRANSACTION_ITEMS = 100
+
+_STORE = {}
+_STORE_LOCK = threading.Lock()
+
+
+def _to_datetime(epoch):
+    return datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc)
+
+
+def get_partitions(key_name):
+    """
+    Get the partitions (folders, ending with '/') a key is in, from the top one
+    """
+    parts = key_name.split('/')[:-1]
+    return ['/'.join(parts[:depth]) + '/' for depth in range(1, len(parts) + 1)]
+
+
+def get_arrivals(event):
+    """
+    Yield the objects created per the S3 notifications of a Lambda event, also when they are delivered by SNS or SQS
+    @return: (bucket, key name, size, arrival time as epoch seconds, sequencer) of each object; the sequencer is the
+             same for every delivery of a notification, None if it is missing
+    """
+    for record in event.get('Records') or []:
+        if 'Sns' in record:
+            yield from get_arrivals(json.loads(record['Sns'].get('Message') or '{}'))
+        elif 'body' in record:
+            yield from get_arrivals(json.loads(record['body'] or '{}'))
+        elif record.get('eventSource') == 'aws:s3' and record.get('eventName', '').startswith(OBJECT_CREATED):
+            s3_entity = record['s3']
+            yield (
+                s3_entity['bucket']['name'],
+                unquote_plus(s3_entity['object']['key']),
+                s3_entity['object'].get('size', 0),
+                isoparse(record['eventTime']).timestamp(),
+                s3_entity['object'].get('sequencer'),
+            )
+
+
+class CounterStore(abc.ABC):
+    """
+    class CounterStore is the interface of the stores of the arrival counters.
+    A counter is a dict with 'Count', 'Size' (bytes), 'EmptyCount' (objects of size 0), and 'FirstArrival' and
+    'LastArrival' (offset-aware datetimes) of the objects of a partition.
+    """
+    @abc.abstractmethod
+    def get(self, bucket, partition):
+        """
+        Get the counter of a partition (ending with '/') of a bucket; None if no object has been counted in it
+        """
+
+    @abc.abstractmethod
+    def _update(self, counters):
+        """
+        Add counts to the counters
+        @param counters: a dict of (bucket, partition) to [count, size, empty count, first arrival, last arrival],
+                         with the arrivals in epoch seconds
+        """
+
+    def add_arrivals(self, arrivals):
+        """
+        Count objects in every partition they are in, updating each counter once per call
+        @param arrivals: (bucket, key name, size, arrival time as epoch seconds, sequencer) of each object, as from
+                         get_arrivals()
+        @return: the number of objects counted
+        """
+        counters = {}
+        object_count = 0
+        for bucket, key_name, size, arrival_time, _ in arrivals:
+            object_count += 1
+            for partition in get_partitions(key_name):
+                counter = counters.get((bucket, partition))
+                if counter is None:
+                    counters[(bucket, partition)] = [1, size, int(size == 0), arrival_time, arrival_time]
+                    continue
+                counter[0] += 1
+                counter[1] += size
+                counter[2] += int(size == 0)
+                counter[3] = min(counter[3], arrival_time)
+                counter[4] = max(counter[4], arrival_time)
+        if counters:
+            self._update(counters)
+        return object_count
+
+
+class LocalCounterStore(CounterStore):
+    """
+    class LocalCounterStore keeps the counters in a local JSON file, e.g. for tests and local runs.
+    Every delivery of a notification is counted.
+    """
+    def __init__(self, path):
+        """
+        Initializes a LocalCounterStore per specified file @path, created on the first update
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path) as counter_file:
+            return json.load(counter_file)
+
+    def get(self, bucket, partition):
+        with self.lock:
+            counter = self._load().get(bucket, {}).get(partition)
+        if not counter:
+            return None
+        count, size, empty_count, first_arrival, last_arrival = counter
+        return {'Count': count, 'Size': size, 'EmptyCount': empty_count,
+                'FirstArrival': _to_datetime(first_arrival), 'LastArrival': _to_datetime(last_arrival)}
+
+    def _update(self, counters):
+        with self.lock:
+            data = self._load()
+            for (bucket, partition), (count, size, empty_count, first_arrival, last_arrival) in counters.items():
+                counter = data.setdefault(bucket, {}).get(partition)
+                if counter:
+                    data[bucket][partition] = [counter[0] + count, counter[1] + size, counter[2] + empty_count,
+                                               min(counter[3], first_arrival), max(counter[4], last_arrival)]
+                else:
+                    data[bucket][partition] = [count, size, empty_count, first_arrival, last_arrival]
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = '{}.tmp'.format(self.path)
+            with open(temp_path, 'w') as counter_file:
+                json.dump(data, counter_file, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+
+
+class DynamoCounterStore(CounterStore):
+    """
+    class DynamoCounterStore keeps the counters in a DynamoDB table, one item per (bucket, partition).
+    Counts are added atomically, so concurrent Lambda invocations can update the same counter; the last arrival is
+    the one of the latest update, so it can step back by the delay between notifications delivered out of order.
+
+    Each object is counted in one transaction with a marker of its notification, the item (bucket, key name@sequencer),
+    written only if it does not exist yet: a notification delivered more than once is counted once.
+    """
+    def __init__(self, table, client=None):
+        """
+        Initializes a DynamoCounterStore per specified @table
+        """
+        self.table = table
+        self.client = client if client else boto3.client('dynamodb')
+
+    def get(self, bucket, partition):
+        response = self.client.get_item(
+            TableName=self.table,
+            Key={'bucket': {'S': bucket}, 'partition': {'S': partition}},
+        )
+        item = response.get('Item')
+        if not item:
+            return None
+        return {
+            'Count': int(item['object_count']['N']),
+            'Size': int(item['total_size']['N']),
+            'EmptyCount': int(item.get('empty_count', {}).get('N', 0)),
+            'FirstArrival': _to_datetime(float(item['first_arrival']['N'])),
+            'LastArrival': _to_datetime(float(item['last_arrival']['N'])),
+        }
+
+    def _get_update(self, bucket, partition, counter):
+        """
+        Get the parameters of the update adding a @counter (as in _update) to the counter of a partition
+        """
+        count, size, empty_count, first_arrival, last_arrival = counter
+        return {
+            'TableName': self.table,
+            'Key': {'bucket': {'S': bucket}, 'partition': {'S': partition}},
+            'UpdateExpression': 'ADD object_count :count, total_size :size, empty_count :empty_count '
+                                'SET first_arrival = if_not_exists(first_arrival, :first_arrival), '
+                                'last_arrival = :last_arrival',
+            'ExpressionAttributeValues': {
+                ':count': {'N': str(count)},
+                ':size': {'N': str(size)},
+                ':empty_count': {'N': str(empty_count)},
+                ':first_arrival': {'N': str(first_arrival)},
+                ':last_arrival': {'N': str(last_arrival)},
+            },
+        }
+
+    def _update(self, counters):
+        for (bucket, partition), counter in counters.items():
+            self.client.update_item(**self._get_update(bucket, partition, counter))
+
+    def add_arrivals(self, arrivals):
+        """
+        Count objects in every partition they are in, each object in one transaction with the marker of its
+        notification; objects without a sequencer, or in too many partitions for one transaction, are counted without
+        a marker
+        @param arrivals: (bucket, key name, size, arrival time as epoch seconds, sequencer) of each object, as from
+                         get_arrivals()
+        @return: the number of objects counted, without the notifications already counted
+        """
+        object_count = 0
+        unmarked = []
+        for bucket, key_name, size, arrival_time, sequencer in arrivals:
+            partitions = get_partitions(key_name)
+            if not sequencer or not partitions or len(partitions) >= MAX_TRANSACTION_ITEMS:
+                unmarked.append((bucket, key_name, size, arrival_time, sequencer))
+                continue
+            marker = {'Put': {
+                'TableName': self.table,
+                'Item': {
+                    'bucket': {'S': bucket},
+                    'partition': {'S': '{}@{}'.format(key_name, sequencer)},
+                    'expires_at': {'N': str(int(arrival_time + MARKER_TTL))},
+                },
+                'ConditionExpression': 'attribute_not_exists(#partition)',
+                'ExpressionAttributeNames': {'#partition': 'partition'},
+            }}
+            counter = [1, size, int(size == 0), arrival_time, arrival_time]
+            try:
+                self.client.transact_write_items(TransactItems=[marker] + [
+                    {'Update': self._get_update(bucket, partition, counter)} for partition in partitions])
+            except ClientError as ex:
+                reasons = ex.response.get('CancellationReasons') or [{}]
+                if ex.response['Error']['Code'] != 'TransactionCanceledException' or \
+                        reasons[0].get('Code') != 'ConditionalCheckFailed':
+                    raise
+                LOGGER.info('- skipped the notification of s3://%s/%s already counted', bucket, key_name)
+                continue
+            object_count += 1
+        return object_count + super().add_arrivals(unmarked)
+
+
+def get_counter_store():
+    """
+    Get the counter store of the config, once per process: the DynamoDB table arrivals.table, else the local file
+    arrivals.file; None if neither is set
+    """
+    with _STORE_LOCK:
+        if 'store' not in _STORE:
+            table, path = settings('arrivals.table'), settings('arrivals.file')
+            _STORE['store'] = DynamoCounterStore(table) if table else LocalCounterStore(path) if path else None
+        return _STORE['store']
+
+
+def count_arrivals(event, store=None):
+    """
+    Count the objects created per the S3 notifications of a Lambda event
+    @param store: the counter store, that of the config by default
+    @return: the number of objects counted
+    """
+    store = store if store else get_counter_store()
+    if not store:
+        LOGGER.error('No arrival counter store: set arrivals.table or arrivals.file in config.yaml')
+        return 0
+    object_count = store.add_arrivals(get_arrivals(event))
+    LOGGER.info('- counted %s object(s)', object_count)
+    return object_count
@@ -0,0 +1,186 @@
+"""
+parquet module including functions to read the metadata in the footer of a parquet file
+
+A parquet file ends with its metadata (a Thrift compact-protocol FileMetaData struct), the 4-byte little-endian
+length of the metadata and the magic number "PAR1". The metadata is decoded here without any parquet library,
+so only the footer bytes of a file are needed to get its row count, row groups and schema.
+"""
+import struct
+
+PARQUET_MAGIC = b'PAR1'
+# The metadata length (4 bytes) and the magic number (4 bytes) at the end of every parquet file
+FOOTER_SIZE = 8
+
+# Thrift compact protocol types
+THRIFT_STOP = 0
+THRIFT_BOOLEAN_TRUE = 1
+THRIFT_BOOLEAN_FALSE = 2
+THRIFT_BYTE = 3
+THRIFT_I16 = 4
+THRIFT_I32 = 5
+THRIFT_I64 = 6
+THRIFT_DOUBLE = 7
+THRIFT_BINARY = 8
+THRIFT_LIST = 9
+THRIFT_SET = 10
+THRIFT_MAP = 11
+THRIFT_STRUCT = 12
+
+# Parquet physical types (SchemaElement.type)
+PHYSICAL_TYPES = {
+    0: 'BOOLEAN',
+    1: 'INT32',
+    2: 'INT64',
+    3: 'INT96',
+    4: 'FLOAT',
+    5: 'DOUBLE',
+    6: 'BYTE_ARRAY',
+    7: 'FIXED_LEN_BYTE_ARRAY',
+}
+
+
+class ThriftCompactReader(object):
+    """
+    class ThriftCompactReader decodes Thrift compact-protocol structs into dicts keyed by field id
+    """
+    def __init__(self, data):
+        """
+        Initializes a reader at the start of the @data bytes
+        """
+        self.data = data
+        self.position = 0
+
+    def read_byte(self):
+        if self.position >= len(self.data):
+            raise ValueError('Unexpected end of parquet metadata')
+        byte = self.data[self.position]
+        self.position += 1
+        return byte
+
+    def read_varint(self):
+        result = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            result |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def read_zigzag(self):
+        value = self.read_varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def read_binary(self):
+        length = self.read_varint()
+        if self.position + length > len(self.data):
+            raise ValueError('Unexpected end of parquet metadata')
+        value = self.data[self.position:self.position + length]
+        self.position += length
+        return value
+
+    def read_value(self, thrift_type):
+        """
+        Read a value of a Thrift compact-protocol type
+        """
+        if thrift_type == THRIFT_BOOLEAN_TRUE:
+            return True
+        if thrift_type == THRIFT_BOOLEAN_FALSE:
+            return False
+        if thrift_type == THRIFT_BYTE:
+            return struct.unpack('<b', bytes([self.read_byte()]))[0]
+        if thrift_type in (THRIFT_I16, THRIFT_I32, THRIFT_I64):
+            return self.read_zigzag()
+        if thrift_type == THRIFT_DOUBLE:
+            value = struct.unpack('<d', self.data[self.position:self.position + 8])[0]
+            self.position += 8
+            return value
+        if thrift_type == THRIFT_BINARY:
+            return self.read_binary()
+        if thrift_type in (THRIFT_LIST, THRIFT_SET):
+            return self.read_list()
+        if thrift_type == THRIFT_MAP:
+            return self.read_map()
+        if thrift_type == THRIFT_STRUCT:
+            return self.read_struct()
+        raise ValueError('Unknown Thrift compact type: {}'.format(thrift_type))
+
+    def read_list(self):
+        header = self.read_byte()
+        size = header >> 4
+        if size == 15:
+            size = self.read_varint()
+        element_type = header & 0x0f
+        if element_type in (THRIFT_BOOLEAN_TRUE, THRIFT_BOOLEAN_FALSE):
+            # booleans in a list are encoded as one byte each
+            return [self.read_byte() == THRIFT_BOOLEAN_TRUE for _ in range(size)]
+        return [self.read_value(element_type) for _ in range(size)]
+
+    def read_map(self):
+        size = self.read_varint()
+        if not size:
+            return {}
+        types = self.read_byte()
+        key_type, value_type = types >> 4, types & 0x0f
+        return dict((self.read_value(key_type), self.read_value(value_type)) for _ in range(size))
+
+    def read_struct(self):
+        """
+        Read a struct
+        @return: a dict mapping every field id of the struct to its value
+        """
+        fields = {}
+        field_id = 0
+        while True:
+            header = self.read_byte()
+            thrift_type = header & 0x0f
+            if thrift_type == THRIFT_STOP:
+                return fields
+            delta = header >> 4
+            field_id = field_id + delta if delta else self.read_zigzag()
+            fields[field_id] = self.read_value(thrift_type)
+
+
+def get_metadata_length(footer):
+    """
+    Get the length of the FileMetaData from the last 8 (or more) bytes of a parquet file
+    @return: the metadata length; raises ValueError if the bytes do not end with the parquet magic number
+    """
+    if len(footer) < FOOTER_SIZE or not footer.endswith(PARQUET_MAGIC):
+        raise ValueError('Missing the parquet magic number at the end of the file')
+    return struct.unpack('<i', footer[-FOOTER_SIZE:-len(PARQUET_MAGIC)])[0]
+
+
+def parse_file_metadata(metadata):
+    """
+    Parse the FileMetaData of a parquet file
+    @param metadata: the metadata bytes (without the length and the magic number)
+    @return: a dict with 'NumRows', 'NumRowGroups', 'Columns' (the dotted paths of the leaf columns),
+             'Schema' (a dict mapping every leaf column to its physical type) and 'CreatedBy'
+    """
+    file_metadata = ThriftCompactReader(metadata).read_struct()
+    schema = {}
+    # The first schema element is the root; the others follow in depth-first order
+    elements = file_metadata.get(2, [])
+    # The groups the current element is nested in, each as [name, number of children not read yet]
+    parents = []
+    for element in elements[1:]:
+        name = element.get(4, b'').decode('utf-8')
+        path = '.'.join([parent[0] for parent in parents] + [name])
+        if parents:
+            parents[-1][1] -= 1
+        if element.get(5):
+            parents.append([name, element[5]])
+            continue
+        schema[path] = PHYSICAL_TYPES.get(element.get(1))
+        while parents and not parents[-1][1]:
+            parents.pop()
+
+    created_by = file_metadata.get(6)
+    return {
+        'NumRows': file_metadata.get(3, 0),
+        'NumRowGroups': len(file_metadata.get(4, [])),
+        'Columns': list(schema),
+        'Schema': schema,
+        'CreatedBy': created_by.decode('utf-8') if created_by else None,
+    }
@@ -12,17 +12,34 @@
 AWS_ACCESS_KEY_ID=
 
 """
+import array
+import bisect
+import csv
+import datetime
 import json
+import operator
+import os
+import queue
+import random
+import re
+import threading
+import time
 import traceback
 import types
-from logging import getLogger
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from itertools import compress, islice
+from urllib.parse import unquote_plus
+from logging import DEBUG, getLogger
 
-import boto3
 import boto3.session as boto3_session
 import botocore
 from botocore.client import Config
 from botocore.exceptions import ClientError
 from watchmen import const
+from watchmen.config import get_uint
+from watchmen.utils import parquet
 
 LOGGER = getLogger(__name__)
 
@@ -30,13 +47,1117 @@
 FILE_NOT_FOUND_ERROR_MESSAGE = "FILE DOESN'T EXIST!"
 
 BUCKET_DEFAULT = 'cyber-intel'
-MAX_ATTEMPTS = 2
+# Seconds check_bucket() caches an existing bucket, and a missing bucket; settable with the S3_BUCKET_CACHE_TTL and
+# S3_BUCKET_CACHE_NEGATIVE_TTL env variables
+BUCKET_CACHE_TTL = get_uint('s3.bucket_cache_ttl', 300)
+BUCKET_CACHE_NEGATIVE_TTL = get_uint('s3.bucket_cache_negative_ttl', 30)
+# Error codes returned by head_bucket() when a bucket does not exist
+BUCKET_NOT_FOUND_ERROR_CODES = ('404', 'NoSuchBucket')
+# Request governor (see RequestGovernor): the requests per second and burst allowed per bucket and top-level prefix
+# (0 disables the rate limit), the attempts per request on throttling errors, and the retries per run;
+# settable with the S3_REQUESTS_PER_SECOND, S3_REQUEST_BURST, S3_THROTTLE_MAX_ATTEMPTS and S3_RETRY_BUDGET env variables
+REQUESTS_PER_SECOND = get_uint('s3.requests_per_second', 1000)
+REQUEST_BURST = get_uint('s3.request_burst', 100)
+THROTTLE_MAX_ATTEMPTS = get_uint('s3.throttle_max_attempts', 5)
+RETRY_BUDGET = get_uint('s3.retry_budget', 100)
+# The attempts per request, the first one included, on connection errors and server errors
+ERROR_MAX_ATTEMPTS = 3
+# Seconds of the first backoff on a throttling error, doubled on every attempt up to the max
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 5.0
+# Mean seconds of a request per operation until it is timed (see RequestTimings), the None one for the others,
+# and the weight of the latest run in the moving average of the timings
+DEFAULT_REQUEST_SECONDS = {None: 0.1, 'HeadBucket': 0.05, 'HeadObject': 0.03, 'GetObject': 0.1, 'ListObjects': 0.2,
+                           'ListObjectsV2': 0.2, 'GetItem': 0.01}
+TIMINGS_WEIGHT = 0.2
+# The maximum number of keys per listing page (ListObjects and ListObjectsV2)
+LIST_PAGE_SIZE = 1000
+# Error codes returned by S3 when requests are throttled
+THROTTLING_ERROR_CODES = ('SlowDown', '503', 'ServiceUnavailable', 'Throttling', 'ThrottlingException',
+                          'RequestLimitExceeded', 'RequestThrottled', 'TooManyRequests')
+# Error codes returned by S3 on transient server errors, and the exceptions raised on connection errors
+SERVER_ERROR_CODES = ('500', '502', '504', 'InternalError', 'RequestTimeout')
+CONNECTION_ERRORS = (botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError)
+# The maximum number of keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+# Bytes read from a s3 object body at a time by iter_json_lines()
+STREAM_CHUNK_SIZE = 1024 * 1024
+# The first bytes of any gzip stream
+GZIP_MAGIC = b'\x1f\x8b'
+# the total number of listed objects kept by a ListingCache
+LISTING_CACHE_MAX_OBJECTS = get_uint('s3.listing_cache_max_objects', 200000)
+# the seconds a ListingCache listing waits for the same listing in progress in another generator
+LISTING_CACHE_WAIT_SECONDS = 60
+# the folders of the S3 Inventory manifests, e.g. 2020-06-01T00-00Z/
+INVENTORY_MANIFEST_FOLDER = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}-\d{2}Z/$')
+INVENTORY_MANIFEST_NAME = 'manifest.json'
+# the total compressed bytes verify_gzips() downloads per call, by default
+GZIP_VERIFY_BYTE_BUDGET = get_uint('s3.gzip_verify_budget_mb', 1024) * 1024 * 1024
+# Bytes read from the end of a parquet file by get_parquet_metadata(), enough for the footer of most files
+PARQUET_FOOTER_READ_SIZE = 64 * 1024
+# Keys kept by ListingAggregate as a sample of each kind of bad file (empty, wrong suffix); the rest are only counted
+MAX_SAMPLE_KEYS = 100
+# Pages buffered per shard by generate_sharded_objects() before its listing thread waits for the consumer
+SHARD_BUFFER_PAGES = 2
+# Error codes returned by head_object() when a key does not exist; S3 answers 403 instead of 404 for a missing key
+# when the caller is not allowed to list the bucket (s3:ListBucket)
+NOT_FOUND_ERROR_CODES = ('404', 'NoSuchKey', 'NotFound', '403', 'AccessDenied', 'Forbidden')
+# The size of the HTTP connection pool kept by each cached client; settable with the S3_POOL_SIZE env variable
+POOL_SIZE = get_uint('s3.pool_size', 10)
 PREFIX_PROCESSED = 'hancock/processed-json'
 PREFIX_MINED = 'hancock/mined-json'
 # This config is used with sessions. Otherwise, it will try to reconnect until the lambda times out
-# with an exponential wait time in between each attempt. This sets a timeout time and no attempt to reconnect.
+# with an exponential wait time in between each attempt. This sets a timeout time and no botocore retries:
+# every retry is made by the RequestGovernor, within its retry budget.
 # If a session times out, it throws a ConnectionTimeout error and moves on.
-CONFIG = Config(connect_timeout=5, retries={'max_attempts': MAX_ATTEMPTS})
+NO_RETRIES = {'total_max_attempts': 1}
+CONFIG = Config(connect_timeout=5, retries=NO_RETRIES, max_pool_connections=POOL_SIZE)
+
+
+class ObjectMetadataError(Exception):
+    """
+    Raised when the metadata of a s3 file could not be fetched, for any reason other than the file not existing
+    """
+
+
+class ClientRegistry(object):
+    """
+    class ClientRegistry caches S3 clients and resources per region, config and credentials.
+
+    Clients are thread-safe and shared by all threads; resources are not, so they are cached per thread.
+    The registry lives at module level, which keeps the connection pools alive across warm Lambda invocations.
+    """
+    def __init__(self):
+        """
+        Initializes an empty registry
+        """
+        self._clients = {}
+        self._generation = 0
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _get_cache_key(region_name, config, credentials):
+        """
+        Build a hashable cache key from the region, the botocore config options and the credentials
+        """
+        config_key = tuple(sorted((name, repr(value)) for name, value in vars(config).items()))
+        return region_name, config_key, tuple(sorted(credentials.items()))
+
+    @staticmethod
+    def _get_kwargs(region_name, config):
+        """
+        Build the keyword arguments for session.client() and session.resource()
+        """
+        kwargs = {'config': config}
+        if region_name:
+            kwargs['region_name'] = region_name
+        return kwargs
+
+    def clear(self):
+        """
+        Drop every cached client and resource, e.g. after rotating credentials
+        """
+        with self._lock:
+            self._clients = {}
+            self._generation += 1
+
+    def get_client(self, region_name=None, config=None, **credentials):
+        """
+        Get a cached S3 client, creating it on first use
+
+        @param region_name: the AWS region of the client; None for the default region
+        @param config: the botocore config; defaults to CONFIG; its retries are left to the GOVERNOR
+        @param credentials: optional aws_access_key_id, aws_secret_access_key and aws_session_token
+        @return: a boto3 S3 client
+        """
+        config = CONFIG if config is None else config.merge(Config(retries=NO_RETRIES))
+        key = self._get_cache_key(region_name, config, credentials)
+        with self._lock:
+            s3_client = self._clients.get(key)
+            if s3_client is None:
+                session = boto3_session.Session(**credentials)
+                s3_client = session.client('s3', **self._get_kwargs(region_name, config))
+                GOVERNOR.register(s3_client)
+                self._clients[key] = s3_client
+            return s3_client
+
+    def get_resource(self, region_name=None, config=None, **credentials):
+        """
+        Get a cached S3 resource for the calling thread, creating it on first use
+
+        @param region_name: the AWS region of the resource; None for the default region
+        @param config: the botocore config; defaults to CONFIG; its retries are left to the GOVERNOR
+        @param credentials: optional aws_access_key_id, aws_secret_access_key and aws_session_token
+        @return: a boto3 S3 service resource
+        """
+        config = CONFIG if config is None else config.merge(Config(retries=NO_RETRIES))
+        key = self._get_cache_key(region_name, config, credentials)
+        if getattr(self._local, 'generation', None) != self._generation:
+            self._local.generation = self._generation
+            self._local.resources = {}
+        s3_resource = self._local.resources.get(key)
+        if s3_resource is None:
+            session = boto3_session.Session(**credentials)
+            s3_resource = session.resource('s3', **self._get_kwargs(region_name, config))
+            GOVERNOR.register(s3_resource.meta.client)
+            self._local.resources[key] = s3_resource
+        return s3_resource
+
+
+CLIENT_REGISTRY = ClientRegistry()
+
+
+class TokenBucket(object):
+    """
+    class TokenBucket allows @rate requests per second on average, with bursts of up to @burst requests
+    """
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, reserving one ahead of time if none is left
+        @return: the seconds to wait before sending the request
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RequestGovernor(object):
+    """
+    class RequestGovernor paces and retries the requests of the S3 clients it is registered on, through botocore events:
+    - a token bucket per bucket and top-level prefix (S3 scales its request rate per prefix) paces the requests;
+    - throttled requests (SlowDown, 503) are retried with exponential backoff and full jitter, up to max_attempts
+      per request and retry_budget per run, so a throttled partition slows a run down instead of failing every check;
+    - connection errors and server errors (500, 502, 504) are retried the same way, up to error_max_attempts per
+      request and within the same retry_budget;
+    - the calls, attempts, throttles, wait time and latency are counted per operation in `metrics`.
+    The botocore retries of the clients are turned off (see CONFIG), so a spent budget stops every retry.
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=REQUEST_BURST, max_attempts=THROTTLE_MAX_ATTEMPTS,
+                 retry_budget=RETRY_BUDGET, clock=time.monotonic, sleep=time.sleep, rand=random.random,
+                 error_max_attempts=ERROR_MAX_ATTEMPTS):
+        """
+        Initializes a governor
+        @param rate: the requests per second per bucket and top-level prefix; 0 disables the rate limit
+        @param burst: the requests allowed at once per bucket and top-level prefix
+        @param max_attempts: the attempts per request, the first one included, on throttling errors
+        @param retry_budget: the retries allowed until the next reset()
+        @param error_max_attempts: the attempts per request, the first one included, on connection and server errors
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.error_max_attempts = error_max_attempts
+        self.retry_budget = retry_budget
+        self.clock = clock
+        self.sleep = sleep
+        self.rand = rand
+        self.retries = 0
+        self.metrics = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def register(self, client):
+        """
+        Register the governor on the events of a S3 client
+        """
+        events = client.meta.events
+        events.register('before-parameter-build.s3', self._before_call, unique_id='watchmen-governor-pace')
+        events.register_first('needs-retry.s3', self._needs_retry, unique_id='watchmen-governor-retry')
+        events.register('after-call.s3', self._after_call, unique_id='watchmen-governor-metrics')
+
+    def reset(self):
+        """
+        Reset the retry budget and the metrics, e.g. at the start of a run
+        """
+        with self._lock:
+            self.retries = 0
+            self.metrics = {}
+
+    def get_metrics(self):
+        """
+        Get a copy of the metrics
+        @return: a dict mapping every operation name to its 'calls', 'attempts', 'throttled', 'retries',
+                 'exhausted' (throttled requests given up), 'wait_seconds' (pacing and backoff), 'responses' and
+                 'latency_seconds' (from sending the request to its response, retries included)
+        """
+        with self._lock:
+            return dict((name, dict(metrics)) for name, metrics in self.metrics.items())
+
+    def _count(self, operation_name, **counts):
+        with self._lock:
+            metrics = self.metrics.setdefault(operation_name, {
+                'calls': 0, 'attempts': 0, 'throttled': 0, 'retries': 0, 'exhausted': 0, 'wait_seconds': 0.0,
+                'responses': 0, 'latency_seconds': 0.0})
+            for name, count in counts.items():
+                metrics[name] += count
+
+    def _reserve(self, partition):
+        """
+        Take a token of the token bucket of a partition
+        @return: the seconds to wait before sending the request
+        """
+        if not self.rate:
+            return 0
+        with self._lock:
+            token_bucket = self._buckets.get(partition)
+            if token_bucket is None:
+                token_bucket = self._buckets[partition] = TokenBucket(self.rate, self.burst, self.clock)
+        return token_bucket.reserve()
+
+    @staticmethod
+    def _get_partition(params):
+        key_name = params.get('Key') or params.get('Prefix') or ''
+        return params.get('Bucket'), key_name.split('/', 1)[0]
+
+    def _before_call(self, params, model, context, **kwargs):
+        partition = self._get_partition(params)
+        context['watchmen_partition'] = partition
+        wait = self._reserve(partition)
+        if wait > 0:
+            self.sleep(wait)
+        context['watchmen_sent_at'] = self.clock()
+        self._count(model.name, calls=1, wait_seconds=wait)
+
+    def _needs_retry(self, response, attempts, operation, request_dict, caught_exception=None, **kwargs):
+        error_code = response[1].get('Error', {}).get('Code') if response else None
+        throttled = error_code in THROTTLING_ERROR_CODES
+        if throttled:
+            max_attempts = self.max_attempts
+        elif error_code in SERVER_ERROR_CODES or isinstance(caught_exception, CONNECTION_ERRORS):
+            max_attempts = self.error_max_attempts
+        else:
+            return None
+
+        reason = 'throttled' if throttled else 'failed'
+        with self._lock:
+            exhausted = attempts >= max_attempts or self.retries >= self.retry_budget
+            if not exhausted:
+                self.retries += 1
+        if exhausted:
+            LOGGER.warning("- %s, giving up: %s [attempts=%s, retries=%s]", reason, operation.name, attempts,
+                           self.retries)
+            self._count(operation.name, throttled=int(throttled), exhausted=1)
+            return None
+
+        partition = request_dict.get('context', {}).get('watchmen_partition')
+        delay = self.rand() * min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempts)
+        delay = max(delay, self._reserve(partition)) if partition else delay
+        LOGGER.debug("- %s, retrying in %.3fs: %s [attempts=%s]", reason, delay, operation.name, attempts)
+        self._count(operation.name, throttled=int(throttled), retries=1, wait_seconds=delay)
+        return delay
+
+    def _after_call(self, parsed, model, context=None, **kwargs):
+        attempts = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0) + 1 if parsed else 1
+        sent_at = context.get('watchmen_sent_at') if context else None
+        if sent_at is None:
+            self._count(model.name, attempts=attempts)
+        else:
+            self._count(model.name, attempts=attempts, responses=1, latency_seconds=self.clock() - sent_at)
+
+
+GOVERNOR = RequestGovernor()
+
+
+class RequestTimings(object):
+    """
+    class RequestTimings keeps the mean latency of the requests of each operation, as a moving average of the
+    RequestGovernor metrics of the runs, to estimate how long a run takes before sending any request.
+    Operations never timed get DEFAULT_REQUEST_SECONDS.
+    """
+    def __init__(self, seconds=None, weight=TIMINGS_WEIGHT):
+        """
+        Initializes the timings
+        @param seconds: a dict mapping operation names to their mean seconds, e.g. from a saved file
+        @param weight: the weight of the latest run in the moving average
+        """
+        self.seconds = dict(seconds) if seconds else {}
+        self.weight = weight
+
+    def get(self, operation_name):
+        """
+        Get the mean seconds of a request of an operation
+        """
+        if operation_name in self.seconds:
+            return self.seconds[operation_name]
+        return DEFAULT_REQUEST_SECONDS.get(operation_name, DEFAULT_REQUEST_SECONDS[None])
+
+    def estimate(self, requests):
+        """
+        Estimate the seconds that requests take when they are sent one after the other
+        @param requests: a dict mapping operation names to numbers of requests
+        @return: the seconds, or None if a number of requests is None (unknown)
+        """
+        if None in requests.values():
+            return None
+        return sum(count * self.get(name) for name, count in requests.items())
+
+    def update(self, metrics):
+        """
+        Add the latencies of a run to the moving averages
+        @param metrics: the metrics of a run, from RequestGovernor.get_metrics()
+        """
+        for name, counts in metrics.items():
+            if not counts.get('responses'):
+                continue
+            mean = counts['latency_seconds'] / counts['responses']
+            previous = self.seconds.get(name)
+            self.seconds[name] = mean if previous is None else previous + self.weight * (mean - previous)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the timings saved to a local file or a S3 object ('s3://<bucket>/<key>'); empty timings if there are none
+        """
+        if path.startswith('s3://'):
+            bucket, _, key_name = path[len('s3://'):].partition('/')
+            data = get_json_data(key_name, bucket)
+        elif os.path.isfile(path):
+            with open(path) as timings_file:
+                data = json.load(timings_file)
+        else:
+            data = None
+        return cls(data.get('seconds') if data else None)
+
+    def save(self, path):
+        """
+        Save the timings to a local file or a S3 object ('s3://<bucket>/<key>')
+        """
+        contents = json.dumps({'seconds': self.seconds}, indent=2, sort_keys=True)
+        if path.startswith('s3://'):
+            bucket, _, key_name = path[len('s3://'):].partition('/')
+            create_key(contents, key_name, bucket)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as timings_file:
+            timings_file.write(contents)
+
+
+class BucketCache(object):
+    """
+    class BucketCache keeps the existence and the region of the buckets checked by check_bucket() for a time to live.
+    Being module-level, it is shared by every check of a run and by the warm invocations of a Lambda container.
+    """
+    def __init__(self, ttl=BUCKET_CACHE_TTL, negative_ttl=BUCKET_CACHE_NEGATIVE_TTL, clock=time.monotonic):
+        """
+        Initializes an empty cache
+        @param ttl: seconds an existing bucket is cached
+        @param negative_ttl: seconds a missing bucket is cached
+        @param clock: the function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        Forget every cached bucket
+        """
+        with self._lock:
+            self._entries = {}
+
+    def get(self, bucket_name):
+        """
+        Get the cached existence and region of a bucket
+        @return: a tuple of (bool, str): whether the bucket exists, and its region (None if unknown);
+                 None if the bucket is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(bucket_name)
+            if entry is None:
+                return None
+            exists, region, expires_at = entry
+            if self.clock() >= expires_at:
+                del self._entries[bucket_name]
+                return None
+            return exists, region
+
+    def set(self, bucket_name, exists, region=None):
+        """
+        Cache the existence and region of a bucket, for the ttl if it exists or the negative_ttl otherwise
+        """
+        ttl = self.ttl if exists else self.negative_ttl
+        with self._lock:
+            self._entries[bucket_name] = (exists, region, self.clock() + ttl)
+
+
+BUCKET_CACHE = BucketCache()
+
+
+class ByteBudget(object):
+    """
+    class ByteBudget caps the number of bytes that concurrent workers may download, e.g. in verify_gzips()
+    """
+    def __init__(self, limit):
+        """
+        Initializes a budget of @limit bytes
+        """
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size):
+        """
+        Reserve @size bytes of the budget
+        @return: True if the bytes are reserved, False if they would exceed the budget (nothing is reserved then)
+        """
+        with self._lock:
+            if self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+
+class ObjectMetadataProbe(object):
+    """
+    class ObjectMetadataProbe memoizes head_object() results per (bucket, key) for the life of a run,
+    so every check on a key (existence, size, ETag, LastModified) costs exactly one metadata-only request.
+    """
+    def __init__(self, client=None):
+        """
+        Initializes an empty probe
+        @param client: an optional S3 client to use instead of the pooled one
+        """
+        self.client = client
+        self.requests = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        Forget every memoized metadata, e.g. at the start of a new run
+        """
+        with self._lock:
+            self._cache = {}
+
+    def get(self, bucket, key_name):
+        """
+        Get the metadata of a s3 file, sending a HEAD request only the first time the key is asked for
+        @return: the head_object() metadata, with 'Exists', 'ContentLength', 'ETag' and 'LastModified'
+        """
+        with self._lock:
+            metadata = self._cache.get((bucket, key_name))
+        if metadata is None:
+            metadata = head_object(key_name, bucket, client=self.client)
+            with self._lock:
+                self.requests += 1
+                metadata = self._cache.setdefault((bucket, key_name), metadata)
+        return metadata
+
+    def prefetch(self, bucket, keys):
+        """
+        Fetch the metadata of every key that is not memoized yet with one concurrent batch of HEAD requests
+        @return: a dict mapping every key to its metadata
+        """
+        with self._lock:
+            missing_keys = [key_name for key_name in keys if (bucket, key_name) not in self._cache]
+        if missing_keys:
+            fetched = head_objects(bucket, missing_keys, client=self.client)
+            with self._lock:
+                self.requests += len(fetched)
+                for key_name, metadata in fetched.items():
+                    self._cache.setdefault((bucket, key_name), metadata)
+        with self._lock:
+            return {key_name: self._cache[(bucket, key_name)] for key_name in keys}
+
+
+class ListingAggregate(object):
+    """
+    class ListingAggregate consumes S3 objects (e.g. from generate_pages) one at a time and keeps only the statistics
+    of the listing, so memory stays flat however many objects are listed.
+    """
+    def __init__(self, suffix=None, whitelist=None, start_time=None, end_time=None, max_samples=MAX_SAMPLE_KEYS,
+                 keep_keys=False, min_count=None, min_total_size=None):
+        """
+        Initializes an empty aggregate
+        @param suffix: the suffix every key is expected to have; keys without it are counted as suffix mismatches
+        @param whitelist: file names (the last part of a key) that are skipped
+        @param start_time: objects with LastModified before this datetime are skipped
+        @param end_time: objects with LastModified after this datetime are skipped
+        @param max_samples: the number of keys kept for the empty files and for the suffix mismatches
+        @param keep_keys: keep the key of every counted object in `keys`, e.g. to inspect the files afterwards;
+                          memory then grows with the number of objects
+        @param min_count: the number of counted objects the listing needs, see is_satisfied()
+        @param min_total_size: the total size (bytes) of counted objects the listing needs, see is_satisfied()
+        """
+        self.suffix = suffix
+        self.whitelist = set(whitelist or [])
+        self.start_time = start_time
+        self.end_time = end_time
+        self.max_samples = max_samples
+        self.keep_keys = keep_keys
+        self.min_count = min_count
+        self.min_total_size = min_total_size
+        self.stopped_early = False
+
+        self.keys = []
+        self.listed = 0
+        self.count = 0
+        self.total_size = 0
+        self.empty_count = 0
+        self.empty_keys = []
+        self.suffix_mismatch_count = 0
+        self.suffix_mismatches = []
+        self.min_last_modified = None
+        self.max_last_modified = None
+
+    def add(self, obj):
+        """
+        Add one S3 object to the aggregate
+        @param obj: a dict with 'Key', 'Size' and 'LastModified', as listed by list_objects
+        @return: True if the object is counted, False if it is whitelisted or out of the time window
+        """
+        self.listed += 1
+        key_name = obj.get('Key')
+        last_modified = obj.get('LastModified')
+
+        if self.whitelist and key_name.split('/')[-1] in self.whitelist:
+            return False
+        if self.start_time and last_modified < self.start_time:
+            return False
+        if self.end_time and last_modified > self.end_time:
+            return False
+
+        size = obj.get('Size')
+        self.count += 1
+        self.total_size += size
+        if self.keep_keys:
+            self.keys.append(key_name)
+
+        if size == 0:
+            self.empty_count += 1
+            if len(self.empty_keys) < self.max_samples:
+                self.empty_keys.append(key_name)
+
+        if self.suffix and (not key_name or not key_name.endswith(self.suffix)):
+            self.suffix_mismatch_count += 1
+            if len(self.suffix_mismatches) < self.max_samples:
+                self.suffix_mismatches.append(key_name)
+
+        if last_modified:
+            if self.min_last_modified is None or last_modified < self.min_last_modified:
+                self.min_last_modified = last_modified
+            if self.max_last_modified is None or last_modified > self.max_last_modified:
+                self.max_last_modified = last_modified
+        return True
+
+    def is_satisfied(self):
+        """
+        Check if the counted objects already meet min_count and min_total_size, whichever are set
+        @return: True if at least one of them is set and every one that is set is met
+        """
+        if self.min_count is None and self.min_total_size is None:
+            return False
+        if self.min_count is not None and self.count < self.min_count:
+            return False
+        return self.min_total_size is None or self.total_size >= self.min_total_size
+
+    def update(self, objects, stop_when_satisfied=False, page_size=LIST_PAGE_SIZE):
+        """
+        Add every S3 object of an iterable, consuming it only once; ListingColumns are added column-wise, and so are
+        the objects of a listing, gathered a page at a time
+        @param stop_when_satisfied: stop reading (and close) the iterable as soon as is_satisfied(), so a listing
+                                    requests no more pages; `stopped_early` is then set. The objects are then added
+                                    one at a time, to stop at the first one that meets the thresholds
+        @param page_size: the number of objects gathered into columns before they are added
+        @return: the number of objects read from the iterable
+        """
+        if isinstance(objects, ListingColumns):
+            return self.add_columns(objects)
+        listed = self.listed
+        if not stop_when_satisfied:
+            columns = ListingColumns()
+            try:
+                for obj in objects:
+                    columns.add(obj.get('Key'), obj.get('Size'), obj.get('LastModified'))
+                    if len(columns) >= page_size:
+                        self.add_columns(columns)
+                        columns = ListingColumns()
+            finally:
+                # The objects read before the iterable failed (e.g. ran out of time budget) are still counted:
+                if len(columns):
+                    self.add_columns(columns)
+            return self.listed - listed
+        for obj in objects:
+            if self.add(obj) and stop_when_satisfied and self.is_satisfied():
+                self.stopped_early = True
+                if hasattr(objects, 'close'):
+                    objects.close()
+                break
+        return self.listed - listed
+
+    def add_columns(self, columns):
+        """
+        Add the objects of a ListingColumns at once, filtering and counting them with masks over its columns
+        @return: the number of objects of the columns
+        """
+        listed = len(columns)
+        self.listed += listed
+        masks = []
+        if self.whitelist:
+            masks.append(columns.whitelist_mask(self.whitelist))
+        if self.start_time or self.end_time:
+            masks.append(columns.time_mask(self.start_time, self.end_time))
+        if masks:
+            columns = columns.select(mask_all(*masks))
+
+        self.count += len(columns)
+        self.total_size += columns.total_size()
+        if self.keep_keys:
+            self.keys.extend(columns.keys)
+
+        empty_count = columns.sizes.count(0)
+        if empty_count:
+            self.empty_count += empty_count
+            self.empty_keys.extend(
+                islice(compress(columns.keys, columns.empty_mask()), self.max_samples - len(self.empty_keys)))
+
+        if self.suffix:
+            mismatch_mask = columns.suffix_mask(self.suffix, matched=False)
+            self.suffix_mismatch_count += sum(mismatch_mask)
+            self.suffix_mismatches.extend(
+                islice(compress(columns.keys, mismatch_mask), self.max_samples - len(self.suffix_mismatches)))
+
+        mtimes = [mtime for mtime in columns.mtimes if mtime == mtime]
+        if mtimes:
+            min_last_modified, max_last_modified = _from_epoch(min(mtimes)), _from_epoch(max(mtimes))
+            if self.min_last_modified is None or min_last_modified < self.min_last_modified:
+                self.min_last_modified = min_last_modified
+            if self.max_last_modified is None or max_last_modified > self.max_last_modified:
+                self.max_last_modified = max_last_modified
+        return listed
+
+    def add_counter(self, counter):
+        """
+        Add the objects of an arrival counter (see watchmen.utils.arrivals) at once, without their keys;
+        the whitelist, the suffix and the time window are not applied
+        @param counter: a dict with 'Count', 'Size', 'EmptyCount', 'FirstArrival' and 'LastArrival'
+        @return: the number of objects of the counter
+        """
+        self.listed += counter['Count']
+        self.count += counter['Count']
+        self.total_size += counter['Size']
+        self.empty_count += counter.get('EmptyCount', 0)
+        if self.min_last_modified is None or counter['FirstArrival'] < self.min_last_modified:
+            self.min_last_modified = counter['FirstArrival']
+        if self.max_last_modified is None or counter['LastArrival'] > self.max_last_modified:
+            self.max_last_modified = counter['LastArrival']
+        return counter['Count']
+
+
+def _to_epoch(last_modified):
+    """
+    Convert a LastModified (offset-aware datetime) to epoch seconds; NaN if it is unknown
+    """
+    return last_modified.timestamp() if last_modified else float('nan')
+
+
+def _from_epoch(mtime):
+    """
+    Convert epoch seconds back to a LastModified (offset-aware datetime); None if it is unknown (NaN)
+    """
+    return datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc) if mtime == mtime else None
+
+
+def mask_all(*masks):
+    """
+    Combine masks (lists of booleans) of the same columns: an object is selected if every mask selects it
+    """
+    return reduce(lambda mask, other: list(map(operator.and_, mask, other)), masks)
+
+
+class ListingColumns(object):
+    """
+    class ListingColumns holds S3 objects as parallel columns instead of one dict per object: the keys, the sizes
+    (an array of ints) and the LastModified times (an array of epoch seconds, NaN when unknown).
+
+    Filters are masks (lists of booleans, one per object) computed over a whole column at once, then applied with
+    select(), so a large listing is filtered and totaled without building or removing dicts one at a time.
+    """
+    def __init__(self, keys=None, sizes=None, mtimes=None):
+        """
+        Initializes the columns, empty by default
+        @param keys: the keys; @param sizes: the sizes; @param mtimes: the LastModified epoch seconds
+        """
+        self.keys = list(keys) if keys is not None else []
+        self.sizes = array.array('q', sizes if sizes is not None else [])
+        self.mtimes = array.array('d', mtimes if mtimes is not None else [])
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_objects(cls, objects):
+        """
+        Build the columns of an iterable of S3 objects (dicts with 'Key', 'Size' and 'LastModified')
+        """
+        columns = cls()
+        for obj in objects:
+            columns.add(obj.get('Key'), obj.get('Size'), obj.get('LastModified'))
+        return columns
+
+    def add(self, key_name, size, last_modified):
+        """
+        Add one object to the columns
+        """
+        self.keys.append(key_name)
+        self.sizes.append(size or 0)
+        self.mtimes.append(_to_epoch(last_modified))
+
+    def get_object(self, index):
+        """
+        Get the object at @index as a dict with 'Key', 'Size' and 'LastModified', as listed by list_objects
+        """
+        return {'Key': self.keys[index], 'Size': self.sizes[index], 'LastModified': _from_epoch(self.mtimes[index])}
+
+    def to_objects(self):
+        """
+        This generator yields every object as a dict, in column order
+        """
+        for index in range(len(self.keys)):
+            yield self.get_object(index)
+
+    def select(self, mask):
+        """
+        Get the columns of the objects selected by a mask
+        @return: a new ListingColumns, or these columns if the mask selects every object
+        """
+        if all(mask):
+            return self
+        return ListingColumns(compress(self.keys, mask), compress(self.sizes, mask), compress(self.mtimes, mask))
+
+    def total_size(self):
+        return sum(self.sizes)
+
+    def empty_mask(self):
+        """
+        Get the mask of the empty (zero size) objects
+        """
+        return [size == 0 for size in self.sizes]
+
+    def suffix_mask(self, suffix, matched=True):
+        """
+        Get the mask of the objects whose keys end with @suffix, or do not if @matched is False
+        """
+        return [key_name.endswith(suffix) is matched for key_name in self.keys]
+
+    def time_mask(self, start_time=None, end_time=None):
+        """
+        Get the mask of the objects last modified in the window from @start_time to @end_time (datetimes);
+        objects with an unknown LastModified are only selected without a window
+        """
+        if not start_time and not end_time:
+            return [True] * len(self.keys)
+        start = start_time.timestamp() if start_time else float('-inf')
+        end = end_time.timestamp() if end_time else float('inf')
+        return [start <= mtime <= end for mtime in self.mtimes]
+
+    def whitelist_mask(self, whitelist):
+        """
+        Get the mask of the objects whose file names (the last part of the keys) are not in @whitelist
+        """
+        whitelist = set(whitelist or [])
+        if not whitelist:
+            return [True] * len(self.keys)
+        return [key_name.rpartition('/')[2] not in whitelist for key_name in self.keys]
+
+
+class InventoryIndex(ListingColumns):
+    """
+    class InventoryIndex holds the objects of an S3 Inventory report as columns sorted by key, so the objects
+    under any prefix are found by binary search instead of being listed, however many objects the bucket has.
+
+    Note: an inventory is a daily or weekly snapshot; objects created after its creation time are not in it.
+    """
+    def __init__(self, source_bucket=None, created_at=None):
+        """
+        Initializes an empty index
+        @param source_bucket: the bucket the inventory is about
+        @param created_at: the creation time (offset-aware datetime) of the inventory
+        """
+        super(InventoryIndex, self).__init__()
+        self.source_bucket = source_bucket
+        self.created_at = created_at
+        self._sorted = True
+
+    def add(self, key_name, size, last_modified):
+        """
+        Add one object to the index
+        """
+        if self._sorted and self.keys and key_name < self.keys[-1]:
+            self._sorted = False
+        super(InventoryIndex, self).add(key_name, size, last_modified)
+
+    def add_csv_rows(self, rows, schema):
+        """
+        Add the objects of the rows of an inventory CSV data file; old versions and delete markers are skipped
+        @param rows: the parsed CSV rows, e.g. from csv.reader()
+        @param schema: the column names of the rows, from the 'fileSchema' of the manifest
+        """
+        columns = dict((name, index) for index, name in enumerate(schema))
+        key_column = columns['Key']
+        size_column = columns.get('Size')
+        last_modified_column = columns.get('LastModifiedDate')
+        is_latest_column = columns.get('IsLatest')
+        is_delete_marker_column = columns.get('IsDeleteMarker')
+
+        for row in rows:
+            if is_latest_column is not None and row[is_latest_column] == 'false':
+                continue
+            if is_delete_marker_column is not None and row[is_delete_marker_column] == 'true':
+                continue
+            size = row[size_column] if size_column is not None else ''
+            last_modified = row[last_modified_column] if last_modified_column is not None else ''
+            self.add(unquote_plus(row[key_column]), int(size) if size else 0,
+                     _parse_inventory_date(last_modified) if last_modified else None)
+
+    def extend(self, other):
+        """
+        Add every object of another InventoryIndex, e.g. the one of a single data file
+        """
+        self.keys.extend(other.keys)
+        self.sizes.extend(other.sizes)
+        self.mtimes.extend(other.mtimes)
+        self._sorted = False
+
+    def sort(self):
+        """
+        Sort the columns by key, once after loading
+        """
+        if self._sorted:
+            return
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.keys = [self.keys[index] for index in order]
+        self.sizes = array.array('q', [self.sizes[index] for index in order])
+        self.mtimes = array.array('d', [self.mtimes[index] for index in order])
+        self._sorted = True
+
+    def _get_range(self, prefix, start_after=None):
+        """
+        Get the (start, end) indexes of the keys with a prefix, after start_after if it is set
+        """
+        self.sort()
+        start = bisect.bisect_left(self.keys, prefix)
+        if start_after:
+            start = max(start, bisect.bisect_right(self.keys, start_after))
+        if not prefix:
+            return start, len(self.keys)
+        # every key with the prefix sorts before the prefix with its last character incremented
+        return start, bisect.bisect_left(self.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+
+    def list_columns(self, prefix='', max_items=None, start_after=None):
+        """
+        Get the objects with a prefix, skipping folder markers, as columns sliced out of the index
+        @param start_after: only the keys after it are selected, as with ListObjectsV2 StartAfter
+        @return: a ListingColumns in key order
+        """
+        start, end = self._get_range(prefix, start_after)
+        columns = ListingColumns(self.keys[start:end], self.sizes[start:end], self.mtimes[start:end])
+        folder_mask = [key_name.endswith('/') for key_name in columns.keys]
+        if any(folder_mask):
+            columns = columns.select([not folder for folder in folder_mask])
+        if max_items is not None and len(columns) > max_items:
+            columns = ListingColumns(columns.keys[:max_items], columns.sizes[:max_items], columns.mtimes[:max_items])
+        return columns
+
+    def list_objects(self, prefix='', max_items=None, start_after=None):
+        """
+        This generator yields the objects with a prefix in key order, as list_objects does, skipping folder markers
+        @param start_after: only the keys after it are yielded, as with ListObjectsV2 StartAfter
+        @return: one dict with 'Key', 'Size' and 'LastModified' at a time
+        """
+        start, end = self._get_range(prefix, start_after)
+        count = 0
+        for index in range(start, end):
+            if self.keys[index].endswith('/'):
+                continue
+            if max_items is not None and count >= max_items:
+                return
+            count += 1
+            yield self.get_object(index)
+
+
+class ListingCache(object):
+    """
+    class ListingCache keeps the complete listings of a run, per bucket and prefix, as sorted InventoryIndex lists,
+    so a prefix listed again, or any prefix under it, is served from memory instead of S3.
+
+    Only complete listings are kept: a listing cut by max_items, limited to configured shards, or beyond max_objects
+    in total, is not.
+    """
+    def __init__(self, max_objects=LISTING_CACHE_MAX_OBJECTS, wait_seconds=LISTING_CACHE_WAIT_SECONDS):
+        """
+        Initializes an empty cache
+        @param max_objects: the total number of objects kept by the cache
+        @param wait_seconds: the seconds a listing waits for a listing of the same prefix in progress, before
+                             listing the prefix without the cache
+        """
+        self.max_objects = max_objects
+        self.wait_seconds = wait_seconds
+        self.hits = 0
+        self.misses = 0
+        self._listings = {}
+        self._objects = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        Forget every cached listing and reset the counts
+        """
+        with self._lock:
+            self._listings = {}
+            self._objects = 0
+            self._pending = {}
+            self.hits = 0
+            self.misses = 0
+
+    def _find(self, bucket, prefix):
+        """
+        Find the cached listing of a prefix, or of any prefix it is under, by looking up each leading part of the
+        prefix in the listings of the bucket; the caller holds the lock
+        """
+        listings = self._listings.get(bucket)
+        if listings:
+            for length in range(len(prefix), -1, -1):
+                index = listings.get(prefix[:length])
+                if index is not None:
+                    return index
+        return None
+
+    def get(self, bucket, prefix):
+        """
+        Get the cached listing of a prefix, or of any prefix it is under
+        @return: the InventoryIndex of the listing, or None if the prefix is not cached
+        """
+        with self._lock:
+            index = self._find(bucket, prefix)
+            if index is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return index
+
+    def put(self, bucket, prefix, index):
+        """
+        Cache the complete listing (InventoryIndex) of a prefix, unless the cache is full
+        @return: True if the listing is cached
+        """
+        index.sort()
+        with self._lock:
+            if self._objects + len(index) > self.max_objects:
+                return False
+            self._listings.setdefault(bucket, {})[prefix] = index
+            self._objects += len(index)
+            return True
+
+    def _claim(self, bucket, prefix, cacheable):
+        """
+        Look up a prefix, or claim its listing when it is not cached and nobody is listing it.
+        Listings of the prefix in progress are waited for up to wait_seconds.
+        @return: a tuple of the cached InventoryIndex, or None, and the event of the claimed listing, set by the
+                 caller once it is done, or None when the prefix is listed without the cache
+        """
+        key = (bucket, prefix)
+        while True:
+            with self._lock:
+                cached = self._find(bucket, prefix)
+                pending = None if cached is not None else self._pending.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached, None
+                if pending is None:
+                    self.misses += 1
+                    claimed = self._pending[key] = threading.Event() if cacheable else None
+                    return None, claimed
+            if not pending.wait(self.wait_seconds):
+                LOGGER.debug("- listing in progress, listing again: %s [bucket=%s]", prefix, bucket)
+                with self._lock:
+                    self.misses += 1
+                return None, None
+
+    def generate_pages(self, prefix='', **kwargs):
+        """
+        This generator yields the objects of a prefix like generate_pages(), from the cache when the prefix is under
+        a listed prefix of the bucket; otherwise the prefix is listed and its listing is cached if it is complete.
+        Concurrent listings of the same prefix wait for the first one; no lock is held while objects are yielded.
+        A listing with 'start_after', or with configured 'shards' (which lists only the shards of the prefix), is
+        served from the cache, but never cached since it is not complete.
+
+        @param kwargs: the generate_pages() arguments: 'bucket', 'max_items', 'client', 'sharded', 'start_after' ...
+        """
+        bucket = kwargs.get('bucket', BUCKET_DEFAULT)
+        max_items = kwargs.get('max_items', None)
+        start_after = kwargs.get('start_after')
+        shards = kwargs.get('shards') if kwargs.get('sharded') else None
+        cached, claimed = self._claim(bucket, prefix, not (start_after or shards))
+
+        if cached is not None:
+            count = 0
+            for sub_prefix in [prefix + shard for shard in shards] if shards else [prefix]:
+                remaining = None if max_items is None else max_items - count
+                for obj in cached.list_objects(sub_prefix, remaining, start_after):
+                    count += 1
+                    yield obj
+            return
+        if claimed is None:
+            for obj in generate_pages(prefix, **kwargs):
+                yield obj
+            return
+
+        try:
+            index = InventoryIndex(source_bucket=bucket)
+            count = 0
+            for obj in generate_pages(prefix, **kwargs):
+                count += 1
+                if index is not None:
+                    index.add(obj.get('Key'), obj.get('Size'), obj.get('LastModified'))
+                    if len(index) > self.max_objects:
+                        index = None
+                yield obj
+            if index is not None and (max_items is None or count < max_items):
+                self.put(bucket, prefix, index)
+        finally:
+            with self._lock:
+                if self._pending.get((bucket, prefix)) is claimed:
+                    del self._pending[(bucket, prefix)]
+            claimed.set()
+
+
+def _parse_inventory_date(value):
+    """
+    Parse a date of an inventory report, e.g. '2020-06-01T12:00:00.000Z', to an offset-aware datetime
+    """
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def aggregate_objects(objects, **kwargs):
+    """
+    This function streams S3 objects into a ListingAggregate without keeping them in memory.
+
+    @param objects: an iterable of S3 objects, e.g. generate_pages(prefix, bucket=bucket, max_items=max_items)
+    @param kwargs: 'suffix', 'whitelist', 'start_time', 'end_time' and 'max_samples' of the ListingAggregate
+    @return: the ListingAggregate
+
+    example:
+        aggregate_objects(generate_pages("heka/", bucket="ib-dl-saas-cz-prod"), suffix=".gz").total_size
+    """
+    aggregate = ListingAggregate(**kwargs)
+    aggregate.update(objects)
+    return aggregate
 
 
 def check_arg_bucket(bucket):
@@ -59,21 +1180,28 @@ def check_arg_as_func(a_func):
         raise ValueError("param 'a_func' must be a function")
 
 
-def check_bucket(bucket_name):
+def check_bucket(bucket_name, client=None):
     """
-    Checks if a S3 bucket exists
+    Checks if a S3 bucket exists; the result and the bucket region are cached in BUCKET_CACHE,
+    so a bucket shared by many checks costs one HEAD request per ttl
     @param bucket_name: the bucket name (top-level directory in S3)
+    @param client: an optional S3 client to use instead of the pooled one
     @return: A boolean: True if bucket exists, False if bucket doesn't exist, None if an exception occurred.
              A traceback message: Traceback message if an exception is encountered, or None.
     """
-    s3_resource = get_resource()
+    cached = BUCKET_CACHE.get(bucket_name)
+    if cached is not None:
+        return cached[0], None
+
+    s3_client = client if client else get_resource().meta.client
 
     try:
-        s3_resource.meta.client.head_bucket(Bucket=bucket_name)
+        response = s3_client.head_bucket(Bucket=bucket_name)
     except (botocore.exceptions.ClientError, botocore.exceptions.ParamValidationError) as botocore_exception:
         # If a client error is thrown and it is a 404 error, the bucket just doesn't exist.
-        error_code = int(botocore_exception.response['Error']['Code'])
-        if error_code == 404:
+        error_code = str(botocore_exception.response['Error']['Code'])
+        if error_code in BUCKET_NOT_FOUND_ERROR_CODES:
+            BUCKET_CACHE.set(bucket_name, False)
             return False, None
         else:
             LOGGER.error("ERROR Checking S3 bucket!")
@@ -88,9 +1216,20 @@ def check_bucket(bucket_name):
         tb = traceback.format_exc()
         return None, tb
 
+    BUCKET_CACHE.set(bucket_name, True, _get_bucket_region(response))
     return True, None
 
 
+def _get_bucket_region(response):
+    """
+    Get the bucket region from the 'x-amz-bucket-region' header of a head_bucket() response, or None
+    """
+    if not isinstance(response, dict):
+        return None
+    region = response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('x-amz-bucket-region')
+    return region if isinstance(region, str) else None
+
+
 def check_empty_folder(key_name, bucket=BUCKET_DEFAULT):
     """
     check if an S3 folder (key suffix '/') is empty
@@ -135,18 +1274,15 @@ def check_prefix(prefix, bucket=BUCKET_DEFAULT):
     return 'Contents' in results
 
 
-def check_size(key, bucket=BUCKET_DEFAULT):
+def check_size(key, bucket=BUCKET_DEFAULT, client=None, probe=None):
     """
-    Check the size of a s3 file (key) in a bucket
+    Check the size of a s3 file (key) in a bucket with a metadata-only request
+    @param probe: an optional ObjectMetadataProbe that memoizes the metadata
     """
-    s3_client = get_client()
-    try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        size = response['ContentLength']
-        return size > 0
-    except Exception as ex:
-        LOGGER.debug(ex)
-        pass
+    metadata = probe.get(bucket, key) if probe else head_object(key, bucket, client=client)
+    if metadata.get('Exists'):
+        return metadata['ContentLength'] > 0
+    LOGGER.debug(metadata.get('Error'))
     return False
 
 
@@ -182,15 +1318,15 @@ def convert_parquet_to_json(parquet_content):
     return data
 
 
-def copy_contents_to_bucket(contents, key_name, bucket=BUCKET_DEFAULT):
+def copy_contents_to_bucket(contents, key_name, bucket=BUCKET_DEFAULT, client=None):
     """
     Copy a string content to specified key in s3 bucket and
     overwrite original key if it already exists
     """
-    s3_client = get_client()
-    key = get_key(key_name, bucket)
+    s3_client = client if client else get_client()
+    metadata = head_object(key_name, bucket, client=s3_client)
     msg = "{} [{}]".format(key_name, bucket)
-    if key is None:
+    if not metadata.get('Exists'):
         LOGGER.debug('new key: %s', msg)
     else:
         LOGGER.debug('deleting %s', msg)
@@ -217,7 +1353,6 @@ def copy_to_bucket(filename, prefix_path=PREFIX_MINED, bucket=BUCKET_DEFAULT):
     example:
         copy_to_bucket("/Users/overload/test.json", "mined-json")
     """
-    import os
     try:
         s3_resource = get_resource()
         if os.path.isfile(filename):
@@ -235,10 +1370,53 @@ def copy_to_bucket(filename, prefix_path=PREFIX_MINED, bucket=BUCKET_DEFAULT):
     return True
 
 
-def create_key(contents, key_name, bucket=BUCKET_DEFAULT):
+def copy_keys(key_pairs, bucket=BUCKET_DEFAULT, target_bucket=None, client=None, max_workers=None, progress=None):
+    """
+    Copy many s3 files at once by fanning out CopyObject requests over a bounded thread pool
+
+    @param key_pairs: (source key, target key) tuples, or a dict mapping every source key to its target key
+    @param bucket: the bucket of the source keys
+    @param target_bucket: the bucket of the target keys; the source bucket by default
+    @param client: an optional S3 client shared by all workers instead of the pooled one
+    @param max_workers: the number of concurrent requests, at most POOL_SIZE by default
+    @param progress: an optional function called as `progress(source_key, error)` once per key as it completes,
+                     with error set to None on success
+    @return: a dict with 'Copied', the list of the copied source keys,
+             and 'Errors', a dict mapping every source key that failed to its error message
+
+    example:
+        copy_keys({"watchmen/results/a.json": "watchmen/history/a.json"}, "cyber-intel")
+    """
+    key_pairs = list(key_pairs.items()) if isinstance(key_pairs, dict) else list(key_pairs)
+    result = {'Copied': [], 'Errors': {}}
+    if not key_pairs:
+        return result
+
+    s3_client = client if client else get_client()
+    target_bucket = target_bucket or bucket
+
+    def copy_key(key_pair):
+        source_key, target_key = key_pair
+        try:
+            s3_client.copy_object(Bucket=target_bucket, CopySource={'Bucket': bucket, 'Key': source_key},
+                                  Key=target_key)
+            return None
+        except Exception as ex:
+            LOGGER.debug("- copy error: %s [%s]", source_key, ex)
+            return str(ex)
+
+    workers = min(max_workers or POOL_SIZE, len(key_pairs))
+    LOGGER.info("copying %s keys [bucket=%s, target_bucket=%s]", len(key_pairs), bucket, target_bucket)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (source_key, _), error in zip(key_pairs, executor.map(copy_key, key_pairs)):
+            _report_key_result(result, 'Copied', source_key, error, progress)
+    return result
+
+
+def create_key(contents, key_name, bucket=BUCKET_DEFAULT, client=None):
     """Create a key on s3"""
     try:
-        s3_client = get_client()
+        s3_client = client if client else get_client()
         return s3_client.put_object(Body=contents, Bucket=bucket, Key=key_name)
     except Exception as ex:
         LOGGER.error('failure on creating %s [%s]:\n%s', key_name, bucket, ex)
@@ -270,16 +1448,17 @@ def delete_empty_folder(key_name, bucket=BUCKET_DEFAULT):
     return False
 
 
-def delete_key(key_name, bucket=BUCKET_DEFAULT):
+def delete_key(key_name, bucket=BUCKET_DEFAULT, client=None):
     """
     Deleting a s3 bucket key
+    @param client: an optional S3 client to use instead of the pooled one
 
     Dev-note: comparing to using boto3.resource('s3')
         s3 = get_resource()
         s3.Object(bucket, key_name).delete()
     """
     try:
-        s3_client = get_client()
+        s3_client = client if client else get_client()
         LOGGER.info("deleting key: %s [bucket=%s]", key_name, bucket)
         s3_client.delete_object(Bucket=bucket, Key=key_name)
         return True
@@ -288,14 +1467,68 @@ def delete_key(key_name, bucket=BUCKET_DEFAULT):
         return False
 
 
-def get_client():
+def delete_keys(keys, bucket=BUCKET_DEFAULT, client=None, progress=None):
     """
-    Get S3 client
-    note: This function can be customized to accept configurations
+    Delete many s3 files at once with DeleteObjects requests of up to DELETE_BATCH_SIZE keys each
+
+    @param keys: the key names to delete; duplicates are only deleted once
+    @param bucket: the bucket name (top-level directory in S3)
+    @param client: an optional S3 client to use instead of the pooled one
+    @param progress: an optional function called as `progress(key_name, error)` once per key,
+                     with error set to None on success
+    @return: a dict with 'Deleted', the list of the deleted keys,
+             and 'Errors', a dict mapping every key that failed to its error message
+
+    example:
+        delete_keys(["watchmen/results/a.json", "watchmen/results/b.json"], "cyber-intel")
     """
-    session = boto3_session.Session()
-    s3_client = session.client('s3', config=CONFIG)
-    return s3_client
+    unique_keys = list(dict.fromkeys(keys))
+    result = {'Deleted': [], 'Errors': {}}
+    s3_client = client if client else get_client()
+
+    for index in range(0, len(unique_keys), DELETE_BATCH_SIZE):
+        batch = unique_keys[index:index + DELETE_BATCH_SIZE]
+        LOGGER.info("deleting %s keys [bucket=%s]", len(batch), bucket)
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket, Delete={'Objects': [{'Key': key_name} for key_name in batch], 'Quiet': True})
+            errors = dict((error.get('Key'), '{}: {}'.format(error.get('Code'), error.get('Message')))
+                          for error in response.get('Errors', []))
+        except Exception as ex:
+            LOGGER.debug(ex)
+            errors = dict.fromkeys(batch, str(ex))
+        for key_name in batch:
+            _report_key_result(result, 'Deleted', key_name, errors.get(key_name), progress)
+    return result
+
+
+def get_bucket_client(bucket_name):
+    """
+    Get a pooled S3 client for the regional endpoint of a bucket, so its requests are not redirected.
+    Only the region cached by check_bucket() is used: no request is sent, and the default client is returned when the
+    region is unknown.
+    """
+    cached = BUCKET_CACHE.get(bucket_name)
+    region = cached[1] if cached else None
+    return get_client(region_name=region) if region else get_client()
+
+
+def get_bucket_region(bucket_name, client=None):
+    """
+    Get the region of a bucket, checking the bucket first if it is not cached
+    @return: the region name, or None if the bucket does not exist or its region is unknown
+    """
+    exists, _ = check_bucket(bucket_name, client=client)
+    cached = BUCKET_CACHE.get(bucket_name)
+    return cached[1] if exists and cached else None
+
+
+def get_client(region_name=None, config=None, **credentials):
+    """
+    Get a pooled S3 client from CLIENT_REGISTRY
+    note: clients are cached per region, config and credentials
+    """
+    return CLIENT_REGISTRY.get_client(region_name=region_name, config=config, **credentials)
 
 
 def get_csv_data(key_name, bucket):
@@ -312,21 +1545,108 @@ def get_csv_data(key_name, bucket):
     return csv_content_str
 
 
-def get_resource():
+def get_parquet_metadata(key_name, bucket=BUCKET_DEFAULT, client=None, read_size=PARQUET_FOOTER_READ_SIZE):
+    """
+    Get the metadata of a parquet s3 file (key_name) from its footer, with one range request for the last @read_size
+    bytes of the file and a second one only when the footer is larger than that
+
+    @param client: an optional S3 client to use instead of the pooled one
+    @return: a dict with 'Key' and 'Valid':
+             True, with 'NumRows', 'NumRowGroups', 'Columns', 'Schema' and 'CreatedBy' from parquet.parse_file_metadata;
+             False, with 'Error', if the file is not a complete parquet file (e.g. empty, truncated or corrupted);
+             None, with 'Error', if the footer could not be read (e.g. the key does not exist)
+
+    example:
+        get_parquet_metadata("Mercator/mercator000.parquet", "ib-dl-it-rz-prod")['NumRows']
+    """
+    s3_client = client if client else get_client()
+    tail = get_tail_bytes(key_name, bucket, read_size, client=s3_client)
+    if tail is None:
+        return {'Key': key_name, 'Valid': None, 'Error': 'Cannot read the footer of {}'.format(key_name)}
+
+    try:
+        metadata_length = parquet.get_metadata_length(tail)
+        footer_length = metadata_length + parquet.FOOTER_SIZE
+        if footer_length > len(tail):
+            if len(tail) < read_size:
+                raise ValueError('The footer length {} is larger than the file'.format(footer_length))
+            tail = get_tail_bytes(key_name, bucket, footer_length, client=s3_client)
+            if tail is None:
+                return {'Key': key_name, 'Valid': None, 'Error': 'Cannot read the footer of {}'.format(key_name)}
+        metadata = parquet.parse_file_metadata(tail[-footer_length:-parquet.FOOTER_SIZE])
+    except ValueError as ex:
+        LOGGER.debug("- invalid parquet file: %s [%s]", key_name, ex)
+        return {'Key': key_name, 'Valid': False, 'Error': str(ex)}
+
+    metadata.update({'Key': key_name, 'Valid': True})
+    return metadata
+
+
+def get_parquet_metadatas(bucket, keys, client=None, max_workers=None):
+    """
+    Get the metadata of many parquet s3 files at once by reading their footers over a bounded thread pool
+
+    @param bucket: the bucket name (top-level directory in S3)
+    @param keys: the key names of the parquet files; duplicates are only read once
+    @param client: an optional S3 client shared by all workers instead of the pooled one
+    @param max_workers: the number of concurrent files, at most POOL_SIZE by default
+    @return: a dict mapping every key to its get_parquet_metadata() result
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+
+    s3_client = client if client else get_client()
+    workers = min(max_workers or POOL_SIZE, len(unique_keys))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda key_name: get_parquet_metadata(key_name, bucket, client=s3_client), unique_keys)
+        return dict(zip(unique_keys, results))
+
+
+def get_range(key_name, bucket=BUCKET_DEFAULT, start=0, end=None, client=None):
+    """
+    Get a byte range of a s3 file (key_name) in a bucket, without downloading the whole object
+
+    @param start: the offset of the first byte
+    @param end: the offset of the last byte (inclusive, as in the HTTP Range header); None reads to the end
+    @param client: an optional S3 client to use instead of the pooled one
+    @return: the bytes of the range, or None on error (e.g. the key does not exist or the range is not satisfiable)
+
+    example:
+        get_range("zones/com.zone.gz", "ib-dl-saas-cz-prod", 1024, 2047)
+    """
+    byte_range = 'bytes={}-{}'.format(start, '' if end is None else end)
+    return _get_byte_range(key_name, bucket, byte_range, client)
+
+
+def _get_byte_range(key_name, bucket, byte_range, client=None):
+    """
+    Get the bytes of a s3 file (key_name) for the @byte_range value of the HTTP Range header
+    """
+    s3_client = client if client else get_client()
+    try:
+        LOGGER.debug("- getting range: %s of %s [bucket='%s']", byte_range, key_name, bucket)
+        response = s3_client.get_object(Bucket=bucket, Key=key_name, Range=byte_range)
+        return response['Body'].read()
+    except Exception as ex:
+        LOGGER.debug("- range error: %s of %s", byte_range, key_name)
+        LOGGER.debug(ex)
+    return None
+
+
+def get_resource(region_name=None, config=None, **credentials):
     """
-    Get S3 resource
-    note: This function can be customized to accept configurations
+    Get a pooled S3 resource from CLIENT_REGISTRY
+    note: resources are cached per thread, region, config and credentials
     """
-    session = boto3_session.Session()
-    s3_resource = session.resource('s3', config=CONFIG)
-    return s3_resource
+    return CLIENT_REGISTRY.get_resource(region_name=region_name, config=config, **credentials)
 
 
-def get_content(key_name, bucket=BUCKET_DEFAULT):
+def get_content(key_name, bucket=BUCKET_DEFAULT, client=None):
     """
     Get content from a s3 file (key_name) in a bucket
     """
-    s3_client = get_client()
+    s3_client = client if client else get_client()
     try:
         LOGGER.debug("- getting object: %s [bucket='%s']", key_name, bucket)
         response = s3_client.get_object(Bucket=bucket, Key=key_name)
@@ -345,24 +1665,33 @@ def get_content(key_name, bucket=BUCKET_DEFAULT):
     return None
 
 
-def get_file_contents_s3(bucket_name, key):
+def get_file_contents_s3(bucket_name, key, client=None):
     """
     Retrieves file contents for a file on S3 and streams it over.
     :param bucket_name: bucket to get contents from
     :param key: path to the file
+    :param client: an optional S3 client to use instead of the pooled one
     :return: the contents of the file if they exist otherwise none
     """
-    s3_client = boto3.resource('s3').Object(bucket_name, key)
+    s3_client = client if client else get_client()
 
     try:
-        file_contents = s3_client.get()['Body'].read()
+        file_contents = s3_client.get_object(Bucket=bucket_name, Key=key)['Body'].read()
     except ClientError:
         file_contents = None
         LOGGER.info(FILE_NOT_FOUND_ERROR_MESSAGE)
     return file_contents
 
 
-def get_json_data(key_name, bucket=BUCKET_DEFAULT):
+def get_head_bytes(key_name, bucket=BUCKET_DEFAULT, size=1024, client=None):
+    """
+    Get the first @size bytes of a s3 file (key_name), e.g. to check a file header or magic number
+    @return: the bytes (fewer if the file is smaller), or None on error
+    """
+    return get_range(key_name, bucket, 0, size - 1, client=client)
+
+
+def get_json_data(key_name, bucket=BUCKET_DEFAULT, client=None):
     """
     Get JSON data obejct from a s3 file (key_name) in a bucket
 
@@ -373,12 +1702,13 @@ def get_json_data(key_name, bucket=BUCKET_DEFAULT):
               data = json.load(data_file)
           ```
     """
-    json_content = get_content(key_name, bucket)
+    json_content = get_content(key_name, bucket, client=client)
     if json_content:
         # logger.debug("- Data contents: %s\n", json_content)
         try:
             data = json.loads(json_content)
-            LOGGER.debug("- JSON object: %s\n", json.dumps(data))
+            if LOGGER.isEnabledFor(DEBUG):
+                LOGGER.debug("- JSON object: %s\n", json.dumps(data))
             return data
         except Exception as ex:
             LOGGER.debug(ex)
@@ -409,11 +1739,24 @@ def get_func(key_name, **kwargs):
     return files
 
 
-def get_key(key_name, bucket=BUCKET_DEFAULT):
+def get_key(key_name, bucket=BUCKET_DEFAULT, client=None):
     """
     Get key object in s3 bucket
+    @param client: an optional S3 client the bucket listing is sent through, and the ObjectSummary is bound to
+    @return: the ObjectSummary of the key; None if the key does not exist
     """
     s3_resource = get_resource()
+    if client:
+        # The key sorts first among the keys it prefixes, so one listed object tells if it exists:
+        paginator = client.get_paginator('list_objects_v2')
+        p_iterator = paginator.paginate(Bucket=bucket, Prefix=key_name, PaginationConfig={'MaxItems': 1})
+        for obj in p_iterator.search('Contents'):
+            if obj and obj.get('Key') == key_name:
+                # The summary holds the listed object as its data, like the summaries of a bucket listing:
+                summary = type(s3_resource.ObjectSummary(bucket, key_name))(bucket, key_name, client=client)
+                summary.meta.data = obj
+                return summary
+        return None
     bucket = s3_resource.Bucket(bucket)
     objects = list(bucket.objects.filter(Prefix=key_name))
     if len(objects) > 0 and objects[0].key == key_name:
@@ -444,25 +1787,213 @@ def get_func(key_name, **kwargs):
     return keys
 
 
-def get_parquet_data(key_name, bucket=BUCKET_DEFAULT):
+def get_sampled_ranges(key_name, bucket=BUCKET_DEFAULT, samples=4, sample_size=1024, client=None, max_workers=None,
+                       object_size=None):
+    """
+    Get @samples byte ranges of @sample_size bytes, evenly spaced from the start to the end of a s3 file (key_name),
+    with concurrent range requests on a shared client
+
+    @param samples: the number of ranges; the first one starts at the first byte and the last one ends at the last byte
+    @param sample_size: the number of bytes of each range
+    @param client: an optional S3 client to use instead of the pooled one
+    @param max_workers: the number of concurrent range requests; defaults to the client connection pool size
+    @param object_size: the size of the file, if already known; otherwise it is read with one HEAD request
+    @return: a list of (offset, bytes) tuples ordered by offset, with None as bytes for a failed range;
+             None if the file does not exist. Overlapping ranges are merged when the file is too small.
+
+    example:
+        get_sampled_ranges("dns-logs/part-00000.parquet", "ib-dl-saas-cz-prod", samples=8, sample_size=4096)
+    """
+    s3_client = client if client else get_client()
+    if object_size is None:
+        metadata = head_object(key_name, bucket, client=s3_client)
+        if not metadata.get('Exists'):
+            return None
+        object_size = metadata['ContentLength']
+    if not object_size or samples <= 0:
+        return []
+
+    last_offset = max(object_size - sample_size, 0)
+    if samples == 1:
+        offsets = [0]
+    else:
+        offsets = sorted(set(index * last_offset // (samples - 1) for index in range(samples)))
+    workers = min(max_workers or POOL_SIZE, len(offsets))
+    LOGGER.debug("- sampling %s ranges of %s bytes: %s [bucket='%s']", len(offsets), sample_size, key_name, bucket)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ranges = executor.map(
+            lambda offset: get_range(key_name, bucket, offset, offset + sample_size - 1, client=s3_client), offsets)
+        return list(zip(offsets, ranges))
+
+
+def get_parquet_data(key_name, bucket=BUCKET_DEFAULT, client=None, limit=None):
     """
     Get parquet data from a s3 file (key_name) in a bucket
 
     Note: For parquet contents, each line is in valid JSON format
           but the file itself is not.
+          The file is streamed by iter_json_lines(), so it is never held in memory as a whole;
+          use iter_json_lines() directly to avoid building the list of records too.
     """
-    parquet_content = get_content(key_name, bucket)
-    if parquet_content:
-        # logger.debug("- Data contents: %s\n", parquet_content)
-        try:
-            data = convert_parquet_to_json(parquet_content)
-            LOGGER.debug("- JSON object: %s\n", json.dumps(data))
-            return data
-        except Exception as ex:
-            LOGGER.debug(ex)
+    try:
+        data = list(iter_json_lines(key_name, bucket, client=client, limit=limit))
+        LOGGER.debug("- JSON records: %s [key=%s]\n", len(data), key_name)
+        return data or None
+    except Exception as ex:
+        LOGGER.debug(ex)
     return None
 
 
+def get_tail_bytes(key_name, bucket=BUCKET_DEFAULT, size=1024, client=None):
+    """
+    Get the last @size bytes of a s3 file (key_name), e.g. to read a parquet footer or check a file trailer
+    @return: the bytes (fewer if the file is smaller), or None on error
+    """
+    return _get_byte_range(key_name, bucket, 'bytes=-{}'.format(size), client)
+
+
+def head_object(key_name, bucket=BUCKET_DEFAULT, client=None):
+    """
+    Get the metadata of a s3 file (key_name) with a single HEAD request
+
+    @param key_name: the key name of the s3 file
+    @param bucket: the bucket name (top-level directory in S3)
+    @param client: an optional S3 client to use instead of the pooled one
+    @return: a dict of the head_object response with 'Key' and 'Exists' added.
+             'Exists' is True if the key exists, False if it doesn't (or is forbidden, see NOT_FOUND_ERROR_CODES),
+             and None if an exception occurred, in which case 'Error' holds the traceback.
+    """
+    s3_client = client if client else get_client()
+    try:
+        metadata = s3_client.head_object(Bucket=bucket, Key=key_name)
+    except ClientError as ex:
+        if ex.response.get('Error', {}).get('Code') in NOT_FOUND_ERROR_CODES:
+            return {'Key': key_name, 'Exists': False}
+        LOGGER.debug("- head error: %s [bucket='%s']: %s", key_name, bucket, ex)
+        return {'Key': key_name, 'Exists': None, 'Error': traceback.format_exc()}
+    except Exception as ex:
+        LOGGER.debug("- head error: %s [bucket='%s']: %s", key_name, bucket, ex)
+        return {'Key': key_name, 'Exists': None, 'Error': traceback.format_exc()}
+
+    metadata.update({'Key': key_name, 'Exists': True})
+    return metadata
+
+
+def head_objects(bucket, keys, client=None, max_workers=None):
+    """
+    Get the metadata of many s3 files at once by fanning out HEAD requests over a bounded thread pool
+
+    @param bucket: the bucket name (top-level directory in S3)
+    @param keys: the key names to check; duplicates are only requested once
+    @param client: an optional S3 client shared by all workers instead of the pooled one
+    @param max_workers: the number of concurrent requests, at most POOL_SIZE by default
+    @return: a dict mapping every key to its head_object() metadata; missing keys have 'Exists' set to False
+
+    example:
+        head_objects("cyber-intel", ["a/0010.tar.gz", "a/0020.tar.gz"])
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+
+    s3_client = client if client else get_client()
+    workers = min(max_workers or POOL_SIZE, len(unique_keys))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda key_name: head_object(key_name, bucket, client=s3_client), unique_keys)
+        return dict(zip(unique_keys, results))
+
+
+def iter_json_lines(key_name, bucket=BUCKET_DEFAULT, client=None, gzipped=None, limit=None,
+                    chunk_size=STREAM_CHUNK_SIZE):
+    """
+    This generator reads a line-delimited JSON s3 file (key_name) in chunks and yields one decoded record at a time,
+    so a multi-GB file is validated or sampled with bounded memory. The body is closed as soon as the generator
+    stops, whether it is exhausted, reaches the limit or is closed early by the caller (e.g. on `break`).
+
+    @param key_name: the key name of the s3 file
+    @param bucket: the bucket name (top-level directory in S3)
+    @param client: an optional S3 client to use instead of the pooled one
+    @param gzipped: True/False to force gzip decompression on or off; None detects gzip from the first bytes
+    @param limit: the maximum number of records to yield
+    @param chunk_size: the number of bytes read from the body at a time
+    @return: one decoded JSON record per non-blank line; a ClientError or ValueError is raised to the caller
+
+    example:
+        for record in iter_json_lines("heka/part-00000.json.gz", "ib-dl-saas-cz-prod", limit=100):
+            validate(record)
+    """
+    if limit is not None and limit <= 0:
+        return
+    lines = iter_lines(key_name, bucket, client=client, gzipped=gzipped, chunk_size=chunk_size)
+    count = 0
+    try:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+    finally:
+        lines.close()
+
+
+def iter_lines(key_name, bucket=BUCKET_DEFAULT, client=None, gzipped=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    This generator reads a s3 file (key_name) in chunks and yields one line (bytes, without the newline) at a time;
+    the body is closed as soon as the generator stops
+
+    @param client: an optional S3 client to use instead of the pooled one
+    @param gzipped: True/False to force gzip decompression on or off; None detects gzip from the first bytes
+    @param chunk_size: the number of bytes read from the body at a time
+    """
+    s3_client = client if client else get_client()
+    LOGGER.debug("- streaming object: %s [bucket='%s']", key_name, bucket)
+    body = s3_client.get_object(Bucket=bucket, Key=key_name)['Body']
+    try:
+        for line in _split_lines(body.iter_chunks(chunk_size), gzipped):
+            yield line
+    finally:
+        body.close()
+
+
+def _split_lines(chunks, gzipped=None):
+    """
+    Split a stream of (optionally gzip) chunks into lines
+    @param gzipped: True/False to force gzip decompression on or off; None detects gzip from the first chunk
+    """
+    decompressor = None
+    buffer = b''
+    for chunk in chunks:
+        if gzipped is None:
+            gzipped = chunk.startswith(GZIP_MAGIC)
+        if gzipped:
+            chunk, decompressor = _decompress_gzip_chunk(chunk, decompressor)
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield line
+    if decompressor:
+        buffer += decompressor.flush()
+    if buffer:
+        yield buffer
+
+
+def _decompress_gzip_chunk(chunk, decompressor):
+    """
+    Decompress a chunk of a gzip stream, which may be made of several concatenated gzip members
+    @return: a tuple of (bytes, decompressor): the decompressed bytes, and the decompressor for the next chunk
+    """
+    data = b''
+    while chunk:
+        if decompressor is None:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data += decompressor.decompress(chunk)
+        chunk = decompressor.unused_data
+        if decompressor.eof:
+            decompressor = None
+    return data, decompressor
+
+
 # pylint: disable=invalid-name
 def mv(old_path, new_path, filename, s_bucket=BUCKET_DEFAULT):
     """
@@ -514,6 +2045,42 @@ def mv_key(oldkey, newkey, bucket=BUCKET_DEFAULT):
         return False
 
 
+def move_keys(key_pairs, bucket=BUCKET_DEFAULT, target_bucket=None, client=None, max_workers=None, progress=None):
+    """
+    Move many s3 files at once: the keys are copied concurrently by copy_keys(), then the sources that were copied
+    are deleted in batches by delete_keys()
+
+    @param key_pairs: (source key, target key) tuples, or a dict mapping every source key to its target key
+    @param bucket: the bucket of the source keys
+    @param target_bucket: the bucket of the target keys; the source bucket by default
+    @param client: an optional S3 client shared by all requests instead of the pooled one
+    @param max_workers: the number of concurrent copy requests, at most POOL_SIZE by default
+    @param progress: an optional function called as `progress(source_key, error)` once per key when it is moved
+                     or fails, with error set to None on success
+    @return: a dict with 'Moved', the list of the moved source keys,
+             and 'Errors', a dict mapping every source key that failed to its error message;
+             a key that is copied but not deleted is reported as an error
+
+    example:
+        move_keys({"watchmen/results/a.json": "watchmen/history/a.json"}, "cyber-intel")
+    """
+    s3_client = client if client else get_client()
+    result = {'Moved': [], 'Errors': {}}
+
+    def report_copy_error(source_key, error):
+        if error and progress:
+            progress(source_key, error)
+
+    copied = copy_keys(key_pairs, bucket, target_bucket, client=s3_client, max_workers=max_workers,
+                       progress=report_copy_error)
+    result['Errors'].update(copied['Errors'])
+    deleted = delete_keys(copied['Copied'], bucket, client=s3_client)
+    for source_key in copied['Copied']:
+        error = deleted['Errors'].get(source_key)
+        _report_key_result(result, 'Moved', source_key, error and 'Copied but not deleted: {}'.format(error), progress)
+    return result
+
+
 def process_func(key, **kwargs):
     """
     default function that can be passed to process()
@@ -530,31 +2097,283 @@ def process_json(a_func=process_func, prefix='', **kwargs):
     process(a_func, prefix, '.json', **kwargs)
 
 
+def discover_prefixes(prefix='', bucket=BUCKET_DEFAULT, delimiter='/', client=None, max_items=None):
+    """
+    List the sub-prefixes directly under a prefix with one Delimiter listing
+
+    @param prefix: the prefix (starting under the bucket) of the key name
+    @param bucket: the bucket name (top-level directory in S3)
+    @param delimiter: the delimiter that separates the levels of the key names
+    @param client: an optional S3 client to use instead of the pooled one
+    @param max_items: stop listing once this many objects directly under the prefix are found
+    @return: a tuple of (list, list): the sorted sub-prefixes, and the objects directly under the prefix (at most
+             max_items). A flat prefix, whose first page has more objects to come but no sub-prefix, is not listed
+             any further: ([], None) is returned, so it is listed without a Delimiter instead.
+    """
+    s3_client = client if client else get_client()
+    paginator = s3_client.get_paginator('list_objects')
+    sub_prefixes = []
+    objects = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter=delimiter):
+        sub_prefixes.extend(path.get('Prefix') for path in page.get('CommonPrefixes', []))
+        objects.extend(page.get('Contents', []))
+        if max_items is not None and len(objects) >= max_items:
+            # the objects directly under the prefix come first, so the shards would not be listed
+            return sorted(sub_prefixes), objects[:max_items]
+        if not sub_prefixes and page.get('IsTruncated'):
+            return [], None
+    return sorted(sub_prefixes), objects
+
+
+def _list_shard(s3_client, bucket, shard, max_items, page_queue, stop_event):
+    """
+    List one shard and hand its pages over to the consumer of generate_sharded_objects()
+    """
+    def put(value):
+        # a timeout keeps the thread from waiting forever on a consumer that stopped early
+        while not stop_event.is_set():
+            try:
+                page_queue.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # a shard started after the consumer stopped sends no request
+    if stop_event.is_set():
+        return
+    try:
+        paginator = s3_client.get_paginator('list_objects')
+        parameters = {'Bucket': bucket, 'Prefix': shard, 'PaginationConfig': {'MaxItems': max_items}}
+        for page in paginator.paginate(**parameters):
+            if not put(page.get('Contents', [])):
+                return
+    except Exception as ex:
+        put(ex)
+        return
+    put(None)
+
+
+def _report_key_result(result, done_name, key_name, error, progress=None):
+    """
+    Record the result of a bulk operation on a key, in @result[@done_name] or in @result['Errors'], and report it
+    """
+    if error:
+        result['Errors'][key_name] = error
+    else:
+        result[done_name].append(key_name)
+    if progress:
+        progress(key_name, error)
+
+
+def generate_sharded_objects(prefix='', **kwargs):
+    """
+    This function splits a prefix into shards (sub-prefixes), lists the shards concurrently on one shared client
+    and yields every object, folder markers included, through a single iterator.
+
+    The shards are either the configured 'shards' appended to the prefix (e.g. ['hour=00/', 'hour=01/']), or the
+    sub-prefixes discovered with one Delimiter listing. Objects directly under the prefix come first, then the
+    objects of each shard in shard order, so the output is deterministic. A flat prefix (see discover_prefixes) is
+    listed like an unsharded one.
+
+    :param prefix: the prefix (starting under the bucket) of the key name
+    :param kwargs: 'bucket', 'max_items', an optional S3 'client', 'shards', 'delimiter' for the discovery,
+                   'max_workers' (POOL_SIZE by default), and 'start_after' for a flat prefix
+    :return: one object at a time
+    """
+    bucket = kwargs.get('bucket', BUCKET_DEFAULT)
+    max_items = kwargs.get('max_items', None)
+    s3_client = kwargs.get('client') or get_bucket_client(bucket)
+
+    if kwargs.get('shards'):
+        shards = [prefix + shard for shard in kwargs.get('shards')]
+        objects = []
+    else:
+        shards, objects = discover_prefixes(
+            prefix, bucket, kwargs.get('delimiter', '/'), client=s3_client, max_items=max_items)
+        if objects is None:
+            LOGGER.debug("- no shards under the flat prefix: %s [bucket='%s']", prefix, bucket)
+            yield from _paginate_objects(s3_client, bucket, prefix, max_items, kwargs.get('start_after'))
+            return
+
+    count = 0
+    for obj in objects:
+        if max_items is not None and count >= max_items:
+            return
+        count += 1
+        yield obj
+
+    if not shards:
+        return
+
+    LOGGER.debug("- listing %s shards under: %s [bucket='%s']", len(shards), prefix, bucket)
+    stop_event = threading.Event()
+    page_queues = [queue.Queue(maxsize=SHARD_BUFFER_PAGES) for _ in shards]
+    workers = min(kwargs.get('max_workers') or POOL_SIZE, len(shards))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        # The executor starts shards in order, so the shard being consumed is always listing or listed.
+        for shard, page_queue in zip(shards, page_queues):
+            executor.submit(_list_shard, s3_client, bucket, shard, max_items, page_queue, stop_event)
+
+        for page_queue in page_queues:
+            page = page_queue.get()
+            while page is not None:
+                if isinstance(page, Exception):
+                    raise page
+                for obj in page:
+                    if max_items is not None and count >= max_items:
+                        return
+                    count += 1
+                    yield obj
+                page = page_queue.get()
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _paginate_objects(s3_client, bucket, prefix, max_items, start_after=None):
+    """
+    List the objects of a prefix serially, without a Delimiter; with ListObjectsV2 StartAfter if @start_after is set
+    """
+    parameters = {'Bucket': bucket, 'Prefix': prefix, 'Delimiter': '', 'PaginationConfig': {'MaxItems': max_items}}
+    if start_after:
+        paginator = s3_client.get_paginator('list_objects_v2')
+        parameters['StartAfter'] = start_after
+    else:
+        paginator = s3_client.get_paginator('list_objects')
+    return paginator.paginate(**parameters).search('Contents')
+
+
 def generate_pages(prefix='', **kwargs):
     """
     This function creates a paginator and yields one page at a time.
 
     :param prefix: the prefix (starting under the bucket) of the key name
+    :param kwargs: 'bucket', 'max_items' and an optional S3 'client'. With 'sharded' set, the prefix is listed by
+                   generate_sharded_objects(), which also takes 'shards', 'delimiter' and 'max_workers'.
+                   With 'start_after' set, only the keys after it are listed (by ListObjectsV2 StartAfter, so
+                   the keys before it are never requested; sharded listings drop them instead).
     :return: one page of contents
     """
     bucket = kwargs.get('bucket', BUCKET_DEFAULT)
     max_items = kwargs.get('max_items', None)
+    start_after = kwargs.get('start_after')
     check_arg_bucket(bucket)
 
-    s3_client = get_client()
-    paginator = s3_client.get_paginator('list_objects')
-    parameters = {'Bucket': bucket, 'Prefix': prefix, 'Delimiter': '', 'PaginationConfig': {'MaxItems': max_items}}
-    p_iterator = paginator.paginate(**parameters)
+    if kwargs.get('sharded'):
+        objects = generate_sharded_objects(prefix, **kwargs)
+    else:
+        s3_client = kwargs.get('client') or get_bucket_client(bucket)
+        objects = _paginate_objects(s3_client, bucket, prefix, max_items, start_after)
 
-    for obj in p_iterator.search('Contents'):
+    for obj in objects:
         if obj:
             key_name = obj.get('Key', '')
+            if start_after and key_name <= start_after:
+                continue
             if key_name.endswith("/"):
                 LOGGER.info("- skipping key: %s", key_name)
                 continue
             yield obj
 
 
+def find_inventory_manifest(prefix, bucket=BUCKET_DEFAULT, client=None):
+    """
+    Find the latest manifest of an S3 Inventory configuration
+
+    @param prefix: the prefix of the inventory configuration in the destination bucket,
+                   i.e. '<destination prefix>/<source bucket>/<configuration id>/'
+    @param bucket: the destination bucket of the inventory
+    @param client: an optional S3 client to use instead of the pooled one
+    @return: the key of the latest manifest.json, or None if there is none
+    """
+    prefix = prefix if prefix.endswith('/') else prefix + '/'
+    sub_prefixes, _ = discover_prefixes(prefix, bucket, client=client)
+    folders = [sub_prefix for sub_prefix in sub_prefixes if INVENTORY_MANIFEST_FOLDER.search(sub_prefix)]
+    return max(folders) + INVENTORY_MANIFEST_NAME if folders else None
+
+
+def load_inventory(manifest_key, bucket=BUCKET_DEFAULT, client=None, max_workers=None):
+    """
+    Load an S3 Inventory report into an InventoryIndex: the manifest is read, then its CSV data files are streamed
+    concurrently over a bounded thread pool
+
+    @param manifest_key: the key of the manifest.json, e.g. from find_inventory_manifest()
+    @param bucket: the destination bucket of the inventory, where the manifest and the data files are
+    @param client: an optional S3 client shared by all workers instead of the pooled one
+    @param max_workers: the number of data files read at once, at most POOL_SIZE by default
+    @return: the sorted InventoryIndex; raises ValueError if the manifest cannot be read or is not a CSV inventory
+
+    example:
+        manifest_key = find_inventory_manifest("inventory/ib-dl-saas-cz-prod/daily/", "ib-dl-inventory")
+        load_inventory(manifest_key, "ib-dl-inventory").list_objects("heka/year=2020/month=06/day=01/")
+    """
+    s3_client = client if client else get_client()
+    manifest = get_json_data(manifest_key, bucket, client=s3_client)
+    if not manifest:
+        raise ValueError('Cannot read the inventory manifest: {} [bucket={}]'.format(manifest_key, bucket))
+    LOGGER.info("loading inventory: %s [bucket=%s]", manifest_key, bucket)
+    return _load_inventory_files(
+        manifest, lambda data_key: iter_lines(data_key, bucket, client=s3_client), max_workers)
+
+
+def load_local_inventory(directory, manifest_key=None, max_workers=None):
+    """
+    Load an S3 Inventory report copied to a local directory into an InventoryIndex, e.g. for tests
+
+    @param directory: the local copy of the destination bucket; the manifest and the data files are at their keys
+    @param manifest_key: the key of the manifest.json; the latest manifest under the directory by default
+    @param max_workers: the number of data files read at once, at most POOL_SIZE by default
+    @return: the sorted InventoryIndex; raises ValueError if there is no manifest or it is not a CSV inventory
+    """
+    if manifest_key is None:
+        manifest_keys = [
+            os.path.relpath(os.path.join(dir_path, INVENTORY_MANIFEST_NAME), directory)
+            for dir_path, _, file_names in os.walk(directory) if INVENTORY_MANIFEST_NAME in file_names]
+        if not manifest_keys:
+            raise ValueError('No inventory manifest under: {}'.format(directory))
+        manifest_key = max(manifest_keys)
+    with open(os.path.join(directory, manifest_key)) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    def read_lines(data_key):
+        with open(os.path.join(directory, data_key), 'rb') as data_file:
+            for line in _split_lines(iter(lambda: data_file.read(STREAM_CHUNK_SIZE), b'')):
+                yield line
+
+    return _load_inventory_files(manifest, read_lines, max_workers)
+
+
+def _load_inventory_files(manifest, read_lines, max_workers=None):
+    """
+    Load the data files of an inventory manifest with @read_lines, a function yielding the lines of a data file
+    """
+    if manifest.get('fileFormat', 'CSV').upper() != 'CSV':
+        raise ValueError('Only CSV inventory reports are supported, not {}'.format(manifest.get('fileFormat')))
+    schema = [name.strip() for name in manifest['fileSchema'].split(',')]
+    created_at = manifest.get('creationTimestamp')
+    index = InventoryIndex(
+        source_bucket=manifest.get('sourceBucket'),
+        created_at=datetime.datetime.fromtimestamp(int(created_at) / 1000, datetime.timezone.utc)
+        if created_at else None)
+
+    def load_file(data_file):
+        file_index = InventoryIndex()
+        file_index.add_csv_rows(csv.reader(line.decode('utf-8') for line in read_lines(data_file['key'])), schema)
+        return file_index
+
+    data_files = manifest.get('files', [])
+    if data_files:
+        workers = min(max_workers or POOL_SIZE, len(data_files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for file_index in executor.map(load_file, data_files):
+                index.extend(file_index)
+    index.sort()
+    LOGGER.info("- inventory of %s objects [source_bucket=%s]", len(index), index.source_bucket)
+    return index
+
+
 # process calls a_func to process all keys in a bucket
 def process_keys(a_func=process_func, prefix='', **kwargs):
     """
@@ -564,8 +2383,9 @@ def process_keys(a_func=process_func, prefix='', **kwargs):
     @param a_func: the process function to take each iterated key name
                    the function signature is `def func(obj, **kwargs)`
     @param prefix: the prefix (starting under the bucket) of the key name
-    @param kwargs: the additional parameters for a_func
-    @return: N/A
+    @param kwargs: the additional parameters for a_func, and an optional S3 'client';
+                   with 'sharded' set, the prefix is listed by generate_sharded_objects()
+    @return: the number of processed keys; empty folder markers are deleted in batch by delete_keys()
 
     example:
         process_keys(process_func, "hancock/mined-json", bucket="cyber-intel")
@@ -575,23 +2395,39 @@ def process_keys(a_func=process_func, prefix='', **kwargs):
     check_arg_as_func(a_func)
     check_arg_bucket(bucket)
 
-    s3_client = get_client()
+    if kwargs.get('sharded'):
+        objects = generate_sharded_objects(prefix, **kwargs)
+    else:
+        s3_client = kwargs.get('client') or get_bucket_client(bucket)
 
-    paginator = s3_client.get_paginator('list_objects')
-    parameters = {'Bucket': bucket, 'Prefix': prefix, 'Delimiter': ''}
-    p_iterator = paginator.paginate(**parameters)
+        paginator = s3_client.get_paginator('list_objects')
+        parameters = {'Bucket': bucket, 'Prefix': prefix, 'Delimiter': ''}
+        p_iterator = paginator.paginate(**parameters)
+        objects = p_iterator.search('Contents')
     counts = 0
+    # Keys are listed in order, so a folder marker is empty when the next key is not under it
+    folder_key = None
+    empty_folder_keys = []
 
-    for obj in p_iterator.search('Contents'):
+    for obj in objects:
         if obj:
             key_name = obj.get('Key', '')
+            if folder_key and not key_name.startswith(folder_key):
+                empty_folder_keys.append(folder_key)
+            folder_key = None
             if key_name.endswith("/"):
                 LOGGER.info("- skipping key: %s", key_name)
-                delete_empty_folder(key_name, bucket)
+                folder_key = key_name
                 continue
             a_func(obj, **kwargs)
             counts += 1
 
+    if folder_key:
+        empty_folder_keys.append(folder_key)
+    if empty_folder_keys:
+        LOGGER.info("empty folders: %s [bucket=%s]", empty_folder_keys, bucket)
+        delete_keys(empty_folder_keys, bucket, client=kwargs.get('client'))
+
     return counts
 
 
@@ -653,42 +2489,165 @@ def process(a_func=process_func, prefix='', suffix='/', **kwargs):
     return counts
 
 
-def validate_file_on_s3(bucket_name, key):
+def validate_file_on_s3(bucket_name, key, client=None, probe=None):
     """
-    Checks if a file exists on S3 and non-zero size.
+    Checks if a file exists on S3 and non-zero size, with a metadata-only request.
     :param bucket_name: Name of the bucket to check
     :param key: path to the file
-    :return: true if file exists otherwise false
+    :param client: an optional S3 client to use instead of the pooled one
+    :param probe: an optional ObjectMetadataProbe that memoizes the metadata
+    :return: true if file exists otherwise false; a forbidden file (403) is reported as missing, see head_object()
+    :raise: ObjectMetadataError if the metadata request failed for any reason other than a missing file
     """
-    s3_client = boto3.resource('s3')
+    metadata = probe.get(bucket_name, key) if probe else head_object(key, bucket_name, client=client)
+
+    if metadata.get('Exists') is None:
+        raise ObjectMetadataError(metadata.get('Error'))
 
-    file_obj = s3_client.Object(bucket_name, key)
     is_valid_file = True
-    try:
-        # Checks file size if it's zero
-        if file_obj.get()['ContentLength'] == 0:
-            is_valid_file = False
-            LOGGER.info(FILE_SIZE_ZERO_ERROR_MESSAGE)
-    except ClientError:
+    if not metadata.get('Exists'):
         # Means the file doesn't exist
         is_valid_file = False
         LOGGER.info(FILE_NOT_FOUND_ERROR_MESSAGE)
+    elif metadata['ContentLength'] == 0:
+        # Checks file size if it's zero
+        is_valid_file = False
+        LOGGER.info(FILE_SIZE_ZERO_ERROR_MESSAGE)
 
     return is_valid_file
 
 
-def get_object(bucket_name, key):
+def verify_gzip(key_name, bucket=BUCKET_DEFAULT, client=None, count_lines=False, chunk_size=STREAM_CHUNK_SIZE,
+                budget=None):
+    """
+    Verify the integrity of a gzip s3 file (key_name) by streaming its body through verify_gzip_stream(),
+    so a multi-GB file is checked with bounded memory
+
+    @param client: an optional S3 client to use instead of the pooled one
+    @param count_lines: also count the decompressed lines (records of a line-delimited file)
+    @param chunk_size: the number of bytes read from the body, and decompressed, at a time
+    @param budget: an optional ByteBudget the size of the file is reserved from before it is read;
+                   the file is skipped when the budget is exhausted
+    @return: a dict with 'Key' and 'Valid':
+             True or False, with the verify_gzip_stream() result;
+             None, with 'Error', if the file could not be read or, with 'Skipped' set, was not read within the budget
+
+    example:
+        verify_gzip("zones/com.zone.gz", "cyber-intel", count_lines=True)['NumLines']
+    """
+    s3_client = client if client else get_client()
+    try:
+        LOGGER.debug("- verifying gzip object: %s [bucket='%s']", key_name, bucket)
+        response = s3_client.get_object(Bucket=bucket, Key=key_name)
+    except Exception as ex:
+        LOGGER.debug("- gzip error: %s [bucket='%s']: %s", key_name, bucket, ex)
+        return {'Key': key_name, 'Valid': None, 'Error': traceback.format_exc()}
+
+    body = response['Body']
+    try:
+        if budget is not None and not budget.reserve(response.get('ContentLength', 0)):
+            LOGGER.debug("- skipping gzip object: %s [budget=%s bytes]", key_name, budget.limit)
+            return {'Key': key_name, 'Valid': None, 'Skipped': True,
+                    'Error': 'The byte budget of {} bytes is exhausted'.format(budget.limit)}
+        result = verify_gzip_stream(body.iter_chunks(chunk_size), count_lines=count_lines, buffer_size=chunk_size)
+    except Exception as ex:
+        LOGGER.debug("- gzip error: %s [bucket='%s']: %s", key_name, bucket, ex)
+        return {'Key': key_name, 'Valid': None, 'Error': traceback.format_exc()}
+    finally:
+        body.close()
+
+    result['Key'] = key_name
+    return result
+
+
+def verify_gzip_stream(chunks, count_lines=False, buffer_size=STREAM_CHUNK_SIZE):
+    """
+    Verify a gzip stream incrementally: every member is decompressed into buffers of at most @buffer_size bytes,
+    which are counted and dropped, and zlib checks the CRC32 and the length in the trailer of each member
+
+    @param chunks: an iterable of the compressed bytes, e.g. an S3 body.iter_chunks()
+    @param count_lines: also count the decompressed lines; a last line without a trailing newline is counted
+    @param buffer_size: the maximum size of each decompressed buffer
+    @return: a dict with 'Valid' (True if the stream is made of complete gzip members whose trailers match),
+             'Members', 'CompressedSize', 'UncompressedSize', 'NumLines' (with count_lines) and 'Error' if invalid
+    """
+    result = {'Valid': True, 'Members': 0, 'CompressedSize': 0, 'UncompressedSize': 0}
+    decompressor = None
+    lines = 0
+    last_byte = b''
+    try:
+        for chunk in chunks:
+            result['CompressedSize'] += len(chunk)
+            output_pending = False
+            # The decompressor may hold more output than buffer_size even when the chunk is consumed
+            while chunk or output_pending:
+                if decompressor is None:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data = decompressor.decompress(chunk, buffer_size)
+                result['UncompressedSize'] += len(data)
+                if count_lines and data:
+                    lines += data.count(b'\n')
+                    last_byte = data[-1:]
+                if decompressor.eof:
+                    # A new gzip member may follow the trailer
+                    result['Members'] += 1
+                    chunk = decompressor.unused_data
+                    decompressor = None
+                    output_pending = False
+                else:
+                    chunk = decompressor.unconsumed_tail
+                    output_pending = len(data) == buffer_size
+        if not result['CompressedSize']:
+            result.update({'Valid': False, 'Error': 'The file is empty'})
+        elif decompressor is not None:
+            result.update({'Valid': False, 'Error': 'The gzip stream is truncated'})
+    except zlib.error as ex:
+        result.update({'Valid': False, 'Error': str(ex)})
+
+    if count_lines:
+        result['NumLines'] = lines + (1 if last_byte and last_byte != b'\n' else 0)
+    return result
+
+
+def verify_gzips(bucket, keys, client=None, count_lines=False, max_workers=None, byte_budget=None):
+    """
+    Verify many gzip s3 files at once by streaming them through verify_gzip() over a bounded thread pool,
+    downloading at most @byte_budget compressed bytes in total
+
+    @param bucket: the bucket name (top-level directory in S3)
+    @param keys: the key names of the gzip files; duplicates are only verified once
+    @param client: an optional S3 client shared by all workers instead of the pooled one
+    @param count_lines: also count the decompressed lines of every file
+    @param max_workers: the number of concurrent files, at most POOL_SIZE by default
+    @param byte_budget: the maximum number of compressed bytes to download; GZIP_VERIFY_BYTE_BUDGET by default.
+                        Files are started in key order, and a file that does not fit the rest of the budget is skipped.
+    @return: a dict mapping every key to its verify_gzip() result
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+
+    s3_client = client if client else get_client()
+    budget = ByteBudget(GZIP_VERIFY_BYTE_BUDGET if byte_budget is None else byte_budget)
+    workers = min(max_workers or POOL_SIZE, len(unique_keys))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            lambda key_name: verify_gzip(key_name, bucket, client=s3_client, count_lines=count_lines, budget=budget),
+            unique_keys)
+        return dict(zip(unique_keys, results))
+
+
+def get_object(bucket_name, key, client=None, probe=None):
     """
     Method to gets file object from S3
     :param bucket_name: Name of the bucket to check
     :param key: path to the file
+    :param client: an optional S3 client to use instead of the pooled one
+    :param probe: an optional ObjectMetadataProbe that memoizes the metadata
     :return: <S3 Object> otherwise false
     """
-    s3_client = boto3.client('s3')
-    file_obj = False
-    try:
-        file_obj = s3_client.head_object(Bucket=bucket_name,
-                                         Key=key)
-    except ClientError:
+    metadata = probe.get(bucket_name, key) if probe else head_object(key, bucket_name, client=client)
+    if not metadata.get('Exists'):
         LOGGER.info(FILE_NOT_FOUND_ERROR_MESSAGE)
-    return file_obj
+        return False
+    return metadata
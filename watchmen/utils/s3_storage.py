@@ -1,95 +1,311 @@
 """
-# s3_storage module includes storage interface implementation for s3
+# s3_storage module includes storage interface implementation for s3,
+# and a local filesystem twin of it to run against local fixtures, selected by get_storage()
 
 @author: Jason Zhu
 @email: jzhu@infoblox.com
 @created: 2017-09-01
 """
-import boto3.session as boto3_session
+import abc
+import datetime
+import gzip
+import json
+import os
+from logging import getLogger
 
+from watchmen.config import settings
 from watchmen.utils import s3
 
+LOGGER = getLogger(__name__)
 
-class S3Storage(object):
+
+class Storage(abc.ABC):
     """
-    class S3Storage implements a storage interface for AWS S3 per bucket
+    class Storage is the interface of the storage backends: keys are '/'-separated names in a bucket,
+    and objects are listed as S3-style dicts with 'Key', 'Size' and 'LastModified'
     """
-    def __init__(self, bucket):
-        """
-        Initializes a S3Storage per specified @bucket
-        """
-        self.bucket = bucket
-
-        session = boto3_session.Session()
-        self.resource = session.resource('s3')
-        self.client = session.client('s3')
-        pass
-
+    @abc.abstractmethod
     def create(self, key_path, content=''):
         """
-        Create an s3 key per @key_path with specified @content.
+        Create a key per @key_path with specified @content.
         Note: any existing key_path will be overwritten.
         """
-        return s3.create_key(
-            content, key_path, bucket=self.bucket, client=self.client)
 
+    @abc.abstractmethod
     def delete(self, key_path):
         """
-        Delete an s3 key per specified @key_path
+        Delete a key per specified @key_path. Return True or False.
         """
-        return s3.delete_key(key_path, bucket=self.bucket, client=self.client)
 
-    def exists(self, key_path):
+    @abc.abstractmethod
+    def delete_keys(self, key_paths, progress=None):
         """
-        Check if specified s3 @key_path exists. Return True or False.
+        Delete many keys at once.
+        Return a dict with 'Deleted' (list of keys) and 'Errors' (dict of key to error message).
         """
-        return s3.check_key(key_path, bucket=self.bucket, client=self.client)
 
+    @abc.abstractmethod
     def get_content(self, key_path):
         """
-        Get the content (string) per specified s3 @key_path
+        Get the content (bytes) per specified @key_path; '' if the key is empty, None if it cannot be read
         """
-        return s3.get_content(key_path, bucket=self.bucket, client=self.client)
 
-    def get_json_data(self, key_path):
+    @abc.abstractmethod
+    def get_parquet_content(self, key_path, limit=None):
         """
-        Get JSON data (object) from specified s3 @key_path
+        Get parquet data (list of JSON records) from specified @key_path
         """
-        return s3.get_json_data(
-            key_path, bucket=self.bucket, client=self.client)
 
-    def get_last_modified(self, key_path):
+    @abc.abstractmethod
+    def head(self, key_path):
         """
-        Get the last modified (offset-aware datetime) per specified s3 @key_path
+        Get the metadata of specified @key_path as a dict with 'Key' and 'Exists',
+        and 'ContentLength' and 'LastModified' if the key exists
         """
-        s3_obj = s3.get_key(key_path, bucket=self.bucket, client=self.client)
-        return None if s3_obj is None else s3_obj.last_modified
 
-    def get_parquet_content(self, key_path):
+    @abc.abstractmethod
+    def list_objects(self, prefix='', max_items=None):
         """
-        Get parquet data content (string) from specified s3 @key_path
+        Yield the objects (dicts) with @prefix in key order, skipping folder markers
         """
-        return s3.get_parquet_data(
-            key_path, bucket=self.bucket, client=self.client)
 
+    @abc.abstractmethod
     def move(self, source_name, target_name):
         """
-        Move an s3 key from @source_name to @target_name
+        Move a key from @source_name to @target_name. Return True or False.
         """
-        return s3.mv_key(
-            source_name, target_name, bucket=self.bucket, client=self.resource)
+
+    def exists(self, key_path):
+        """
+        Check if specified @key_path exists. Return True or False.
+        """
+        return self.head(key_path).get('Exists') is True
+
+    def get_json_data(self, key_path):
+        """
+        Get JSON data (object) from specified @key_path
+        """
+        json_content = self.get_content(key_path)
+        if json_content:
+            try:
+                return json.loads(json_content)
+            except Exception as ex:
+                LOGGER.debug(ex)
+        return None
+
+    def get_last_modified(self, key_path):
+        """
+        Get the last modified (offset-aware datetime) per specified @key_path
+        """
+        return self.head(key_path).get('LastModified')
 
     def process(self, a_func, prefix, **kwargs):
         """
-        Process all s3 keys with @prefix by @a_func (function pointer)
+        Process all keys with @prefix by @a_func (function pointer), called as `a_func(obj, **kwargs)`.
+        Return the number of processed keys.
         """
-        return s3.process_keys(
-            a_func, prefix=prefix, client=self.client, **kwargs)
+        counts = 0
+        for obj in self.list_objects(prefix):
+            a_func(obj, **kwargs)
+            counts += 1
+        return counts
 
     def save(self, key_path, content=''):
         """
-        Save @content (string) to an s3 @key_path.
+        Save @content (string) to a @key_path.
         Note: any existing key_path will be overwritten.
         """
+        return self.create(key_path, content)
+
+
+class S3Storage(Storage):
+    """
+    class S3Storage implements a storage interface for AWS S3 per bucket
+    """
+    def __init__(self, bucket, client=None):
+        """
+        Initializes a S3Storage per specified @bucket.
+        All requests share one @client, by default the pooled client of the bucket region.
+        """
+        self.bucket = bucket
+        self.client = client if client else s3.get_bucket_client(bucket)
+
+    def create(self, key_path, content=''):
+        return s3.create_key(
+            content, key_path, bucket=self.bucket, client=self.client)
+
+    def delete(self, key_path):
+        return s3.delete_key(key_path, bucket=self.bucket, client=self.client)
+
+    def delete_keys(self, key_paths, progress=None):
+        return s3.delete_keys(
+            key_paths, bucket=self.bucket, client=self.client, progress=progress)
+
+    def get_content(self, key_path):
+        return s3.get_content(key_path, bucket=self.bucket, client=self.client)
+
+    def get_json_data(self, key_path):
+        return s3.get_json_data(
+            key_path, bucket=self.bucket, client=self.client)
+
+    def get_parquet_content(self, key_path, limit=None):
+        return s3.get_parquet_data(
+            key_path, bucket=self.bucket, client=self.client, limit=limit)
+
+    def head(self, key_path):
+        return s3.head_object(key_path, bucket=self.bucket, client=self.client)
+
+    def list_objects(self, prefix='', max_items=None):
+        return s3.generate_pages(
+            prefix, bucket=self.bucket, client=self.client, max_items=max_items)
+
+    def move(self, source_name, target_name):
+        result = s3.move_keys(
+            [(source_name, target_name)], bucket=self.bucket, client=self.client)
+        return source_name in result['Moved']
+
+    def process(self, a_func, prefix, **kwargs):
+        kwargs.setdefault('bucket', self.bucket)
+        return s3.process_keys(
+            a_func, prefix=prefix, client=self.client, **kwargs)
+
+    def save(self, key_path, content=''):
         return s3.copy_contents_to_bucket(
             content, key_path, bucket=self.bucket, client=self.client)
+
+
+class LocalStorage(Storage):
+    """
+    class LocalStorage implements the storage interface over a local directory tree standing in for a bucket,
+    e.g. to run checks against local fixtures for tests and benchmarks; keys are paths relative to the @root
+    """
+    def __init__(self, root, bucket=None):
+        """
+        Initializes a LocalStorage per specified @root directory; @bucket defaults to the directory name
+        """
+        self.root = os.path.abspath(root)
+        self.bucket = bucket if bucket else os.path.basename(self.root)
+
+    def _get_path(self, key_path):
+        """
+        Get the local path of a key; raise ValueError if the key is outside of the root directory
+        """
+        path = os.path.abspath(os.path.join(self.root, key_path))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError("key '{}' is outside of {}".format(key_path, self.root))
+        return path
+
+    def create(self, key_path, content=''):
+        try:
+            path = self._get_path(key_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as key_file:
+                key_file.write(content.encode('utf-8') if isinstance(content, str) else content)
+            return self.head(key_path)
+        except Exception as ex:
+            LOGGER.error('failure on creating %s [%s]:\n%s', key_path, self.root, ex)
+            return None
+
+    def delete(self, key_path):
+        try:
+            os.remove(self._get_path(key_path))
+            return True
+        except Exception as ex:
+            LOGGER.debug(ex)
+            return False
+
+    def delete_keys(self, key_paths, progress=None):
+        result = {'Deleted': [], 'Errors': {}}
+        for key_path in dict.fromkeys(key_paths):
+            try:
+                path = self._get_path(key_path)
+                if os.path.isfile(path):
+                    os.remove(path)
+                result['Deleted'].append(key_path)
+                error = None
+            except Exception as ex:
+                error = result['Errors'][key_path] = str(ex)
+            if progress:
+                progress(key_path, error)
+        return result
+
+    def get_content(self, key_path):
+        try:
+            with open(self._get_path(key_path), 'rb') as key_file:
+                return key_file.read() or ""
+        except Exception as ex:
+            LOGGER.debug("- content error: %s", key_path)
+            LOGGER.debug(ex)
+        return None
+
+    def get_parquet_content(self, key_path, limit=None):
+        try:
+            path = self._get_path(key_path)
+            with open(path, 'rb') as key_file:
+                gzipped = key_file.read(len(s3.GZIP_MAGIC)) == s3.GZIP_MAGIC
+            data = []
+            with (gzip.open(path) if gzipped else open(path, 'rb')) as key_file:
+                for line in key_file:
+                    if limit is not None and len(data) >= limit:
+                        break
+                    if line.strip():
+                        data.append(json.loads(line))
+            return data or None
+        except Exception as ex:
+            LOGGER.debug(ex)
+        return None
+
+    def head(self, key_path):
+        try:
+            stat = os.stat(self._get_path(key_path))
+        except FileNotFoundError:
+            return {'Key': key_path, 'Exists': False}
+        except Exception as ex:
+            LOGGER.debug("- head error: %s [root='%s']: %s", key_path, self.root, ex)
+            return {'Key': key_path, 'Exists': None, 'Error': str(ex)}
+        return {
+            'Key': key_path,
+            'Exists': True,
+            'ContentLength': stat.st_size,
+            'LastModified': datetime.datetime.fromtimestamp(stat.st_mtime, tz=datetime.timezone.utc),
+        }
+
+    def list_objects(self, prefix='', max_items=None):
+        # only walk the deepest directory the prefix is in
+        directory = os.path.join(self.root, os.path.dirname(prefix))
+        key_paths = []
+        for dir_path, _, file_names in os.walk(directory):
+            relative_path = os.path.relpath(dir_path, self.root).replace(os.sep, '/')
+            for file_name in file_names:
+                key_path = file_name if relative_path == '.' else '{}/{}'.format(relative_path, file_name)
+                if key_path.startswith(prefix):
+                    key_paths.append(key_path)
+
+        for count, key_path in enumerate(sorted(key_paths)):
+            if max_items is not None and count >= max_items:
+                return
+            metadata = self.head(key_path)
+            if metadata.get('Exists'):
+                yield {'Key': key_path, 'Size': metadata['ContentLength'], 'LastModified': metadata['LastModified']}
+
+    def move(self, source_name, target_name):
+        try:
+            target_path = self._get_path(target_name)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(self._get_path(source_name), target_path)
+            return True
+        except Exception as ex:
+            LOGGER.debug(ex)
+            return False
+
+
+def get_storage(bucket, client=None):
+    """
+    Get the storage of a bucket per the config: a LocalStorage over the <storage.local_root>/<bucket> directory
+    when storage.local_root is set (e.g. with the STORAGE_LOCAL_ROOT env variable), else a S3Storage
+    @param client: the S3 client of a S3Storage; the pooled client of the bucket region by default
+    """
+    local_root = settings('storage.local_root')
+    if local_root:
+        return LocalStorage(os.path.join(local_root, bucket), bucket=bucket)
+    return S3Storage(bucket, client=client)